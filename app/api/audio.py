@@ -1,18 +1,26 @@
 """
 Audio processing endpoints
 """
+import asyncio
+import json
 import os
+import re
 import uuid
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
 from fastapi.responses import FileResponse, StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
 from app.core.config import settings
 from app.services.audio_processor import AudioProcessor, log_capture
 from app.services.db_job_service import db_job_service
+from app.services.job_streams import job_streams
+from app.services.storage import remove_job_files
+from app.services.uploads import FILE_UPLOAD_BODY, StoredUpload, UploadError, check_extension, receive_file
+from app.services.zip_stream import stream_zip
 from app.models.audio import (
     ProcessingResponse,
     StemInfo,
@@ -22,9 +30,77 @@ from app.models.audio import (
 router = APIRouter()
 audio_processor = AudioProcessor()
 
-@router.post("/upload", response_model=ProcessingResponse)
+# Statuses after which a job's log stream ends
+FINISHED_STATUSES = {
+    ProcessingStatus.COMPLETED.value,
+    ProcessingStatus.FAILED.value,
+    ProcessingStatus.CANCELLED.value,
+}
+
+# Log entries read per step when a stream catches up on history
+CATCH_UP_PAGE = 500
+
+# Default page size and longest search text for filtered log queries
+LOG_QUERY_PAGE = 500
+MAX_QUERY_LENGTH = 200
+
+# A regular expression only sees the start of each message, and a search
+# gives up after this many entries (narrow it with since/before or times)
+MAX_REGEX_LINE = 1000
+MAX_REGEX_SCANNED = 100_000
+
+# "{m,n}"; an exact count "{n}" does not multiply the ways to match
+_RANGE_REPEAT = re.compile(r"\{\d*,\d*\}")
+
+def _has_nested_quantifier(pattern: str) -> bool:
+    """
+    Whether a group holding a repetition is itself repeated, like ``(a*)*``,
+    the shape that makes backtracking take exponential time
+    """
+    repeated = [False]  # Per open group: whether it holds a repetition
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+            # A "]" right after "[" or "[^" is a literal
+            i += 2 if pattern.startswith("]", i + 1) else 3 if pattern.startswith("^]", i + 1) else 1
+            continue
+        elif char == "(":
+            repeated.append(False)
+        elif char == ")" and len(repeated) > 1:
+            inner = repeated.pop()
+            if inner and (pattern[i + 1:i + 2] in ("*", "+") or _RANGE_REPEAT.match(pattern, i + 1)):
+                return True
+            repeated[-1] = repeated[-1] or inner
+        elif char in "*+" or (char == "{" and _RANGE_REPEAT.match(pattern, i)):
+            repeated[-1] = True
+        i += 1
+    return False
+
+class _SearchTooLong(Exception):
+    pass
+
+async def _receive_audio(request: Request, job_id: str) -> StoredUpload:
+    """Stream the uploaded audio file of a request to the temp directory"""
+    def path_for(filename: str) -> Path:
+        # Validate file extension before anything is written
+        return settings.temp_dir / f"{job_id}{check_extension(filename)}"
+    
+    try:
+        return await receive_file(request, path_for, settings.max_file_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@router.post("/upload", response_model=ProcessingResponse, openapi_extra=FILE_UPLOAD_BODY)
 async def upload_audio(
-    file: UploadFile = File(...),
+    request: Request,
     model: str = "htdemucs"
 ):
     """
@@ -32,57 +108,32 @@ async def upload_audio(
     
     - **file**: Audio file to upload (WAV, MP3, FLAC, OGG, M4A, AAC)
     - **model**: Demucs model to use (default: htdemucs)
-    """
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type {file_ext} not supported. Allowed types: {', '.join(settings.allowed_extensions)}"
-        )
-    
-    # Check file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
     
-    if file_size > settings.max_file_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {settings.max_file_size / 1024 / 1024}MB"
-        )
-    
-    # Generate job ID and save file
+    The file is written to disk in chunks as it arrives, and refused as
+    soon as it exceeds the size limit.
+    """
+    # Generate job ID and stream the file to disk
     job_id = str(uuid.uuid4())
-    temp_path = settings.temp_dir / f"{job_id}{file_ext}"
+    upload = await _receive_audio(request, job_id)
+    temp_path = upload.path
     
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
         # Create job with uploaded status
         job = await db_job_service.create_job(
             job_id=job_id,
-            filename=file.filename,
+            filename=upload.filename,
             file_path=str(temp_path),
-            model=model
-        )
-        
-        # Update job status to uploaded
-        await db_job_service.update_job(
-            job_id,
-            status=ProcessingStatus.PENDING,
+            model=model,
             message="File uploaded successfully. Ready to process.",
-            progress=0
+            content_hash=upload.content_hash,
+            file_size=upload.size
         )
         
         return ProcessingResponse(
             job_id=job_id,
             status=ProcessingStatus.PENDING,
             message="File uploaded successfully. Ready to process.",
-            filename=file.filename
+            filename=upload.filename
         )
         
     except Exception as e:
@@ -128,7 +179,8 @@ async def start_processing(
         job_id,
         status=ProcessingStatus.PROCESSING,
         message="Processing started...",
-        progress=5
+        progress=5,
+        queued_at=datetime.utcnow()
     )
     
     return ProcessingResponse(
@@ -138,10 +190,10 @@ async def start_processing(
         filename=job["filename"]
     )
 
-@router.post("/process", response_model=ProcessingResponse)
+@router.post("/process", response_model=ProcessingResponse, openapi_extra=FILE_UPLOAD_BODY)
 async def process_audio(
+    request: Request,
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
     model: str = "htdemucs"
 ):
     """
@@ -150,41 +202,20 @@ async def process_audio(
     - **file**: Audio file to process (WAV, MP3, FLAC, OGG, M4A, AAC)
     - **model**: Demucs model to use (default: htdemucs)
     """
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type {file_ext} not supported. Allowed types: {', '.join(settings.allowed_extensions)}"
-        )
-    
-    # Check file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > settings.max_file_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {settings.max_file_size / 1024 / 1024}MB"
-        )
-    
-    # Generate job ID and save file
+    # Generate job ID and stream the file to disk
     job_id = str(uuid.uuid4())
-    temp_path = settings.temp_dir / f"{job_id}{file_ext}"
+    upload = await _receive_audio(request, job_id)
+    temp_path = upload.path
     
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
         # Create job
         job = await db_job_service.create_job(
             job_id=job_id,
-            filename=file.filename,
+            filename=upload.filename,
             file_path=str(temp_path),
-            model=model
+            model=model,
+            content_hash=upload.content_hash,
+            file_size=upload.size
         )
         
         # Process in background
@@ -199,7 +230,7 @@ async def process_audio(
             job_id=job_id,
             status=ProcessingStatus.PENDING,
             message="File uploaded successfully. Processing started.",
-            filename=file.filename
+            filename=upload.filename
         )
         
     except Exception as e:
@@ -213,7 +244,7 @@ async def list_stems(job_id: str):
     """
     List available stems for a completed job.
     """
-    job = await db_job_service.get_job(job_id)
+    job = await db_job_service.get_job_with_stems(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -223,8 +254,10 @@ async def list_stems(job_id: str):
             detail=f"Job is not completed. Current status: {job['status']}"
         )
     
-    # Get stems from database
-    stems = await db_job_service.get_stems(job_id)
+    stems = [
+        {"name": stem["name"], "filename": stem["filename"], "size": stem["size"]}
+        for stem in job["stems"]
+    ]
     
     return {"stems": stems}
 
@@ -236,7 +269,7 @@ async def download_stem(job_id: str, stem_name: str):
     - **job_id**: The job ID from processing
     - **stem_name**: Name of the stem (vocals, drums, bass, other)
     """
-    job = await db_job_service.get_job(job_id)
+    job = await db_job_service.get_job_with_stems(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -246,8 +279,7 @@ async def download_stem(job_id: str, stem_name: str):
             detail=f"Job is not completed. Current status: {job['status']}"
         )
     
-    # Get stems from database to find the file path
-    stems = await db_job_service.get_stems(job_id)
+    stems = job["stems"]
     stem_info = next((s for s in stems if s['name'] == stem_name), None)
     
     if not stem_info:
@@ -264,6 +296,8 @@ async def download_stem(job_id: str, stem_name: str):
     if not stem_file.exists():
         raise HTTPException(status_code=404, detail=f"Stem file '{stem_name}' not found")
     
+    await db_job_service.touch_job(job_id)
+    
     # Create proper filename: original_filename_stem.wav
     original_filename = Path(job["filename"]).stem  # Remove extension
     download_filename = f"{original_filename}_{stem_name}.wav"
@@ -284,7 +318,7 @@ async def download_all_stems(job_id: str):
     
     - **job_id**: The job ID from processing
     """
-    job = await db_job_service.get_job(job_id)
+    job = await db_job_service.get_job_with_stems(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -294,39 +328,35 @@ async def download_all_stems(job_id: str):
             detail=f"Job is not completed. Current status: {job['status']}"
         )
     
-    # Get stems from database to find the file path
-    stems = await db_job_service.get_stems(job_id)
+    stems = job["stems"]
     if not stems:
         raise HTTPException(status_code=404, detail="No stems found")
     
-    # Create a zip file containing all stems
-    import io
-    import zipfile
+    await db_job_service.touch_job(job_id)
     
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for stem in stems:
-            stem_name = stem['name']
-            
-            # Use file path from database or fallback to constructed path
-            stem_file = Path(stem.get('file_path')) if 'file_path' in stem else None
-            
-            if not stem_file or not stem_file.exists():
-                output_dir = Path(job["output_dir"])
-                stem_file = output_dir / f"{stem_name}.wav"
-            
-            if not stem_file.exists():
-                continue
-                
-            # Create proper filename: original_filename_stem.wav
-            original_filename = Path(job["filename"]).stem
-            download_filename = f"{original_filename}_{stem_name}.wav"
+    # Collect the stem files; the zip is written while it is being sent
+    entries = []
+    for stem in stems:
+        stem_name = stem['name']
+        
+        # Use file path from database or fallback to constructed path
+        stem_file = Path(stem.get('file_path')) if 'file_path' in stem else None
+        
+        if not stem_file or not stem_file.exists():
+            output_dir = Path(job["output_dir"])
+            stem_file = output_dir / f"{stem_name}.wav"
+        
+        if not stem_file.exists():
+            continue
             
-            zip_file.write(stem_file, download_filename)
+        # Create proper filename: original_filename_stem.wav
+        original_filename = Path(job["filename"]).stem
+        download_filename = f"{original_filename}_{stem_name}.wav"
+        
+        entries.append((stem_file, download_filename))
     
-    zip_buffer.seek(0)
     return StreamingResponse(
-        iter([zip_buffer.getvalue()]),
+        stream_zip(entries),
         media_type="application/zip",
         headers={
             "Content-Disposition": f"attachment; filename={Path(job['filename']).stem}_stems.zip"
@@ -344,35 +374,8 @@ async def delete_job(job_id: str):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Clean up files
-    try:
-        file_path = Path(job["file_path"])
-        if file_path.exists():
-            file_path.unlink()
-            print(f"Deleted original file: {file_path}")
-    except Exception as e:
-        print(f"Error deleting original file: {e}")
-    
-    # Clean up output directory (separated files)
-    try:
-        # Delete the entire job directory, not just the output_dir
-        job_dir = settings.output_dir / job_id
-        if job_dir.exists():
-            import shutil
-            shutil.rmtree(job_dir)
-            print(f"Deleted job directory: {job_dir}")
-        else:
-            print(f"Job directory not found: {job_dir}")
-            
-        # Also try to delete using the output_dir path if it exists and is different
-        if job.get("output_dir"):
-            output_dir = Path(job["output_dir"])
-            if output_dir.exists() and output_dir != job_dir:
-                import shutil
-                shutil.rmtree(output_dir)
-                print(f"Deleted output directory: {output_dir}")
-    except Exception as e:
-        print(f"Error deleting directories: {e}")
+    # Clean up the uploaded file and separated output
+    await asyncio.to_thread(remove_job_files, job)
     
     # Delete job from database
     success = await db_job_service.delete_job(job_id)
@@ -383,21 +386,97 @@ async def delete_job(job_id: str):
     return {"message": "Job deleted successfully"} 
 
 @router.get("/logs/{job_id}")
-async def get_job_logs(job_id: str):
+async def get_job_logs(
+    job_id: str,
+    since: Optional[int] = None,
+    limit: Optional[int] = None,
+    before: Optional[int] = None,
+    level: Optional[List[str]] = Query(None),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    q: Optional[str] = None,
+    regex: bool = False
+):
     """
-    Get all logs for a specific job.
+    Get logs for a specific job, optionally filtered.
     
     - **job_id**: The job ID to get logs for
+    - **since**: Only return logs after this sequence number (the ``seq`` of
+      the last entry already seen)
+    - **limit**: Return at most this many entries; page on with ``since``
+    - **before**: Only return logs before this sequence number
+    - **level**: Only these levels (repeat the parameter or separate with commas)
+    - **start_time** / **end_time**: Only logs written in this time range
+    - **q**: Only messages containing this text (case-insensitive), or
+      matching it as a regular expression with **regex**
+    
+    Filtered queries return pages of up to 500 entries by default; when a
+    page is full, ``next_since`` is the ``since`` for the next one. Older
+    entries are read from the job's log file, so they are available after a
+    restart and from any worker process.
     """
     job = await db_job_service.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    logs = log_capture.get_logs(job_id)
+    filtered = before is not None or level or start_time or end_time or q
+    if not filtered:
+        logs = await asyncio.to_thread(log_capture.get_logs_since, job_id, since or 0, limit)
+        return {
+            "job_id": job_id,
+            "logs": logs,
+            "total_logs": len(logs)
+        }
+    
+    predicate = None
+    if q:
+        if len(q) > MAX_QUERY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Search text is limited to {MAX_QUERY_LENGTH} characters")
+        if regex:
+            try:
+                pattern = re.compile(q)
+            except re.error as e:
+                raise HTTPException(status_code=400, detail=f"Invalid regular expression: {e}")
+            if _has_nested_quantifier(q):
+                raise HTTPException(status_code=400, detail="Repeated groups may not contain repetitions")
+            scanned = 0
+            
+            def predicate(record) -> bool:
+                nonlocal scanned
+                scanned += 1
+                if scanned > MAX_REGEX_SCANNED:
+                    raise _SearchTooLong()
+                return pattern.search(record[3], 0, MAX_REGEX_LINE) is not None
+        else:
+            needle = q.casefold()
+            predicate = lambda record: needle in record[3].casefold()
+    levels = None
+    if level:
+        levels = [name.strip().upper() for value in level for name in value.split(",") if name.strip()]
+    
+    limit = LOG_QUERY_PAGE if limit is None else limit
+    try:
+        logs = await asyncio.to_thread(
+            log_capture.query,
+            job_id,
+            since or 0,
+            before,
+            levels,
+            start_time.timestamp() if start_time else None,
+            end_time.timestamp() if end_time else None,
+            predicate,
+            limit
+        )
+    except _SearchTooLong:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Regular expression searches stop after {MAX_REGEX_SCANNED} entries; narrow the range"
+        )
     return {
         "job_id": job_id,
         "logs": logs,
-        "total_logs": len(logs)
+        "total_logs": len(logs),
+        "next_since": logs[-1]["seq"] if logs and len(logs) >= limit else None
     }
 
 @router.delete("/logs/{job_id}")
@@ -411,7 +490,7 @@ async def clear_job_logs(job_id: str):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    log_capture.clear_logs(job_id)
+    await asyncio.to_thread(log_capture.clear_logs, job_id)
     return {"message": f"Logs cleared for job {job_id}"}
 
 @router.get("/logs/{job_id}/latest")
@@ -426,83 +505,119 @@ async def get_latest_logs(job_id: str, limit: int = 50):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    all_logs = log_capture.get_logs(job_id)
-    latest_logs = all_logs[-limit:] if len(all_logs) > limit else all_logs
+    latest_logs = await asyncio.to_thread(log_capture.get_latest, job_id, limit)
     
     return {
         "job_id": job_id,
         "logs": latest_logs,
-        "total_logs": len(all_logs),
+        "total_logs": await asyncio.to_thread(log_capture.count, job_id),
         "showing": len(latest_logs)
     }
 
 @router.get("/logs/{job_id}/stream")
-async def stream_job_logs(job_id: str):
+async def stream_job_logs(job_id: str, request: Request, last_event_id: Optional[int] = None):
     """
-    Stream logs for a specific job using Server-Sent Events (SSE).
+    Stream logs and status changes for a job using Server-Sent Events (SSE).
     
     - **job_id**: The job ID to stream logs for
-    """
-    import asyncio
-    import json
-    from datetime import datetime
+    - **last_event_id**: Resume after this log sequence number; reconnecting
+      browsers send it as the Last-Event-ID header, which takes precedence
     
+    Events are pushed as they happen. ``log`` events carry their sequence
+    number as the event id; ``status`` events follow job status and
+    progress. The stream ends shortly after the job finishes.
+    """
     job = await db_job_service.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    header = request.headers.get("last-event-id", "")
+    resume_from = int(header) if header.isdigit() else (last_event_id or 0)
+    
+    def status_event(state: dict) -> dict:
+        return {
+            "event": "status",
+            "data": json.dumps({key: state.get(key) for key in ("status", "progress", "message")})
+        }
+    
     async def log_generator():
-        last_log_count = 0
-        max_iterations = 600  # 5 minutes max (600 * 0.5 seconds)
-        iteration = 0
+        # Subscribe before reading anything, so nothing falls in between
+        queue = job_streams.subscribe(job_id)
+        last_seq = resume_from
+        state = dict(job)
+        closing_at = None  # Set once the job has finished
+        loop = asyncio.get_running_loop()
         
-        # Send initial connection confirmation
-        yield {
-            "event": "connected",
-            "data": json.dumps({"job_id": job_id, "message": "Log stream connected"})
-        }
+        async def catch_up():
+            nonlocal last_seq
+            while True:
+                # Long histories come from the log file, a page at a time
+                page = await asyncio.to_thread(log_capture.get_logs_since, job_id, last_seq, CATCH_UP_PAGE)
+                for log_entry in page:
+                    yield {"event": "log", "id": str(log_entry["seq"]), "data": json.dumps(log_entry)}
+                    last_seq = log_entry["seq"]
+                if len(page) < CATCH_UP_PAGE:
+                    return
         
-        while iteration < max_iterations:
-            try:
-                # Get current logs
-                current_logs = log_capture.get_logs(job_id)
-                
-                # Send new logs since last check
-                if len(current_logs) > last_log_count:
-                    new_logs = current_logs[last_log_count:]
-                    for log_entry in new_logs:
-                        yield {
-                            "event": "log",
-                            "data": json.dumps(log_entry)
-                        }
-                    last_log_count = len(current_logs)
-                
-                # Check if job is complete
-                job_status = await db_job_service.get_job(job_id)
-                if job_status and job_status.get("status") in ["completed", "failed"]:
-                    # Send final status and stop streaming
-                    yield {
-                        "event": "status",
-                        "data": json.dumps({"status": job_status.get("status"), "message": "Job completed"})
-                    }
-                    break
-                
-                # Send heartbeat every 10 iterations (5 seconds)
-                if iteration % 10 == 0:
+        try:
+            # Send initial connection confirmation
+            yield {
+                "event": "connected",
+                "data": json.dumps({"job_id": job_id, "message": "Log stream connected", "resumed_from": last_seq})
+            }
+            async for event in catch_up():
+                yield event
+            yield status_event(state)
+            if state["status"] in FINISHED_STATUSES:
+                return
+            
+            while True:
+                timeout = settings.sse_heartbeat_interval
+                if closing_at is not None:
+                    timeout = closing_at - loop.time()
+                    if timeout <= 0:
+                        yield status_event(state)
+                        return
+                try:
+                    kind, payload = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if closing_at is not None:
+                        continue
+                    # May read the job's log file when it is not in memory
+                    logs_count = await asyncio.to_thread(log_capture.count, job_id)
                     yield {
                         "event": "heartbeat",
-                        "data": json.dumps({"timestamp": datetime.now().isoformat(), "logs_count": len(current_logs)})
+                        "data": json.dumps({"timestamp": datetime.now().isoformat(), "logs_count": logs_count})
                     }
+                    # Changes made by other worker processes are not pushed on SQLite
+                    current = await db_job_service.get_job(job_id)
+                    if current is None:
+                        state["status"] = "deleted"
+                        closing_at = loop.time()
+                    elif current["status"] != state["status"]:
+                        state.update(current)
+                        yield status_event(state)
+                        if state["status"] in FINISHED_STATUSES:
+                            closing_at = loop.time() + settings.sse_close_grace
+                    continue
                 
-                # Wait before next check - more frequent for active processing
-                await asyncio.sleep(0.2)  # Check 5 times per second for immediate updates
-                iteration += 1
-                
-            except Exception as e:
-                yield {
-                    "event": "error", 
-                    "data": json.dumps({"error": str(e)})
-                }
-                break
-    
-    return EventSourceResponse(log_generator()) 
\ No newline at end of file
+                if kind == "log":
+                    if payload["seq"] > last_seq:
+                        last_seq = payload["seq"]
+                        yield {"event": "log", "id": str(last_seq), "data": json.dumps(payload)}
+                elif kind == "resync":
+                    async for event in catch_up():
+                        yield event
+                elif payload.get("deleted"):
+                    state["status"] = "deleted"
+                    closing_at = loop.time()
+                else:
+                    state.update({key: payload[key] for key in ("status", "progress", "message") if key in payload})
+                    yield status_event(state)
+                    if closing_at is None and state["status"] in FINISHED_STATUSES:
+                        # Final log lines are written right after the status changes
+                        closing_at = loop.time() + settings.sse_close_grace
+        finally:
+            job_streams.unsubscribe(job_id, queue)
+    
+    return EventSourceResponse(log_generator())
@@ -0,0 +1,278 @@
+"""
+Batch processing endpoints (albums, folders, zip archives)
+"""
+import asyncio
+import hashlib
+import uuid
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.audio_processor import AudioProcessor
+from app.services.db_job_service import db_job_service
+from app.services.zip_stream import stream_zip
+from app.models.audio import (
+    BatchResponse,
+    BatchStatus,
+    JobStatus,
+    ProcessingResponse,
+    ProcessingStatus,
+)
+
+router = APIRouter()
+audio_processor = AudioProcessor()
+
+class _SavedFile(NamedTuple):
+    job_id: str
+    filename: str
+    path: Path
+    size: int
+    content_hash: str  # SHA-256, hex
+
+def _save_upload(source, job_id: str, filename: str) -> _SavedFile:
+    """Copy an uploaded file object to the temp directory, hashing it on the way (blocking)"""
+    temp_path = settings.temp_dir / f"{job_id}{Path(filename).suffix.lower()}"
+    content_hash = hashlib.sha256()
+    size = 0
+    with open(temp_path, "wb") as f:
+        while chunk := source.read(settings.upload_chunk_size):
+            f.write(chunk)
+            content_hash.update(chunk)
+            size += len(chunk)
+    return _SavedFile(job_id, filename, temp_path, size, content_hash.hexdigest())
+
+def _batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Batch too large. Maximum size: {settings.max_file_size / 1024 / 1024}MB"
+    )
+
+def _save_zip_members(source, upload_name: str, saved: List[_SavedFile], total_size: int) -> int:
+    """
+    Extract the audio files of a zip to the temp directory (blocking).
+
+    Each file is appended to ``saved`` as soon as it is written, so the
+    caller can clean up after a failure part way. Returns the new total size.
+    """
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {upload_name}")
+
+    with archive:
+        for info in archive.infolist():
+            if not _is_audio_member(info):
+                continue
+            total_size += info.file_size
+            if total_size > settings.max_file_size:
+                raise _batch_too_large()
+            job_id = str(uuid.uuid4())
+            filename = Path(info.filename).name
+            with archive.open(info) as member:
+                saved.append(_save_upload(member, job_id, filename))
+    return total_size
+
+def _is_audio_member(info: zipfile.ZipInfo) -> bool:
+    """Check whether a zip member is an audio file we can process"""
+    name = Path(info.filename)
+    if info.is_dir() or name.name.startswith(".") or "__MACOSX" in name.parts:
+        return False
+    return name.suffix.lower() in settings.allowed_extensions
+
+@router.post("/", response_model=BatchResponse)
+async def create_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    model: str = "htdemucs",
+    name: Optional[str] = None
+):
+    """
+    Upload several audio files (or one zip of them) and process them as a batch.
+
+    - **files**: Audio files, or a single .zip archive containing audio files
+    - **model**: Demucs model to use for every file (default: htdemucs)
+    - **name**: Optional display name for the batch (e.g. album title)
+    """
+    batch_id = str(uuid.uuid4())
+    saved: List[_SavedFile] = []
+    total_size = 0
+
+    try:
+        for upload in files:
+            file_ext = Path(upload.filename).suffix.lower()
+
+            # Copying and unzipping block, so they run in a worker thread
+            if file_ext == ".zip":
+                total_size = await asyncio.to_thread(
+                    _save_zip_members, upload.file, upload.filename, saved, total_size
+                )
+                continue
+
+            if file_ext not in settings.allowed_extensions:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File type {file_ext} not supported. Allowed types: {', '.join(settings.allowed_extensions)}"
+                )
+
+            upload.file.seek(0, 2)
+            total_size += upload.file.tell()
+            upload.file.seek(0)
+            if total_size > settings.max_file_size:
+                raise _batch_too_large()
+
+            job_id = str(uuid.uuid4())
+            saved.append(await asyncio.to_thread(_save_upload, upload.file, job_id, upload.filename))
+
+        if not saved:
+            raise HTTPException(status_code=400, detail="No supported audio files in batch")
+
+        await db_job_service.create_batch(
+            batch_id=batch_id,
+            name=name,
+            model=model,
+            total_jobs=len(saved)
+        )
+        for file in saved:
+            await db_job_service.create_job(
+                job_id=file.job_id,
+                filename=file.filename,
+                file_path=str(file.path),
+                model=model,
+                batch_id=batch_id,
+                content_hash=file.content_hash,
+                file_size=file.size
+            )
+
+    except Exception as e:
+        for file in saved:
+            file.path.unlink(missing_ok=True)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # One demucs run for the whole batch so the model is loaded once
+    background_tasks.add_task(
+        audio_processor.process_batch,
+        batch_id=batch_id,
+        model=model
+    )
+
+    return BatchResponse(
+        batch_id=batch_id,
+        status=ProcessingStatus.PENDING,
+        message=f"{len(saved)} files uploaded successfully. Processing started.",
+        total_jobs=len(saved),
+        jobs=[
+            ProcessingResponse(
+                job_id=file.job_id,
+                status=ProcessingStatus.PENDING,
+                message="Queued in batch",
+                filename=file.filename
+            )
+            for file in saved
+        ]
+    )
+
+@router.get("/{batch_id}", response_model=BatchStatus)
+async def get_batch_status(batch_id: str):
+    """
+    Get aggregated progress, ETA and child job statuses for a batch.
+    """
+    batch = await db_job_service.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    jobs = await db_job_service.get_batch_jobs(batch_id)
+    terminal = [ProcessingStatus.COMPLETED.value, ProcessingStatus.FAILED.value, ProcessingStatus.CANCELLED.value]
+
+    # Finished children count as 100% so failures don't stall the aggregate
+    progress = 0.0
+    if jobs:
+        progress = sum(
+            100.0 if job["status"] in terminal else (job.get("progress") or 0)
+            for job in jobs
+        ) / len(jobs)
+
+    eta_seconds = None
+    if batch.get("started_at") and 0 < progress < 100 and batch["status"] == ProcessingStatus.PROCESSING.value:
+        elapsed = (datetime.utcnow() - batch["started_at"]).total_seconds()
+        eta_seconds = round(elapsed * (100 - progress) / progress, 1)
+
+    return BatchStatus(
+        batch_id=batch["batch_id"],
+        name=batch.get("name"),
+        model=batch["model"],
+        status=batch["status"],
+        progress=round(progress, 1),
+        message=batch.get("message") or "",
+        total_jobs=batch["total_jobs"],
+        completed_jobs=sum(1 for job in jobs if job["status"] == ProcessingStatus.COMPLETED.value),
+        failed_jobs=sum(1 for job in jobs if job["status"] == ProcessingStatus.FAILED.value),
+        eta_seconds=eta_seconds,
+        created_at=batch["created_at"],
+        started_at=batch.get("started_at"),
+        completed_at=batch.get("completed_at"),
+        error=batch.get("error"),
+        jobs=[
+            JobStatus(
+                job_id=job["job_id"],
+                status=job["status"],
+                progress=job.get("progress", 0),
+                message=job.get("message") or "",
+                filename=job["filename"],
+                created_at=job["created_at"],
+                updated_at=job.get("updated_at"),
+                completed_at=job.get("completed_at"),
+                error=job.get("error")
+            )
+            for job in jobs
+        ]
+    )
+
+@router.get("/{batch_id}/download")
+async def download_batch(batch_id: str):
+    """
+    Download the stems of every completed job in a batch as one zip.
+
+    Each track gets its own folder named after the original file.
+    """
+    batch = await db_job_service.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    jobs = [
+        job for job in await db_job_service.get_batch_jobs(batch_id)
+        if job["status"] == ProcessingStatus.COMPLETED.value
+    ]
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No completed jobs in batch")
+
+    entries = []
+    used_folders = set()
+    for job in jobs:
+        original_filename = Path(job["filename"]).stem
+        folder = original_filename
+        # Albums can contain the same file name twice (e.g. disc 1/2)
+        if folder in used_folders:
+            folder = f"{original_filename}_{job['job_id'][:8]}"
+        used_folders.add(folder)
+
+        await db_job_service.touch_job(job["job_id"])
+        for stem in await db_job_service.get_stems(job["job_id"]):
+            # Files removed by the time the zip gets to them are left out
+            stem_file = Path(job["output_dir"]) / stem["filename"]
+            entries.append((stem_file, f"{folder}/{original_filename}_{stem['name']}.wav"))
+
+    archive_name = batch.get("name") or f"batch_{batch_id[:8]}"
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={archive_name}_stems.zip"
+        }
+    )
@@ -0,0 +1,105 @@
+"""
+WebSocket feed of job changes
+"""
+import asyncio
+import json
+from typing import Any, Dict
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+from app.services.job_feed import FeedSubscriber, job_feed
+
+router = APIRouter()
+
+async def _apply(subscriber: FeedSubscriber, command: Dict[str, Any]):
+    """Handle one client command, queueing its answer on the subscriber"""
+    op = command.get("op")
+    if op not in ("subscribe", "unsubscribe"):
+        subscriber.notice("error", f"Unknown op: {op!r}")
+        return
+    if "logs" in command:
+        subscriber.logs = bool(command["logs"])
+    if command.get("interval") is not None:
+        subscriber.interval = min(max(float(command["interval"]), settings.ws_interval), settings.ws_max_interval)
+
+    job_ids = list(dict.fromkeys(str(job_id) for job_id in command.get("job_ids") or []))
+    if op == "unsubscribe":
+        if command.get("all"):
+            subscriber.all_jobs = False
+            subscriber.job_ids.clear()
+        subscriber.job_ids.difference_update(job_ids)
+        return
+
+    if command.get("all"):
+        subscriber.all_jobs = True
+    new_ids = [job_id for job_id in job_ids if job_id not in subscriber.job_ids]
+    if len(subscriber.job_ids) + len(new_ids) > settings.ws_max_jobs:
+        subscriber.notice("error", f"At most {settings.ws_max_jobs} job IDs per connection")
+        return
+    if not new_ids:
+        return
+    # Follow first, then read, so no change falls in between
+    subscriber.job_ids.update(new_ids)
+    jobs = await db_job_service.get_jobs(new_ids)
+    for job_id in new_ids:
+        if job_id in jobs:
+            subscriber.add_state(job_id, jobs[job_id])
+    not_found = [job_id for job_id in new_ids if job_id not in jobs]
+    if not_found:
+        subscriber.job_ids.difference_update(not_found)
+        subscriber.notice("not_found", not_found)
+
+@router.websocket("/ws")
+async def job_feed_socket(websocket: WebSocket):
+    """
+    Status, progress and log changes of many jobs over one connection.
+
+    Send JSON commands:
+
+    - ``{"op": "subscribe", "job_ids": [...]}`` to follow jobs (their
+      current state is sent first), or ``{"op": "subscribe", "all": true}``
+      for changes to every job
+    - ``{"op": "unsubscribe", "job_ids": [...]}`` or ``{"op": "unsubscribe", "all": true}``
+    - optional on either: ``"logs": false`` to leave out log records and
+      ``"interval"`` (seconds) to receive messages less often
+
+    Changes are batched per client: at most one message per interval of the
+    form ``{"type": "update", "jobs": {job_id: delta}}``, where a delta has
+    the changed ``status``/``progress``/``message`` fields, ``deleted``, and
+    new ``logs`` as ``[seq, level, message]``; ``logs_skipped`` counts records
+    left out of a busy job's delta (fetch them from ``/api/audio/logs``).
+    ``not_found`` and ``error`` report problems with the last command.
+    """
+    await websocket.accept()
+    subscriber = FeedSubscriber(settings.ws_interval, settings.ws_max_logs)
+    job_feed.connect(subscriber)
+
+    async def send_updates():
+        while True:
+            await subscriber.ready.wait()
+            await websocket.send_json(subscriber.take())
+            # Whatever arrives meanwhile goes out together in the next message
+            await asyncio.sleep(subscriber.interval)
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                command = json.loads(text)
+                if not isinstance(command, dict):
+                    raise ValueError("Commands are JSON objects")
+                await _apply(subscriber, command)
+            except (ValueError, TypeError) as e:
+                subscriber.notice("error", f"Invalid command: {e}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job_feed.disconnect(subscriber)
+        sender.cancel()
+        try:
+            await sender
+        except (asyncio.CancelledError, Exception):
+            pass
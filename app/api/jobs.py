@@ -1,23 +1,22 @@
 """
 Job management endpoints
 """
-from typing import List
-from fastapi import APIRouter, HTTPException
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Response
 
+from app.core.config import settings
+from app.core.database import query_counter
 from app.services.db_job_service import db_job_service
-from app.models.audio import JobInfo, JobStatus
+from app.services.job_cache import job_cache
+from app.services.metrics import summarize
+from app.services.storage import remove_job_files
+from app.models.audio import BulkJobResult, BulkJobStatus, JobIdsRequest, JobInfo, JobStats, JobStatus
 
 router = APIRouter()
 
-@router.get("/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
-    """
-    Get the status of a processing job.
-    """
-    job = await db_job_service.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
+def _job_status(job: Dict[str, Any], metrics: Optional[Dict[str, Any]]) -> JobStatus:
     return JobStatus(
         job_id=job["job_id"],
         status=job["status"],
@@ -27,23 +26,184 @@ async def get_job_status(job_id: str):
         created_at=job["created_at"],
         updated_at=job.get("updated_at"),
         completed_at=job.get("completed_at"),
-        error=job.get("error")
+        error=job.get("error"),
+        attempts=job.get("attempts", 0),
+        next_retry_at=job.get("next_retry_at"),
+        metrics=metrics
+    )
+
+def _unique_job_ids(request: JobIdsRequest) -> List[str]:
+    """Request job IDs without duplicates, in request order"""
+    job_ids = list(dict.fromkeys(request.job_ids))
+    if len(job_ids) > settings.bulk_max_jobs:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.bulk_max_jobs} job IDs per request"
+        )
+    return job_ids
+
+@router.get("/stats", response_model=JobStats)
+async def get_job_stats():
+    """
+    Get job counts per status, throughput and average processing time.
+    
+    Served from incrementally maintained counters, so the cost does not
+    grow with the number of jobs.
+    """
+    return await db_job_service.get_job_stats()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get job cache effectiveness: hits, misses, hit rate and invalidations,
+    plus the number of statements this process has sent to the database.
+    """
+    return {
+        "cache": job_cache.stats(),
+        "db_queries": query_counter.count,
+    }
+
+@router.post("/bulk/status", response_model=BulkJobStatus)
+async def get_job_statuses(request: JobIdsRequest):
+    """
+    Get the status of several jobs at once.
+    
+    - **job_ids**: Job IDs to look up
+    
+    Replaces one GET /api/jobs/{job_id} per job: jobs and their metrics are
+    each loaded with a single query.
+    """
+    job_ids = _unique_job_ids(request)
+    jobs = await db_job_service.get_jobs(job_ids)
+    metrics = await db_job_service.get_jobs_metrics(list(jobs))
+    
+    return BulkJobStatus(
+        jobs=[_job_status(jobs[job_id], metrics.get(job_id)) for job_id in job_ids if job_id in jobs],
+        not_found=[job_id for job_id in job_ids if job_id not in jobs]
     )
 
+@router.post("/bulk/cancel", response_model=BulkJobResult)
+async def cancel_jobs(request: JobIdsRequest):
+    """
+    Cancel several pending or processing jobs.
+    
+    - **job_ids**: Job IDs to cancel
+    
+    Jobs in other states are reported under ``skipped``.
+    """
+    job_ids = _unique_job_ids(request)
+    jobs = await db_job_service.get_jobs(job_ids)
+    found = [job_id for job_id in job_ids if job_id in jobs]
+    
+    cancelled = set()
+    for start in range(0, len(found), settings.bulk_batch_size):
+        chunk = found[start:start + settings.bulk_batch_size]
+        cancelled.update(await db_job_service.cancel_jobs(chunk, "Job cancelled by user"))
+    
+    return BulkJobResult(
+        succeeded=[job_id for job_id in found if job_id in cancelled],
+        not_found=[job_id for job_id in job_ids if job_id not in jobs],
+        skipped={
+            job_id: f"Cannot cancel job with status: {jobs[job_id]['status']}"
+            for job_id in found if job_id not in cancelled
+        }
+    )
+
+@router.post("/bulk/delete", response_model=BulkJobResult)
+async def delete_jobs(request: JobIdsRequest):
+    """
+    Delete several jobs and clean up their files.
+    
+    - **job_ids**: Job IDs to delete
+    
+    Rows are deleted in batched transactions; files are removed on worker
+    threads, concurrently.
+    """
+    job_ids = _unique_job_ids(request)
+    jobs = await db_job_service.get_jobs(job_ids)
+    found = [job_id for job_id in job_ids if job_id in jobs]
+    
+    for start in range(0, len(found), settings.bulk_batch_size):
+        chunk = found[start:start + settings.bulk_batch_size]
+        # Rows first so nothing new starts reading, then the files
+        await db_job_service.delete_jobs(chunk)
+        await asyncio.gather(*(asyncio.to_thread(remove_job_files, jobs[job_id]) for job_id in chunk))
+    
+    return BulkJobResult(
+        succeeded=found,
+        not_found=[job_id for job_id in job_ids if job_id not in jobs]
+    )
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """
+    Get the status of a processing job.
+    """
+    job = await db_job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    metrics = await db_job_service.get_job_metrics(job_id)
+    
+    return _job_status(job, metrics)
+
+@router.get("/metrics/summary")
+async def get_metrics_summary(
+    group_by: str = "model",
+    since_hours: Optional[int] = None,
+    limit: int = 10000
+):
+    """
+    Aggregate per-job resource metrics for capacity planning.
+    
+    - **group_by**: Group by "model" or "preset"
+    - **since_hours**: Only include jobs processed in the last N hours
+    - **limit**: Maximum number of most recent jobs to aggregate
+    """
+    if group_by not in ("model", "preset"):
+        raise HTTPException(status_code=400, detail="group_by must be 'model' or 'preset'")
+    
+    since = datetime.utcnow() - timedelta(hours=since_hours) if since_hours else None
+    rows = await db_job_service.list_job_metrics(since=since, limit=limit)
+    
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[group_by], []).append(row)
+    
+    return {
+        "group_by": group_by,
+        "total_jobs": len(rows),
+        "groups": {name: summarize(group_rows) for name, group_rows in groups.items()},
+    }
+
 @router.get("/", response_model=List[JobInfo])
 async def list_jobs(
+    response: Response,
     status: str = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
     """
-    List all jobs with optional filtering by status.
+    List all jobs with optional filtering by status, newest first.
     
     - **status**: Filter by job status (pending, processing, completed, failed)
     - **limit**: Maximum number of jobs to return
-    - **offset**: Number of jobs to skip
+    - **offset**: Number of jobs to skip (slow for deep pages; prefer cursor)
+    - **cursor**: Value of the X-Next-Cursor header from the previous page
+    
+    Unless offset is used, the X-Next-Cursor response header carries the
+    cursor for the next page; it is absent on the last page.
     """
-    jobs = await db_job_service.list_jobs(status=status, limit=limit, offset=offset)
+    if offset and not cursor:
+        jobs = await db_job_service.list_jobs(status=status, limit=limit, offset=offset)
+    else:
+        try:
+            jobs, next_cursor = await db_job_service.list_jobs_page(status=status, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         JobInfo(
@@ -0,0 +1,224 @@
+"""
+Resumable upload endpoints
+"""
+import asyncio
+import re
+import uuid
+from datetime import datetime
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any, Dict
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.services.content_reuse import create_from_existing
+from app.services.db_job_service import db_job_service
+from app.services.upload_sessions import upload_sessions
+from app.services.uploads import UploadError, check_extension, too_large
+from app.models.audio import (
+    ProcessingResponse,
+    ProcessingStatus,
+    UploadNegotiation,
+    UploadNegotiationRequest,
+    UploadSessionRequest,
+    UploadSessionStatus,
+)
+
+router = APIRouter()
+
+CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+def _get_session(upload_id: str) -> Dict[str, Any]:
+    state = upload_sessions.get(upload_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return state
+
+def _check_file(filename: str, length: int):
+    try:
+        check_extension(filename)
+        if length > settings.max_file_size:
+            raise too_large(settings.max_file_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if length <= 0:
+        raise HTTPException(status_code=400, detail="Upload length must be positive")
+
+def _upload_url(state: Dict[str, Any]) -> str:
+    return f"/api/uploads/{state['session_id']}"
+
+def _offset_headers(state: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "Upload-Offset": str(state["offset"]),
+        "Upload-Length": str(state["length"]),
+        "Upload-Expires": formatdate(state["expires_at"], usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+def _status(state: Dict[str, Any]) -> UploadSessionStatus:
+    return UploadSessionStatus(
+        upload_id=state["session_id"],
+        filename=state["filename"],
+        length=state["length"],
+        model=state["model"],
+        offset=state["offset"],
+        received=state["received"],
+        ranges=[list(r) for r in state["ranges"]],
+        expires_at=datetime.utcfromtimestamp(state["expires_at"]),
+    )
+
+@router.post("/", response_model=UploadSessionStatus, status_code=201)
+async def create_upload(body: UploadSessionRequest, response: Response):
+    """
+    Start a resumable upload.
+
+    - **filename**: Name of the audio file (WAV, MP3, FLAC, OGG, M4A, AAC)
+    - **length**: File size in bytes
+    - **model**: Demucs model for the job (default: htdemucs)
+
+    Send the file with ``PATCH`` requests to the URL in ``Location``, each
+    with an ``Upload-Offset`` header giving where its body goes. Chunks may
+    be sent in any order and in parallel. ``HEAD`` on the URL returns the
+    ``Upload-Offset`` to resume from, and ``POST {url}/finalize`` turns the
+    complete file into a pending job. Uploads idle for
+    ``upload_session_ttl`` seconds are discarded.
+    """
+    _check_file(body.filename, body.length)
+    state = await asyncio.to_thread(upload_sessions.create, Path(body.filename).name, body.length, body.model)
+    response.headers.update(_offset_headers(state))
+    response.headers["Location"] = _upload_url(state)
+    return _status(state)
+
+@router.post("/negotiate", response_model=UploadNegotiation)
+async def negotiate_upload(body: UploadNegotiationRequest, response: Response):
+    """
+    Offer a file by its SHA-256 before uploading it.
+
+    - **content_hash**: SHA-256 of the file, hex
+    - **length**: File size in bytes
+    - **filename**: Name of the audio file
+    - **model**: Demucs model for the job (default: htdemucs)
+
+    If this content was processed with the same model before, a completed
+    job sharing that result is created at once (``reused_result``). If the
+    file is still on disk from an earlier upload, a pending job is created
+    on it (``reused_source``; start it with ``POST /api/audio/process/{job_id}``).
+    Otherwise ``upload`` returns a resumable upload in ``upload_url``, whose
+    finalize checks the file against ``content_hash``.
+    """
+    content_hash = body.content_hash.lower()
+    if not CONTENT_HASH.match(content_hash):
+        raise HTTPException(status_code=400, detail="content_hash must be a hex SHA-256")
+    _check_file(body.filename, body.length)
+    filename = Path(body.filename).name
+
+    job_id = str(uuid.uuid4())
+    reused = await create_from_existing(job_id, content_hash, body.length, filename, body.model)
+    if reused is not None:
+        action, job = reused
+        return UploadNegotiation(
+            action=action,
+            job=ProcessingResponse(
+                job_id=job_id,
+                status=job["status"],
+                message=job["message"],
+                filename=filename
+            )
+        )
+
+    state = await asyncio.to_thread(upload_sessions.create, filename, body.length, body.model, content_hash)
+    response.status_code = 201
+    response.headers.update(_offset_headers(state))
+    response.headers["Location"] = _upload_url(state)
+    return UploadNegotiation(action="upload", upload_id=state["session_id"], upload_url=_upload_url(state))
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    """The offset to resume from, in ``Upload-Offset``"""
+    state = await asyncio.to_thread(_get_session, upload_id)
+    return Response(headers=_offset_headers(state))
+
+@router.get("/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload(upload_id: str, response: Response):
+    """Progress of an upload, including every byte range received so far"""
+    state = await asyncio.to_thread(_get_session, upload_id)
+    response.headers.update(_offset_headers(state))
+    return _status(state)
+
+@router.patch("/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset")
+):
+    """
+    Write the request body into the upload at ``Upload-Offset``.
+
+    The body is raw file data (``application/offset+octet-stream``). If the
+    connection drops, the part that arrived is kept; ``HEAD`` tells where to
+    continue.
+    """
+    try:
+        await upload_sessions.write(upload_id, upload_offset, request.stream())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except ClientDisconnect:
+        return Response(status_code=400)
+    state = await asyncio.to_thread(_get_session, upload_id)
+    return Response(status_code=204, headers=_offset_headers(state))
+
+@router.post("/{upload_id}/finalize", response_model=ProcessingResponse)
+async def finalize_upload(upload_id: str):
+    """
+    Turn a complete upload into a job (does not start processing).
+
+    Start it with ``POST /api/audio/process/{job_id}``.
+    """
+    state = await asyncio.to_thread(_get_session, upload_id)
+    if state["offset"] < state["length"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {state['received']} of {state['length']} bytes received"
+        )
+
+    job_id = str(uuid.uuid4())
+    temp_path = settings.temp_dir / f"{job_id}{Path(state['filename']).suffix.lower()}"
+    try:
+        file_size, content_hash = await asyncio.to_thread(upload_sessions.finish, upload_id, temp_path)
+    except FileNotFoundError:
+        # Finalized or expired by a concurrent request
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if state.get("content_hash") and content_hash != state["content_hash"]:
+        temp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match the announced content_hash")
+
+    try:
+        await db_job_service.create_job(
+            job_id=job_id,
+            filename=state["filename"],
+            file_path=str(temp_path),
+            model=state["model"],
+            message="File uploaded successfully. Ready to process.",
+            content_hash=content_hash,
+            file_size=file_size
+        )
+        return ProcessingResponse(
+            job_id=job_id,
+            status=ProcessingStatus.PENDING,
+            message="File uploaded successfully. Ready to process.",
+            filename=state["filename"]
+        )
+    except Exception as e:
+        # Clean up on error
+        if temp_path.exists():
+            temp_path.unlink()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    """Abandon an upload and discard what was received"""
+    if not await asyncio.to_thread(upload_sessions.delete, upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return Response(status_code=204)
@@ -15,11 +15,17 @@ class Settings(BaseSettings):
     
     # File Settings
     max_file_size: int = 500 * 1024 * 1024  # 500MB
+    upload_chunk_size: int = 1024 * 1024  # Bytes buffered per disk write while receiving an upload
+    download_chunk_size: int = 1024 * 1024  # Bytes read per file read and sent per chunk of a streamed zip
+    upload_session_ttl: int = 24 * 3600  # Seconds a resumable upload may sit idle before it is removed
+    upload_session_sweep_interval: int = 600  # Seconds between sweeps for abandoned resumable uploads
     allowed_extensions: list[str] = [".wav", ".mp3", ".flac", ".ogg", ".m4a", ".aac"]
+    content_reuse: bool = False  # Serve uploads offered by hash from earlier jobs' results or files (any user's)
     
     # Processing Settings
     output_dir: Path = Path("separated")
     temp_dir: Path = Path("temp")
+    log_dir: Path = Path("logs")
     demucs_model: str = "htdemucs"  # Default model
     device: Optional[str] = None  # None for auto-detect, "cpu" or "cuda"
     
@@ -31,6 +37,76 @@ class Settings(BaseSettings):
     # Job Settings
     job_timeout: int = 3600  # 1 hour
     max_concurrent_jobs: int = 2
+    progress_flush_interval: float = 1.0  # Seconds between batched progress writes
+    
+    # Job Cache Settings
+    cache_max_entries: int = 10000  # Job rows cached per process
+    cache_ttl: float = 30.0  # Seconds a cached job is trusted without an invalidation
+    cache_poll_interval: float = 0.5  # Seconds between cross-process invalidation polls (workers > 1)
+    
+    # Retry Settings
+    retry_max_attempts: int = 3  # Processing attempts per job for retryable failures
+    retry_base_delay: float = 30.0  # Seconds before the first retry, doubled per attempt
+    retry_max_delay: float = 900.0
+    retry_fallback_segment: int = 4  # Demucs --segment used after a memory failure
+    
+    # Crash Recovery Settings
+    recovery_interval: int = 300  # Seconds between reconciliation passes
+    recovery_policy: str = "requeue"  # "requeue" or "fail" for jobs whose worker is gone
+    recovery_max_attempts: int = 2  # Processing attempts before an orphaned job is failed
+    recovery_stale_after: int = 3600  # Seconds without updates before a remote worker counts as gone
+    recovery_grace_period: int = 900  # Minimum age (seconds) before an unknown file is removed
+    recovery_scan_batch: int = 2000  # Directory entries / job rows examined per pass
+    
+    # Retention Settings
+    retention_interval: int = 600  # Seconds between retention passes
+    retention_max_age_hours: Optional[int] = 168  # Drop finished jobs unused this long (None disables)
+    retention_max_bytes: Optional[int] = 20 * 1024 * 1024 * 1024  # Quota for separated output (None disables)
+    retention_target_ratio: float = 0.9  # Evict down to this fraction of the quota
+    retention_batch_size: int = 100  # Jobs deleted per transaction
+    
+    # Log Settings
+    log_tail_entries: int = 200  # Newest log records kept in memory per job (all are on disk)
+    log_max_bytes: int = 64 * 1024 * 1024  # Approximate memory cap for all in-memory job logs
+    log_idle_seconds: float = 60.0  # Jobs without new logs this long are evicted first
+    log_block_entries: int = 256  # Records per compressed block (and per index entry) in log files
+    log_flush_interval: float = 2.0  # Seconds before a partial block is written out
+    log_console_rate: int = 50  # Job log lines per second mirrored to the console (0 disables)
+    
+    # Streaming Settings
+    sse_heartbeat_interval: float = 5.0  # Seconds between heartbeat events on idle streams
+    sse_queue_size: int = 1000  # Events buffered per viewer before it resyncs from the job's log
+    sse_close_grace: float = 1.0  # Seconds logs keep streaming after a job finishes
+    ws_interval: float = 0.25  # Shortest time between two /ws messages to a client
+    ws_max_interval: float = 10.0  # Longest send interval a /ws client may ask for
+    ws_max_jobs: int = 1000  # Job IDs one /ws connection may follow
+    ws_max_logs: int = 100  # Log records per job in one /ws message (the rest are counted)
+    
+    # Bulk Operation Settings
+    bulk_max_jobs: int = 1000  # Job IDs accepted per bulk request
+    bulk_batch_size: int = 100  # Jobs cancelled or deleted per transaction
+    
+    # Archive Settings
+    archive_after_hours: Optional[int] = 24  # Move finished jobs idle this long to the archive tables (None disables)
+    archive_interval: int = 900  # Seconds between archive passes
+    archive_batch_size: int = 500  # Jobs moved per transaction
+    archive_vacuum_hour: Optional[int] = 4  # Local hour for the daily compaction (None disables)
+    archive_vacuum_min_free: float = 0.1  # SQLite: only compact when this fraction of the file is free pages
+    
+    # PostgreSQL Settings (DATABASE_URL=postgresql://...)
+    db_pool_size: int = 10  # Connections kept open per process
+    db_max_overflow: int = 20  # Extra connections under burst load
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_command_timeout: float = 60.0  # Seconds before a statement is abandoned
+    job_events_channel: str = "job_events"  # NOTIFY channel for job changes
+    
+    # SQLite Settings
+    sqlite_tuning: bool = True  # WAL journal, pragmas below and a single writer task
+    sqlite_busy_timeout: int = 5000  # Milliseconds to wait for a lock before "database is locked"
+    sqlite_cache_size: int = 64 * 1024  # Page cache per connection, in KiB
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # Bytes of the database file memory-mapped for reads
+    sqlite_writer_batch: int = 64  # Writes committed together by the writer task
     
     class Config:
         env_file = ".env"
@@ -41,6 +117,7 @@ class Settings(BaseSettings):
         # Create directories if they don't exist
         self.output_dir.mkdir(exist_ok=True)
         self.temp_dir.mkdir(exist_ok=True)
+        self.log_dir.mkdir(exist_ok=True)
 
 # Create settings instance
 settings = Settings() 
\ No newline at end of file
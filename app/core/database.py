@@ -1,22 +1,62 @@
 """
 Database configuration and session management
 """
+import asyncio
+import logging
 import os
 from pathlib import Path
-from sqlalchemy import create_engine
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from sqlalchemy import BigInteger, create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _async_url(url: str) -> str:
+    """Use the async driver for plain postgres:// / postgresql:// URLs"""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
 # Database URL
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./stem_separator.db")
-SYNC_DATABASE_URL = os.getenv("SYNC_DATABASE_URL", "sqlite:///./stem_separator.db")
+DATABASE_URL = _async_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./stem_separator.db"))
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+IS_POSTGRES = make_url(DATABASE_URL).get_backend_name() == "postgresql"
+
+# Sync URL for Alembic migrations; defaults to the same SQLite file. PostgreSQL
+# needs an explicit SYNC_DATABASE_URL with a sync driver (e.g. psycopg2).
+SYNC_DATABASE_URL = os.getenv(
+    "SYNC_DATABASE_URL",
+    str(make_url(DATABASE_URL).set(drivername="sqlite")) if IS_SQLITE else None
+)
+
+def _engine_options() -> dict:
+    """Pool and driver options for the configured backend"""
+    if IS_POSTGRES:
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": True,
+            "connect_args": {
+                "command_timeout": settings.db_command_timeout,
+                "server_settings": {"application_name": "stem-separator"},
+            },
+        }
+    return {}
 
 # Create async engine for FastAPI
 async_engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Set to True for SQL logging
-    future=True
+    future=True,
+    **_engine_options()
 )
 
 # Create sync engine for Alembic migrations
@@ -24,7 +64,42 @@ sync_engine = create_engine(
     SYNC_DATABASE_URL,
     echo=False,
     future=True
-)
+) if SYNC_DATABASE_URL else None
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply the SQLite performance profile to every new connection.
+
+    WAL lets readers run while a write is in progress, and NORMAL
+    synchronous is durable in WAL mode except for the last commits before
+    a power loss. The busy timeout turns lock contention into a short wait
+    instead of an immediate "database is locked" error.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+if IS_SQLITE and settings.sqlite_tuning:
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    if sync_engine is not None and sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+class QueryCounter:
+    """Counts statements sent to the database (exposed next to cache stats)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+query_counter = QueryCounter()
+event.listen(async_engine.sync_engine, "before_cursor_execute", query_counter)
 
 # Session makers
 AsyncSessionLocal = async_sessionmaker(
@@ -44,6 +119,129 @@ SessionLocal = sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+class DatabaseWriter:
+    """
+    Runs database writes on one task and commits them in groups.
+
+    SQLite allows a single writer at a time; funnelling every write through
+    one task means writers queue in memory instead of spinning on the file
+    lock, and whatever piles up while a commit is running goes out together
+    in the next transaction (group commit). A write is a coroutine function
+    taking the session; it must not commit. If a group fails, it is rolled
+    back and each write is replayed in its own transaction so one bad write
+    only fails its own caller.
+
+    Until ``start`` is called (scripts, other databases) writes run inline
+    in their own transaction.
+    """
+
+    _IDLE = object()  # No item carried over in _run
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and IS_SQLITE and settings.sqlite_tuning:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish queued writes, then run later ones inline"""
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+            self._queue = None
+
+    async def run(self, write: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        """Execute a write and return its result once it is committed"""
+        if self._task is None:
+            return await self._execute(write)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, future, False))
+        return await future
+
+    async def run_exclusive(self, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an operation that needs the database to itself (e.g. VACUUM).
+
+        Queued writes ahead of it are committed first and later ones wait in
+        the queue until it finishes, so they are not failed by its lock.
+        """
+        if self._task is None:
+            return await operation()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future, True))
+        return await future
+
+    async def _execute(self, write: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        async with AsyncSessionLocal() as session:
+            result = await write(session)
+            await session.commit()
+            return result
+
+    async def _run(self):
+        carried = self._IDLE
+        while True:
+            item = await self._queue.get() if carried is self._IDLE else carried
+            carried = self._IDLE
+            if item is None:
+                return
+            if item[2]:
+                await self._run_operation(item)
+                continue
+            group = [item]
+            while len(group) < settings.sqlite_writer_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None or item[2]:
+                    # Commit what we have before stopping or running it
+                    carried = item
+                    break
+                group.append(item)
+            await self._commit_group(group)
+
+    async def _run_operation(self, item: Tuple[Callable, asyncio.Future, bool]):
+        operation, future, _ = item
+        try:
+            result = await operation()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def _commit_group(self, group: List[Tuple[Callable, asyncio.Future, bool]]):
+        try:
+            async with AsyncSessionLocal() as session:
+                results = [await write(session) for write, _, _ in group]
+                await session.commit()
+        except Exception as e:
+            if len(group) == 1:
+                _, future, _ = group[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            logger.warning(f"Group commit of {len(group)} writes failed, replaying individually: {e}")
+            for write, future, _ in group:
+                try:
+                    result = await self._execute(write)
+                except Exception as write_error:
+                    if not future.done():
+                        future.set_exception(write_error)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+
+        for (_, future, _), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+# Global database writer instance
+db_writer = DatabaseWriter()
+
 # Dependency to get database session
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -52,11 +250,94 @@ async def get_db():
         finally:
             await session.close()
 
+def _add_missing_columns(connection):
+    """
+    Add columns that exist on the models but not in an already-created table.
+
+    ``create_all`` only creates missing tables, so databases created by an
+    older version would otherwise fail on the first query touching a new
+    column. Rows that predate a column get NULL for it.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            connection.exec_driver_sql(ddl)
+
+def _widen_integer_columns(connection):
+    """
+    Turn INTEGER columns declared as BigInteger on the models into BIGINT.
+
+    Only PostgreSQL needs it: SQLite integers are 64-bit whatever the
+    declared type. Covers databases created before ``job_metrics.peak_rss_bytes``
+    became a BigInteger.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            current = existing.get(column.name)
+            if isinstance(column.type, BigInteger) and current is not None and not isinstance(current, BigInteger):
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE BIGINT")
+
+def _add_missing_indexes(connection):
+    """Create indexes declared on the models but missing from existing tables"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+
 # Initialize database
 async def init_db():
     """Create database tables"""
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_widen_integer_columns)
+        await conn.run_sync(_add_missing_indexes)
+
+async def free_page_ratio() -> Optional[float]:
+    """Fraction of the SQLite file that is free pages (None on other databases)"""
+    if not IS_SQLITE:
+        return None
+    async with async_engine.connect() as conn:
+        free = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        total = (await conn.exec_driver_sql("PRAGMA page_count")).scalar()
+    return free / total if total else 0.0
+
+async def vacuum_database(tables: Optional[List[str]] = None):
+    """
+    Compact the database and refresh planner statistics.
+
+    SQLite rewrites the whole file, so this takes the writer to itself;
+    PostgreSQL runs ``VACUUM (ANALYZE)`` on ``tables`` (all when None).
+    """
+    async def vacuum():
+        async with async_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if IS_SQLITE:
+                await conn.exec_driver_sql("VACUUM")
+                await conn.exec_driver_sql("PRAGMA optimize")
+            elif tables:
+                await conn.exec_driver_sql(f"VACUUM (ANALYZE) {', '.join(tables)}")
+            else:
+                await conn.exec_driver_sql("VACUUM (ANALYZE)")
+
+    await db_writer.run_exclusive(vacuum)
 
 # Close database connections
 async def close_db():
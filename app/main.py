@@ -9,8 +9,17 @@ from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import init_db, close_db
-from app.api import audio, jobs, dev
+from app.core.database import init_db, close_db, db_writer
+from app.api import audio, jobs, dev, batches, feed, uploads
+from app.services.db_job_service import db_job_service
+from app.services.job_cache import job_cache
+from app.services.job_events import job_events
+from app.services.log_capture import log_capture
+from app.services.progress_store import progress_store
+from app.services.recovery import recovery_sweeper
+from app.services.retention import retention_manager
+from app.services.archive import archive_manager
+from app.services.upload_sessions import upload_sessions
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,12 +35,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location", "Upload-Offset", "Upload-Length", "Upload-Expires"],
 )
 
 # Include API routers
 app.include_router(audio.router, prefix="/api/audio", tags=["audio"])
 app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(batches.router, prefix="/api/batches", tags=["batches"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
 app.include_router(dev.router, prefix="/api/dev", tags=["development"])
+app.include_router(feed.router, tags=["feed"])
 
 # Database lifecycle events
 @app.on_event("startup")
@@ -39,10 +52,39 @@ async def startup_event():
     """Initialize database on startup"""
     await init_db()
     print("Database initialized successfully")
+    # Serialize writes through one task (SQLite only)
+    db_writer.start()
+    # Status counters behind /api/jobs/stats (only missing ones are counted)
+    await db_job_service.seed_job_counters()
+    # Write buffered job progress in batches
+    progress_store.start()
+    # Write job log blocks to disk and mirror logs to the console
+    log_capture.start()
+    # Drop cached jobs changed by other worker processes (workers > 1)
+    job_cache.start()
+    # LISTEN for job changes made by any process (PostgreSQL only)
+    job_events.start()
+    # Reconcile jobs and files left behind by a previous crash, then keep sweeping
+    recovery_sweeper.start()
+    # Keep separated output within its age and size limits
+    retention_manager.start()
+    # Move finished jobs out of the hot tables and compact off-peak
+    archive_manager.start()
+    # Remove resumable uploads that were abandoned
+    upload_sessions.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connections on shutdown"""
+    await recovery_sweeper.stop()
+    await job_cache.stop()
+    await job_events.stop()
+    await retention_manager.stop()
+    await archive_manager.stop()
+    await upload_sessions.stop()
+    await progress_store.stop()
+    await log_capture.stop()
+    await db_writer.stop()
     await close_db()
     print("Database connections closed")
 
@@ -0,0 +1,33 @@
+"""
+Maintenance commands, run against the configured database
+
+Usage: python -m app.maintenance rebuild-counters
+"""
+import argparse
+import asyncio
+
+from app.core.database import close_db, init_db
+from app.services.db_job_service import db_job_service
+
+async def rebuild_counters():
+    """Recount the status counters behind /api/jobs/stats from the job tables"""
+    await init_db()
+    try:
+        counts = await db_job_service.rebuild_job_counters()
+    finally:
+        await close_db()
+    for status, count in counts.items():
+        print(f"  {status:10} {count}")
+
+COMMANDS = {
+    "rebuild-counters": rebuild_counters,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Pydantic models for audio processing
 """
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class ProcessingStatus(str, Enum):
@@ -21,6 +21,37 @@ class ProcessingResponse(BaseModel):
     message: str
     filename: str
 
+class UploadSessionRequest(BaseModel):
+    """A file to be sent in chunks through a resumable upload"""
+    filename: str
+    length: int  # File size in bytes
+    model: str = "htdemucs"
+
+class UploadNegotiationRequest(BaseModel):
+    """A file offered by its hash before any of it is uploaded"""
+    content_hash: str  # SHA-256, hex
+    length: int  # File size in bytes
+    filename: str
+    model: str = "htdemucs"
+
+class UploadNegotiation(BaseModel):
+    """Whether a file offered by its hash still has to be uploaded"""
+    action: str  # "reused_result", "reused_source" or "upload"
+    job: Optional[ProcessingResponse] = None  # The new job, unless an upload is needed
+    upload_id: Optional[str] = None
+    upload_url: Optional[str] = None  # PATCH the file here, then POST {upload_url}/finalize
+
+class UploadSessionStatus(BaseModel):
+    """Progress of a resumable upload"""
+    upload_id: str
+    filename: str
+    length: int
+    model: str
+    offset: int  # Bytes received contiguously from the start
+    received: int  # Bytes received in total, including chunks past the offset
+    ranges: List[List[int]]  # Received [start, end) byte ranges
+    expires_at: datetime
+
 class StemInfo(BaseModel):
     """Information about a stem file"""
     name: str
@@ -35,6 +66,32 @@ class JobInfo(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+class JobMetrics(BaseModel):
+    """Resource usage of a processed job"""
+    model: str
+    preset: str
+    queue_wait_seconds: Optional[float] = None
+    decode_seconds: Optional[float] = None
+    inference_seconds: Optional[float] = None
+    encode_seconds: Optional[float] = None
+    processing_seconds: Optional[float] = None
+    cpu_seconds: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    audio_duration_seconds: Optional[float] = None
+    real_time_factor: Optional[float] = None
+
+class JobStats(BaseModel):
+    """Dashboard statistics over all jobs"""
+    pending: int = 0
+    processing: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    total: int = 0
+    completed_last_24h: int = 0
+    throughput_per_hour: float = 0.0  # Completions per hour over the last 24 hours
+    avg_processing_seconds: Optional[float] = None  # From start to completion
+
 class JobStatus(BaseModel):
     """Detailed job status"""
     job_id: str
@@ -45,4 +102,48 @@ class JobStatus(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
-    error: Optional[str] = None 
\ No newline at end of file
+    error: Optional[str] = None
+    attempts: int = 0
+    next_retry_at: Optional[datetime] = None
+    metrics: Optional[JobMetrics] = None
+
+class JobIdsRequest(BaseModel):
+    """Job IDs for a bulk operation"""
+    job_ids: List[str]
+
+class BulkJobStatus(BaseModel):
+    """Statuses of several jobs"""
+    jobs: List[JobStatus]
+    not_found: List[str] = []
+
+class BulkJobResult(BaseModel):
+    """Outcome of a bulk cancel or delete"""
+    succeeded: List[str] = []
+    not_found: List[str] = []
+    skipped: Dict[str, str] = {}  # job_id -> reason
+
+class BatchResponse(BaseModel):
+    """Response after submitting a batch of audio files"""
+    batch_id: str
+    status: ProcessingStatus
+    message: str
+    total_jobs: int
+    jobs: List[ProcessingResponse]
+
+class BatchStatus(BaseModel):
+    """Aggregated status of a batch and its child jobs"""
+    batch_id: str
+    name: Optional[str] = None
+    model: str
+    status: ProcessingStatus
+    progress: float  # 0-100, averaged over child jobs
+    message: str
+    total_jobs: int
+    completed_jobs: int
+    failed_jobs: int
+    eta_seconds: Optional[float] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+    jobs: List[JobStatus]
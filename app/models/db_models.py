@@ -3,7 +3,7 @@ Database models for SQLAlchemy
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Enum as SQLEnum, Boolean, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Float, Text, Enum as SQLEnum, Boolean, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.models.audio import ProcessingStatus
@@ -22,14 +22,41 @@ class Job(Base):
     message = Column(Text, nullable=True)
     error = Column(Text, nullable=True)
     output_dir = Column(String(500), nullable=True)
+    batch_id = Column(String(36), ForeignKey("batches.batch_id"), nullable=True, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded file
+    file_size = Column(BigInteger, nullable=True)  # Bytes of the uploaded file
+    
+    # Worker bookkeeping for crash recovery
+    worker_id = Column(String(100), nullable=True)  # host:pid:token of the processing worker
+    attempts = Column(Integer, nullable=False, default=0)
+    
+    # Retry bookkeeping
+    max_attempts = Column(Integer, nullable=True)  # None means settings.retry_max_attempts
+    next_retry_at = Column(DateTime, nullable=True)
+    failure_kind = Column(String(20), nullable=True)  # memory, transient or fatal
+    
+    # Processing overrides, lowered by retries after memory failures
+    segment = Column(Integer, nullable=True)  # demucs --segment
+    device = Column(String(20), nullable=True)  # demucs -d
     
     # Timestamps
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    queued_at = Column(DateTime, nullable=True)  # When processing was requested
+    started_at = Column(DateTime, nullable=True)  # When a worker picked the job up
     completed_at = Column(DateTime, nullable=True)
+    last_accessed_at = Column(DateTime, nullable=True)  # Last download, for LRU retention
     
     # Relationships
     stems = relationship("Stem", back_populates="job", cascade="all, delete-orphan")
+    batch = relationship("Batch", back_populates="jobs")
+    metrics = relationship("JobMetrics", back_populates="job", uselist=False, cascade="all, delete-orphan")
+    
+    # Keyset pagination: newest first, optionally filtered by status
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+    )
     
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -43,9 +70,22 @@ class Job(Base):
             "message": self.message,
             "error": self.error,
             "output_dir": self.output_dir,
+            "batch_id": self.batch_id,
+            "content_hash": self.content_hash,
+            "file_size": self.file_size,
+            "worker_id": self.worker_id,
+            "attempts": self.attempts or 0,
+            "max_attempts": self.max_attempts,
+            "next_retry_at": self.next_retry_at,
+            "failure_kind": self.failure_kind,
+            "segment": self.segment,
+            "device": self.device,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
             "completed_at": self.completed_at,
+            "last_accessed_at": self.last_accessed_at,
         }
 
 class Stem(Base):
@@ -53,7 +93,7 @@ class Stem(Base):
     __tablename__ = "stems"
     
     id = Column(Integer, primary_key=True, index=True)
-    job_id_fk = Column(String(36), ForeignKey("jobs.job_id"), nullable=False)
+    job_id_fk = Column(String(36), ForeignKey("jobs.job_id"), nullable=False, index=True)
     name = Column(String(100), nullable=False)  # vocals, drums, bass, other
     filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
@@ -71,4 +111,148 @@ class Stem(Base):
             "name": self.name,
             "filename": self.filename,
             "size": self.file_size,
-        } 
\ No newline at end of file
+        } 
+
+class Batch(Base):
+    """Batch of jobs submitted together (e.g. an album or a folder)"""
+    __tablename__ = "batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(36), unique=True, index=True, nullable=False)
+    name = Column(String(255), nullable=True)
+    model = Column(String(50), nullable=False, default="htdemucs")
+    status = Column(SQLEnum(ProcessingStatus), nullable=False, default=ProcessingStatus.PENDING)
+    message = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    total_jobs = Column(Integer, nullable=False, default=0)
+    
+    # Timestamps
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    jobs = relationship("Job", back_populates="batch")
+    
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            "batch_id": self.batch_id,
+            "name": self.name,
+            "model": self.model,
+            "status": self.status.value if self.status else "pending",
+            "message": self.message,
+            "error": self.error,
+            "total_jobs": self.total_jobs,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+        }
+
+class JobMetrics(Base):
+    """Resource usage measured while processing a job"""
+    __tablename__ = "job_metrics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id_fk = Column(String(36), ForeignKey("jobs.job_id"), unique=True, index=True, nullable=False)
+    model = Column(String(50), nullable=False, index=True)
+    preset = Column(String(100), nullable=False, default="default", index=True)
+    
+    # Wall-clock seconds
+    queue_wait_seconds = Column(Float, nullable=True)
+    decode_seconds = Column(Float, nullable=True)  # Model load + audio decode
+    inference_seconds = Column(Float, nullable=True)
+    encode_seconds = Column(Float, nullable=True)  # Writing stem files
+    processing_seconds = Column(Float, nullable=True)  # Whole demucs run
+    
+    # Resources
+    cpu_seconds = Column(Float, nullable=True)
+    peak_rss_bytes = Column(BigInteger, nullable=True)  # Demucs often peaks above 2 GiB
+    
+    # Audio
+    audio_duration_seconds = Column(Float, nullable=True)
+    real_time_factor = Column(Float, nullable=True)  # processing_seconds / audio_duration_seconds
+    
+    # Timestamps
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    # Relationships
+    job = relationship("Job", back_populates="metrics")
+    
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            "model": self.model,
+            "preset": self.preset,
+            "queue_wait_seconds": self.queue_wait_seconds,
+            "decode_seconds": self.decode_seconds,
+            "inference_seconds": self.inference_seconds,
+            "encode_seconds": self.encode_seconds,
+            "processing_seconds": self.processing_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "audio_duration_seconds": self.audio_duration_seconds,
+            "real_time_factor": self.real_time_factor,
+            "created_at": self.created_at,
+        }
+
+class JobCounter(Base):
+    """
+    Incrementally maintained job aggregates.
+    
+    Rows are named counters: ``status:<status>`` job counts,
+    ``completed_hour:<YYYY-MM-DDTHH>`` completions per hour, and
+    ``processing_seconds_total`` / ``processing_count`` for the average
+    processing time. They are adjusted in the same transaction as every
+    status transition, so dashboard stats never scan the jobs table.
+    """
+    __tablename__ = "job_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(Float, nullable=False, default=0)
+
+class JobInvalidation(Base):
+    """Job change notifications read by the job caches of other worker processes"""
+    __tablename__ = "job_invalidations"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+def _archive_table(source: Table, name: str, *indexes: Index) -> Table:
+    """
+    Table with the columns of ``source``, holding rows moved out of it.
+    
+    Foreign keys are left out (archived rows can outlive what they pointed
+    at) and ids are copied over rather than generated.
+    """
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable, autoincrement=False)
+        for column in source.columns
+    ]
+    return Table(name, Base.metadata, *columns, *indexes)
+
+# Archive tier: finished jobs moved out of the hot tables (see ArchiveManager)
+jobs_archive = _archive_table(
+    Job.__table__,
+    "jobs_archive",
+    Index("ix_jobs_archive_job_id", "job_id", unique=True),
+    Index("ix_jobs_archive_batch_id", "batch_id"),
+    Index("ix_jobs_archive_content_hash", "content_hash"),
+    # Keyset pagination of job listings, as on the hot table
+    Index("ix_jobs_archive_created_at_id", "created_at", "id"),
+    Index("ix_jobs_archive_status_created_at_id", "status", "created_at", "id"),
+)
+stems_archive = _archive_table(
+    Stem.__table__,
+    "stems_archive",
+    Index("ix_stems_archive_job_id_fk", "job_id_fk"),
+)
+job_metrics_archive = _archive_table(
+    JobMetrics.__table__,
+    "job_metrics_archive",
+    Index("ix_job_metrics_archive_job_id_fk", "job_id_fk", unique=True),
+    Index("ix_job_metrics_archive_created_at", "created_at"),
+)
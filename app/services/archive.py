@@ -0,0 +1,92 @@
+"""
+Archive tier: move finished jobs out of the hot tables and compact off-peak
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.database import free_page_ratio, vacuum_database
+from app.services.db_job_service import db_job_service
+
+logger = logging.getLogger(__name__)
+
+# Tables worth re-analyzing on PostgreSQL after rows move between them
+ARCHIVED_TABLES = ["jobs", "stems", "job_metrics", "jobs_archive", "stems_archive", "job_metrics_archive"]
+
+class ArchiveManager:
+    """
+    Keeps the live job tables down to recent and active jobs.
+
+    Finished jobs idle longer than ``settings.archive_after_hours`` are moved
+    in batches to archive tables with the same columns. Lookups by job_id
+    fall back to the archive, so nothing changes for clients except that
+    archived jobs drop out of job listings. Once a day, at
+    ``settings.archive_vacuum_hour``, the database is compacted.
+    """
+
+    def __init__(self):
+        self._last_vacuum: Optional[date] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Archive now and then every ``settings.archive_interval`` seconds"""
+        if self._task is None and settings.archive_after_hours is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                stats = await self.run_once()
+                if any(stats.values()):
+                    logger.info(f"Archive: {stats}")
+            except Exception as e:
+                logger.error(f"Archive pass failed: {e}")
+            await asyncio.sleep(settings.archive_interval)
+
+    async def archive(self) -> int:
+        """Move every eligible job, one transaction per batch"""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.archive_after_hours)
+        archived = 0
+        while True:
+            moved = await db_job_service.archive_jobs(cutoff, settings.archive_batch_size)
+            archived += moved
+            if moved < settings.archive_batch_size:
+                return archived
+            # Let queued requests through between batches
+            await asyncio.sleep(0)
+
+    async def compact(self) -> bool:
+        """Vacuum once a day in the off-peak hour, if there is enough to reclaim"""
+        now = datetime.now()
+        if settings.archive_vacuum_hour is None or now.hour != settings.archive_vacuum_hour:
+            return False
+        if self._last_vacuum == now.date():
+            return False
+        self._last_vacuum = now.date()
+
+        ratio = await free_page_ratio()
+        if ratio is not None and ratio < settings.archive_vacuum_min_free:
+            return False
+        await vacuum_database(ARCHIVED_TABLES)
+        return True
+
+    async def run_once(self) -> Dict[str, int]:
+        """Run one archive pass"""
+        return {
+            "archived_jobs": await self.archive(),
+            "vacuumed": int(await self.compact()),
+        }
+
+# Global archive manager instance
+archive_manager = ArchiveManager()
@@ -4,62 +4,40 @@ Audio processing service using Demucs
 """
 import subprocess
 import sys
+import shutil
 import re
-import threading
 import asyncio
 import logging
+import os
+import socket
+import uuid
+from collections import deque
 from pathlib import Path
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.core.config import settings
 from app.services.db_job_service import db_job_service
 from app.models.audio import ProcessingStatus
+from app.services.metrics import ProcessSampler, PhaseTimer, audio_duration, build_metrics, preset_name
+from app.services.log_capture import LogCapture, ProgressLineCoalescer, log_capture  # noqa: F401  (re-exported)
+from app.services.failures import (
+    FATAL,
+    ProcessingError,
+    classify_exception,
+    classify_exit,
+    fallback_options,
+    retry_delay,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class LogCapture:
-    """Captures and stores logs for streaming"""
-    def __init__(self):
-        self._logs = {}  # job_id -> list of log entries
-        self._log_lock = threading.Lock()  # Thread safety for concurrent access
-        
-    def add_log(self, job_id: str, level: str, message: str):
-        """Add a log entry for a job"""
-        with self._log_lock:
-            if job_id not in self._logs:
-                self._logs[job_id] = []
-                
-            log_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'level': level,
-                'message': message
-            }
-            self._logs[job_id].append(log_entry)
-            
-            # Keep only last 1000 log entries per job
-            if len(self._logs[job_id]) > 1000:
-                self._logs[job_id] = self._logs[job_id][-1000:]
-                
-        # Log to console as well and flush immediately
-        print(f"[LOG_CAPTURE] [{job_id}] {level}: {message}", flush=True)
-        logger.info(f"[{job_id}] {level}: {message}")
-        
-    def get_logs(self, job_id: str) -> List[dict]:
-        """Get all logs for a job"""
-        with self._log_lock:
-            return self._logs.get(job_id, []).copy()  # Return a copy to avoid race conditions
-        
-    def clear_logs(self, job_id: str):
-        """Clear logs for a job"""
-        with self._log_lock:
-            if job_id in self._logs:
-                del self._logs[job_id]
-
-# Global log capture instance
-log_capture = LogCapture()
+# Identifies this process on the job rows it claims, so the recovery sweeper
+# can tell a live worker from a crashed one. The token distinguishes restarts
+# that reuse a PID (e.g. PID 1 in containers).
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
 class AudioProcessor:
     """Handles audio stem separation using Demucs"""
@@ -67,6 +45,25 @@ class AudioProcessor:
     def __init__(self):
         self.python = sys.executable
         self.log_capture = log_capture
+        self._tasks: set = set()
+    
+    def submit(self, job_id: str, file_path: Path, model: str = "htdemucs") -> asyncio.Task:
+        """
+        Schedule a job on the running event loop outside of a request.
+        
+        Used for work that has no request to attach a BackgroundTask to,
+        such as jobs re-queued by the recovery sweeper.
+        """
+        task = asyncio.create_task(self.process_file(job_id, file_path, model))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+    
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        # process_file already recorded the failure on the job
+        if not task.cancelled():
+            task.exception()
     
     def _parse_progress(self, line: str) -> Optional[float]:
         """Parse progress from demucs stderr output"""
@@ -76,6 +73,93 @@ class AudioProcessor:
             return float(progress_match.group(1))
         return None
     
+    async def _finalize_job(self, job_id: str, output_dir: Path, model: str) -> Path:
+        """
+        Register the stems demucs wrote for a job and mark it completed.
+        
+        Args:
+            job_id: Unique job identifier
+            output_dir: Directory passed to demucs with ``-o``
+            model: Demucs model used (demucs nests its output under it)
+        """
+        self.log_capture.add_log(job_id, "INFO", "Looking for output files...")
+        
+        # Find output directory (demucs creates nested subdirectories)
+        # Structure: output_dir/model_name/filename_without_extension/
+        stem_dir = None
+        model_dir = output_dir / model
+        self.log_capture.add_log(job_id, "INFO", f"Checking model directory: {model_dir}")
+        
+        if model_dir.exists():
+            self.log_capture.add_log(job_id, "INFO", f"Model directory exists, listing contents:")
+            for item in model_dir.iterdir():
+                self.log_capture.add_log(job_id, "INFO", f"  Found: {item} ({'dir' if item.is_dir() else 'file'})")
+                if item.is_dir():
+                    stem_dir = item
+                    break
+        else:
+            self.log_capture.add_log(job_id, "ERROR", f"Model directory does not exist: {model_dir}")
+        
+        if not stem_dir:
+            # List what's actually in the output directory
+            self.log_capture.add_log(job_id, "ERROR", f"No stem directory found. Output directory contents:")
+            for item in output_dir.rglob("*"):
+                self.log_capture.add_log(job_id, "ERROR", f"  {item} ({'dir' if item.is_dir() else 'file'})")
+            raise Exception("No output directory found")
+        
+        self.log_capture.add_log(job_id, "INFO", f"Found stem directory: {stem_dir}")
+        
+        # Create stem records in database
+        stems_data = []
+        for stem_file in stem_dir.glob("*.wav"):
+            self.log_capture.add_log(job_id, "INFO", f"Found stem file: {stem_file}")
+            stems_data.append({
+                'name': stem_file.stem,
+                'filename': stem_file.name,
+                'file_path': str(stem_file),
+                'file_size': stem_file.stat().st_size
+            })
+        
+        self.log_capture.add_log(job_id, "INFO", f"Total stems found: {len(stems_data)}")
+        
+        # Save stems to database
+        if stems_data:
+            await db_job_service.create_stems(job_id, stems_data)
+            self.log_capture.add_log(job_id, "INFO", "Stems saved to database")
+        else:
+            self.log_capture.add_log(job_id, "WARNING", "No stem files found to save")
+        
+        # Update job with completion
+        await db_job_service.update_job(
+            job_id,
+            status=ProcessingStatus.COMPLETED,
+            progress=100,
+            message="Processing completed successfully",
+            output_dir=str(stem_dir)
+        )
+        
+        return stem_dir
+    
+    def _preset(self, job: dict) -> str:
+        """Label of the processing options in effect, for metrics grouping"""
+        return preset_name({
+            "device": job.get("device") or settings.device,
+            "segment": job.get("segment"),
+        })
+    
+    async def _record_metrics(
+        self,
+        job: dict,
+        phases: dict,
+        duration: Optional[float]
+    ) -> None:
+        """Persist resource metrics; accounting problems never fail a job"""
+        try:
+            metrics = build_metrics(job, phases, duration, self._preset(job))
+            await db_job_service.save_job_metrics(job["job_id"], metrics)
+        except Exception as e:
+            self.log_capture.add_log(job["job_id"], "WARNING", f"Could not record metrics: {e}")
+    
     async def process_file(
         self,
         job_id: str,
@@ -90,36 +174,43 @@ class AudioProcessor:
             file_path: Path to the audio file
             model: Demucs model to use
         """
+        job = None
+        duration = None
+        phases = None
+        # Where the job's log numbering continues, read off the event loop
+        await asyncio.to_thread(self.log_capture.open_jobs, [job_id])
         try:
             self.log_capture.add_log(job_id, "INFO", f"Starting audio processing for {file_path.name}")
             self.log_capture.add_log(job_id, "INFO", f"Using model: {model}")
             self.log_capture.add_log(job_id, "INFO", f"Python executable: {self.python}")
             
-            # Update job status
-            await db_job_service.update_job(
-                job_id,
-                status=ProcessingStatus.PROCESSING,
-                message="Starting audio processing...",
-                progress=0
-            )
+            # Claim the job for this worker
+            job = await db_job_service.mark_started(job_id, WORKER_ID, "Starting audio processing...")
+            duration = await asyncio.to_thread(audio_duration, file_path)
             
             # Prepare output directory
             output_dir = settings.output_dir / job_id
             output_dir.mkdir(parents=True, exist_ok=True)
             self.log_capture.add_log(job_id, "INFO", f"Created output directory: {output_dir}")
             
-            # Build demucs command
+            # Build demucs command (unbuffered, so its stdout arrives as it is printed)
             cmd = [
-                self.python, "-m", "demucs",
+                self.python, "-u", "-m", "demucs",
                 "-n", model,
                 "-o", str(output_dir),
                 str(file_path)
             ]
             
-            # Add device option if specified
-            if settings.device:
-                cmd.extend(["-d", settings.device])
-                self.log_capture.add_log(job_id, "INFO", f"Using device: {settings.device}")
+            # Add device option if specified (a retry may have moved the job to CPU)
+            device = job.get("device") or settings.device
+            if device:
+                cmd.extend(["-d", device])
+                self.log_capture.add_log(job_id, "INFO", f"Using device: {device}")
+            
+            # Shorter segments are used after memory failures
+            if job.get("segment"):
+                cmd.extend(["--segment", str(job["segment"])])
+                self.log_capture.add_log(job_id, "INFO", f"Using segment length: {job['segment']}")
             
             self.log_capture.add_log(job_id, "INFO", f"Running command: {' '.join(cmd)}")
             
@@ -129,7 +220,7 @@ class AudioProcessor:
                 self.log_capture.add_log(job_id, "INFO", f"Demucs version: {demucs.__version__}")
             except ImportError as e:
                 self.log_capture.add_log(job_id, "ERROR", f"Demucs import failed: {e}")
-                raise Exception(f"Demucs not available: {e}")
+                raise ProcessingError(f"Demucs not available: {e}", FATAL)
             
             # Update progress
             await db_job_service.update_job(
@@ -149,75 +240,70 @@ class AudioProcessor:
             )
             
             self.log_capture.add_log(job_id, "INFO", f"Process started with PID: {process.pid}")
+            sampler = ProcessSampler(process.pid)
+            timer = PhaseTimer(sampler)
+            sampler.start()
             
             # Monitor progress in real-time with non-blocking reads
             last_progress = 5
-            stderr_lines = []
-            stdout_lines = []
+            stderr_tail = deque(maxlen=50)  # For the error message and classifying a failure
+            progress_lines = ProgressLineCoalescer()
+            
+            def log_stderr(lines: List[str]):
+                for text in lines:
+                    stderr_tail.append(text)
+                    self.log_capture.add_log(job_id, "STDERR", text)
+            
+            async def on_stderr(line: str):
+                nonlocal last_progress
+                # Progress bar redraws are logged once per bar, with their last state
+                log_stderr(progress_lines.feed(line))
+                
+                # Parse progress from stderr
+                progress = self._parse_progress(line)
+                if progress is not None:
+                    timer.progress()
+                if progress is not None and progress > last_progress:
+                    last_progress = progress
+                    db_job_service.update_progress(
+                        job_id,
+                        progress=min(95, progress),  # Cap at 95% until completion
+                        message=f"Processing stems... {progress:.0f}%"
+                    )
+                    self.log_capture.add_log(job_id, "PROGRESS", f"Progress: {progress:.0f}%")
+            
+            async def on_stdout(line: str):
+                self.log_capture.add_log(job_id, "STDOUT", line)
             
             async def read_stderr():
                 """Read stderr lines and process them"""
-                nonlocal last_progress
-                while True:
-                    try:
-                        line_bytes = await process.stderr.readline()
-                        if not line_bytes:
-                            break
-                        line = line_bytes.decode('utf-8').strip()
-                        if line:
-                            stderr_lines.append(line)
-                            self.log_capture.add_log(job_id, "STDERR", line)
-                        
-                            # Parse progress from stderr
-                            progress = self._parse_progress(line)
-                            if progress is not None and progress > last_progress:
-                                last_progress = progress
-                                await db_job_service.update_job(
-                                    job_id,
-                                    progress=min(95, progress),  # Cap at 95% until completion
-                                    message=f"Processing stems... {progress:.0f}%"
-                                )
-                                self.log_capture.add_log(job_id, "PROGRESS", f"Progress: {progress:.0f}%")
-                    except Exception as e:
-                        self.log_capture.add_log(job_id, "ERROR", f"Error reading stderr: {e}")
-                        break
+                try:
+                    await self._read_lines(process.stderr, on_stderr)
+                except Exception as e:
+                    self.log_capture.add_log(job_id, "ERROR", f"Error reading stderr: {e}")
+                log_stderr(progress_lines.flush())
             
             async def read_stdout():
                 """Read stdout lines and process them"""
-                while True:
-                    try:
-                        line_bytes = await process.stdout.readline()
-                        if not line_bytes:
-                            break
-                        line = line_bytes.decode('utf-8').strip()
-                        if line:
-                            stdout_lines.append(line)
-                            self.log_capture.add_log(job_id, "STDOUT", line)
-                    except Exception as e:
-                        self.log_capture.add_log(job_id, "ERROR", f"Error reading stdout: {e}")
-                        break
+                try:
+                    await self._read_lines(process.stdout, on_stdout)
+                except Exception as e:
+                    self.log_capture.add_log(job_id, "ERROR", f"Error reading stdout: {e}")
             
             # Run both readers concurrently
-            await asyncio.gather(
-                read_stderr(),
-                read_stdout(),
-                process.wait()
-            )
+            try:
+                await asyncio.gather(
+                    read_stderr(),
+                    read_stdout(),
+                    process.wait()
+                )
+            finally:
+                phases = timer.finish()
+                await sampler.stop()
             
             # Get final return code
             return_code = process.returncode
-            stdout = b''.join([line.encode() + b'\n' for line in stdout_lines]).decode()
-            stderr = b''.join([line.encode() + b'\n' for line in stderr_lines]).decode()
-            
-            if stdout:
-                for line in stdout.split('\n'):
-                    if line.strip():
-                        self.log_capture.add_log(job_id, "STDOUT", line.strip())
-            
-            if stderr:
-                for line in stderr.split('\n'):
-                    if line.strip():
-                        self.log_capture.add_log(job_id, "STDERR", line.strip())
+            stderr = "\n".join(stderr_tail)
             
             self.log_capture.add_log(job_id, "INFO", f"Process completed with return code: {return_code}")
             
@@ -226,7 +312,7 @@ class AudioProcessor:
                 if stderr:
                     error_msg += f": {stderr}"
                 self.log_capture.add_log(job_id, "ERROR", error_msg)
-                raise Exception(error_msg)
+                raise ProcessingError(error_msg, classify_exit(return_code, stderr))
             
             # Update progress to 98% for file organization
             await db_job_service.update_job(
@@ -235,61 +321,8 @@ class AudioProcessor:
                 message="Organizing output files..."
             )
             
-            self.log_capture.add_log(job_id, "INFO", "Looking for output files...")
-            
-            # Find output directory (demucs creates nested subdirectories)
-            # Structure: output_dir/model_name/filename_without_extension/
-            stem_dir = None
-            model_dir = output_dir / model
-            self.log_capture.add_log(job_id, "INFO", f"Checking model directory: {model_dir}")
-            
-            if model_dir.exists():
-                self.log_capture.add_log(job_id, "INFO", f"Model directory exists, listing contents:")
-                for item in model_dir.iterdir():
-                    self.log_capture.add_log(job_id, "INFO", f"  Found: {item} ({'dir' if item.is_dir() else 'file'})")
-                    if item.is_dir():
-                        stem_dir = item
-                        break
-            else:
-                self.log_capture.add_log(job_id, "ERROR", f"Model directory does not exist: {model_dir}")
-            
-            if not stem_dir:
-                # List what's actually in the output directory
-                self.log_capture.add_log(job_id, "ERROR", f"No stem directory found. Output directory contents:")
-                for item in output_dir.rglob("*"):
-                    self.log_capture.add_log(job_id, "ERROR", f"  {item} ({'dir' if item.is_dir() else 'file'})")
-                raise Exception("No output directory found")
-            
-            self.log_capture.add_log(job_id, "INFO", f"Found stem directory: {stem_dir}")
-            
-            # Create stem records in database
-            stems_data = []
-            for stem_file in stem_dir.glob("*.wav"):
-                self.log_capture.add_log(job_id, "INFO", f"Found stem file: {stem_file}")
-                stems_data.append({
-                    'name': stem_file.stem,
-                    'filename': stem_file.name,
-                    'file_path': str(stem_file),
-                    'file_size': stem_file.stat().st_size
-                })
-            
-            self.log_capture.add_log(job_id, "INFO", f"Total stems found: {len(stems_data)}")
-            
-            # Save stems to database
-            if stems_data:
-                await db_job_service.create_stems(job_id, stems_data)
-                self.log_capture.add_log(job_id, "INFO", "Stems saved to database")
-            else:
-                self.log_capture.add_log(job_id, "WARNING", "No stem files found to save")
-            
-            # Update job with completion
-            await db_job_service.update_job(
-                job_id,
-                status=ProcessingStatus.COMPLETED,
-                progress=100,
-                message="Processing completed successfully",
-                output_dir=str(stem_dir)
-            )
+            await self._finalize_job(job_id, output_dir, model)
+            await self._record_metrics(job, phases, duration)
             
             self.log_capture.add_log(job_id, "INFO", "Processing completed successfully")
             
@@ -302,11 +335,20 @@ class AudioProcessor:
             error_msg = str(e)
             self.log_capture.add_log(job_id, "ERROR", f"Processing failed: {error_msg}")
             
+            # Failed runs cost resources too
+            if job and phases:
+                await self._record_metrics(job, phases, duration)
+            
+            kind = classify_exception(e)
+            if job and await self._retry_later(job, error_msg, kind):
+                return
+            
             # Update job with error
             await db_job_service.update_job(
                 job_id,
                 status=ProcessingStatus.FAILED,
                 error=error_msg,
+                failure_kind=kind,
                 message=f"Processing failed: {error_msg}"
             )
             
@@ -317,5 +359,311 @@ class AudioProcessor:
             
             raise e
 
+    async def _retry_later(self, job: dict, error_msg: str, kind: str) -> bool:
+        """
+        Re-queue a failed job with backoff if its failure is retryable.
+        
+        The uploaded file is kept for the next attempt, and memory failures
+        switch the job to cheaper processing options. Returns False when the
+        job should be failed for good; True also when the job was cancelled
+        meanwhile, which then stays cancelled.
+        """
+        job_id = job["job_id"]
+        attempts = job.get("attempts") or 1
+        max_attempts = job.get("max_attempts") or settings.retry_max_attempts
+        if kind == FATAL or attempts >= max_attempts:
+            return False
+        
+        delay = retry_delay(attempts)
+        next_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        options = fallback_options(kind, error_msg, job)
+        
+        # Start the next attempt from a clean output directory
+        await asyncio.to_thread(shutil.rmtree, settings.output_dir / job_id, True)
+        
+        requeued = await db_job_service.requeue_job(
+            job_id,
+            WORKER_ID,
+            progress=0,
+            error=error_msg,
+            failure_kind=kind,
+            next_retry_at=next_retry_at,
+            message=f"Retrying in {delay:.0f}s after {kind} failure (attempt {attempts + 1} of {max_attempts})",
+            **options
+        )
+        if requeued is None:
+            # Cancelled (or taken over) while running: leave its status alone, drop the upload
+            file_path = Path(job["file_path"])
+            if await asyncio.to_thread(file_path.exists):
+                await asyncio.to_thread(file_path.unlink, True)
+                self.log_capture.add_log(job_id, "INFO", f"Job no longer ours after {kind} failure; cleaned up temp file: {file_path}")
+            return True
+        if options:
+            self.log_capture.add_log(job_id, "WARNING", f"Next attempt uses cheaper options: {options}")
+        self.log_capture.add_log(job_id, "WARNING", f"Retry scheduled in {delay:.0f}s ({kind} failure)")
+        
+        self.schedule_retry(job_id, Path(job["file_path"]), job["model"], next_retry_at)
+        return True
+    
+    def schedule_retry(
+        self,
+        job_id: str,
+        file_path: Path,
+        model: str,
+        next_retry_at: datetime
+    ) -> asyncio.Task:
+        """Start a job again once its retry time has come"""
+        async def run():
+            await asyncio.sleep(max(0.0, (next_retry_at - datetime.utcnow()).total_seconds()))
+            # Skipped if the job was cancelled, deleted or claimed by someone else
+            if await db_job_service.claim_retry(job_id, next_retry_at):
+                await self.process_file(job_id, file_path, model)
+        
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+    
+    async def _read_lines(self, stream, on_line) -> None:
+        """
+        Feed decoded, non-empty lines from a subprocess stream to a callback.
+        
+        Lines end at "\n" or "\r": progress bars redraw themselves with "\r"
+        and may not print a newline for the whole run, which would overflow
+        ``readline``'s buffer.
+        """
+        pending = b""
+        while True:
+            chunk = await stream.read(64 * 1024)
+            if not chunk:
+                break
+            *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+            for line_bytes in lines:
+                line = line_bytes.decode('utf-8', errors='replace').strip()
+                if line:
+                    await on_line(line)
+        line = pending.decode('utf-8', errors='replace').strip()
+        if line:
+            await on_line(line)
+    
+    async def process_batch(self, batch_id: str, model: str = "htdemucs") -> None:
+        """
+        Process all pending jobs of a batch with a single demucs run.
+        
+        Demucs accepts several tracks per invocation and loads the model once,
+        so the children of a batch share one model load instead of paying it
+        per file. Each child is completed as soon as demucs moves on to the
+        next track, so results become downloadable while the batch runs.
+        
+        Args:
+            batch_id: Unique batch identifier
+            model: Demucs model to use for every track
+        """
+        jobs = [
+            job for job in await db_job_service.get_batch_jobs(batch_id)
+            if job["status"] == ProcessingStatus.PENDING.value
+        ]
+        if not jobs:
+            await db_job_service.update_batch(
+                batch_id,
+                status=ProcessingStatus.FAILED,
+                error="No pending jobs in batch",
+                message="Nothing to process"
+            )
+            return
+        
+        job_ids = [job["job_id"] for job in jobs]
+        await asyncio.to_thread(self.log_capture.open_jobs, [batch_id] + job_ids)
+        work_dir = settings.temp_dir / f"batch_{batch_id}"
+        current_job: Optional[str] = None
+        finished: set = set()
+        last_progress = 5.0
+        sampler: Optional[ProcessSampler] = None
+        timers: dict = {}  # job_id -> PhaseTimer
+        stderr_tail = deque(maxlen=50)  # For classifying a failed run
+        progress_lines = ProgressLineCoalescer()
+        batch_error: Optional[str] = None
+        batch_kind = FATAL
+        track_started: dict = {}  # job_id -> when demucs reached the track
+        durations = {
+            job["job_id"]: await asyncio.to_thread(audio_duration, Path(job["file_path"]))
+            for job in jobs
+        }
+        
+        def log(level: str, message: str):
+            self.log_capture.add_log(current_job or batch_id, level, message)
+        
+        async def complete(job_id: str):
+            """Move a finished track into its job directory and register its stems"""
+            phases = timers[job_id].finish()
+            # Per track, the queue wait lasts until demucs reaches it
+            track_job = await db_job_service.get_job(job_id)
+            track_job["started_at"] = track_started[job_id]
+            track_dir = work_dir / model / job_id
+            job_output_dir = settings.output_dir / job_id
+            target_dir = job_output_dir / model / job_id
+            target_dir.parent.mkdir(parents=True, exist_ok=True)
+            if track_dir.exists():
+                shutil.move(str(track_dir), str(target_dir))
+            try:
+                await self._finalize_job(job_id, job_output_dir, model)
+                await self._record_metrics(track_job, phases, durations[job_id])
+                finished.add(job_id)
+                self.log_capture.add_log(job_id, "INFO", "Processing completed successfully")
+            except Exception as e:
+                self.log_capture.add_log(job_id, "ERROR", f"Processing failed: {e}")
+                await db_job_service.update_job(
+                    job_id,
+                    status=ProcessingStatus.FAILED,
+                    error=str(e),
+                    message=f"Processing failed: {e}"
+                )
+        
+        async def on_stdout(line: str):
+            nonlocal current_job, last_progress
+            log("STDOUT", line)
+            if not line.startswith("Separating track"):
+                return
+            started = next((job_id for job_id in job_ids if job_id in line), None)
+            if not started or started == current_job:
+                return
+            # Switch tracks before awaiting so stderr lines go to the new one
+            log_stderr(progress_lines.flush())
+            previous_job = current_job
+            current_job = started
+            last_progress = 5.0
+            timers[current_job] = PhaseTimer(sampler)
+            track_started[current_job] = datetime.utcnow()
+            if previous_job:
+                await complete(previous_job)
+            await db_job_service.update_job(
+                current_job,
+                progress=5,
+                message="Running stem separation..."
+            )
+        
+        def log_stderr(lines: List[str]):
+            for text in lines:
+                stderr_tail.append(text)
+                log("STDERR", text)
+        
+        async def on_stderr(line: str):
+            nonlocal last_progress
+            log_stderr(progress_lines.feed(line))
+            progress = self._parse_progress(line)
+            if current_job and progress is not None:
+                timers[current_job].progress()
+            if current_job and progress is not None and progress > last_progress:
+                last_progress = progress
+                db_job_service.update_progress(
+                    current_job,
+                    progress=min(95, progress),
+                    message=f"Processing stems... {progress:.0f}%"
+                )
+        
+        try:
+            await db_job_service.update_batch(
+                batch_id,
+                status=ProcessingStatus.PROCESSING,
+                started_at=datetime.utcnow(),
+                message=f"Separating {len(jobs)} tracks..."
+            )
+            for job_id in job_ids:
+                await db_job_service.mark_started(job_id, WORKER_ID, "Queued in batch...")
+            
+            # Unbuffered: the "Separating track" lines drive the per-track state live
+            cmd = [
+                self.python, "-u", "-m", "demucs",
+                "-n", model,
+                "-o", str(work_dir),
+            ]
+            if settings.device:
+                cmd.extend(["-d", settings.device])
+            cmd.extend(job["file_path"] for job in jobs)
+            
+            try:
+                import demucs
+            except ImportError as e:
+                raise ProcessingError(f"Demucs not available: {e}", FATAL)
+            
+            self.log_capture.add_log(batch_id, "INFO", f"Running command: {' '.join(cmd)}")
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE
+            )
+            
+            sampler = ProcessSampler(process.pid)
+            sampler.start()
+            try:
+                await asyncio.gather(
+                    self._read_lines(process.stdout, on_stdout),
+                    self._read_lines(process.stderr, on_stderr),
+                    process.wait()
+                )
+            finally:
+                await sampler.stop()
+            log_stderr(progress_lines.flush())
+            
+            if process.returncode != 0:
+                stderr = "\n".join(stderr_tail)
+                raise ProcessingError(
+                    f"Demucs failed with return code {process.returncode}: {stderr}",
+                    classify_exit(process.returncode, stderr)
+                )
+            if current_job:
+                await complete(current_job)
+                current_job = None
+                
+        except Exception as e:
+            batch_error = str(e)
+            batch_kind = classify_exception(e)
+            self.log_capture.add_log(batch_id, "ERROR", f"Batch processing failed: {e}")
+            await db_job_service.update_batch(batch_id, error=batch_error)
+        
+        finally:
+            # Tracks demucs did not get to (or crashed on) are retried on
+            # their own if the failure allows it, and failed otherwise
+            retrying = 0
+            for job in jobs:
+                job_id = job["job_id"]
+                if job_id not in finished:
+                    current = await db_job_service.get_job(job_id)
+                    if current and current["status"] == ProcessingStatus.PROCESSING.value:
+                        if batch_error and await self._retry_later(current, batch_error, batch_kind):
+                            retrying += 1
+                            continue
+                        await db_job_service.update_job(
+                            job_id,
+                            status=ProcessingStatus.FAILED,
+                            error=batch_error or "Batch processing did not produce output for this track",
+                            failure_kind=batch_kind,
+                            message="Processing failed"
+                        )
+                file_path = Path(job["file_path"])
+                if file_path.exists():
+                    file_path.unlink()
+            
+            if work_dir.exists():
+                shutil.rmtree(work_dir, ignore_errors=True)
+            
+            failed = len(jobs) - len(finished) - retrying
+            if retrying:
+                # The recovery sweeper closes the batch once the retries finish
+                await db_job_service.update_batch(
+                    batch_id,
+                    message=f"Processed {len(finished)} of {len(jobs)} tracks ({retrying} retrying)"
+                )
+            else:
+                await db_job_service.update_batch(
+                    batch_id,
+                    status=ProcessingStatus.COMPLETED if finished else ProcessingStatus.FAILED,
+                    message=(
+                        f"Processed {len(finished)} of {len(jobs)} tracks"
+                        + (f" ({failed} failed)" if failed else "")
+                    )
+                )
+
 # Global audio processor instance
 audio_processor = AudioProcessor() 
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Content reuse: new jobs served from earlier jobs with the same upload
+"""
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.audio import ProcessingStatus
+from app.services.db_job_service import db_job_service
+
+# How a job was created without an upload
+REUSED_RESULT = "reused_result"  # Completed at once, with links to an earlier job's stems
+REUSED_SOURCE = "reused_source"  # Pending, with a link to an earlier job's uploaded file
+
+# Earlier jobs with the same content examined per request
+MAX_CANDIDATES = 20
+
+def link_or_copy(source: Path, destination: Path):
+    """Hard-link ``source`` to ``destination``, copying where links are not possible"""
+    try:
+        os.link(source, destination)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Another filesystem, or one without hard links
+        shutil.copyfile(source, destination)
+
+def _link_stems(stems: List[Dict[str, Any]], stem_dir: Path) -> List[Dict[str, Any]]:
+    """Link every stem file into ``stem_dir``; blocking"""
+    stem_dir.mkdir(parents=True, exist_ok=True)
+    linked = []
+    for stem in stems:
+        destination = stem_dir / stem["filename"]
+        link_or_copy(Path(stem["file_path"]), destination)
+        linked.append({
+            "name": stem["name"],
+            "filename": stem["filename"],
+            "file_path": str(destination),
+            "file_size": destination.stat().st_size,
+        })
+    return linked
+
+async def _reuse_result(
+    source: Dict[str, Any],
+    job_id: str,
+    filename: str,
+    length: int
+) -> Optional[Dict[str, Any]]:
+    """Create ``job_id`` as a completed copy of ``source``, or None if its stems are gone"""
+    # Knowing the hash is the only requirement to receive someone else's
+    # result: no ownership is checked, hence ``settings.content_reuse`` is
+    # off by default. The size must at least match the recorded upload
+    # (jobs from before sizes were recorded never match).
+    if source.get("file_size") != length:
+        return None
+    source = await db_job_service.get_job_with_stems(source["job_id"])
+    if source is None or not source["stems"]:
+        return None
+    # Same layout as a batch job: <output_dir>/<job_id>/<model>/<job_id>/
+    job_dir = settings.output_dir / job_id
+    stem_dir = job_dir / source["model"] / job_id
+    try:
+        stems = await asyncio.to_thread(_link_stems, source["stems"], stem_dir)
+    except FileNotFoundError:
+        # Evicted meanwhile
+        await asyncio.to_thread(shutil.rmtree, job_dir, True)
+        return None
+
+    message = f"Reused the result of job {source['job_id']} (identical content)"
+    try:
+        # Created completed, with its stems, in one transaction
+        return await db_job_service.create_job(
+            job_id=job_id,
+            filename=filename,
+            file_path=None,
+            model=source["model"],
+            message=message,
+            content_hash=source["content_hash"],
+            file_size=length,
+            stems=stems,
+            output_dir=str(stem_dir)
+        )
+    except Exception:
+        await asyncio.to_thread(shutil.rmtree, job_dir, True)
+        raise
+
+async def _reuse_source(
+    source: Dict[str, Any],
+    job_id: str,
+    filename: str,
+    length: int,
+    model: str
+) -> Optional[Dict[str, Any]]:
+    """Create ``job_id`` as a pending job on a link to ``source``'s upload, or None if it is gone"""
+    source_path = Path(source["file_path"])
+    temp_path = settings.temp_dir / f"{job_id}{source_path.suffix.lower()}"
+
+    def link() -> bool:
+        if source_path.stat().st_size != length:
+            return False
+        link_or_copy(source_path, temp_path)
+        return True
+
+    try:
+        if not await asyncio.to_thread(link):
+            return None
+    except FileNotFoundError:
+        # Removed when its job finished
+        return None
+
+    try:
+        return await db_job_service.create_job(
+            job_id=job_id,
+            filename=filename,
+            file_path=str(temp_path),
+            model=model,
+            message="File already uploaded. Ready to process.",
+            content_hash=source["content_hash"],
+            file_size=length
+        )
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+async def create_from_existing(
+    job_id: str,
+    content_hash: str,
+    length: int,
+    filename: str,
+    model: str
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Create ``job_id`` from an earlier job with the same content, if any.
+    
+    Only with ``settings.content_reuse``: anyone who knows a file's hash
+    and size would otherwise get another user's stems or upload.
+
+    A completed job with the same model and upload size is preferred:
+    the new job is completed at once, its stems hard links to that job's
+    files (copies across filesystems), so either job can be deleted
+    without affecting the other. Otherwise any job whose uploaded file is still on disk
+    with the expected size lends it to a new pending job. Returns
+    ``(REUSED_RESULT or REUSED_SOURCE, job)``, or None if nothing
+    matched and the file has to be uploaded.
+    """
+    if not settings.content_reuse:
+        return None
+    candidates = await db_job_service.find_jobs_by_hash(content_hash, MAX_CANDIDATES)
+
+    for source in candidates:
+        if source["status"] == ProcessingStatus.COMPLETED.value and source["model"] == model:
+            job = await _reuse_result(source, job_id, filename, length)
+            if job is not None:
+                return REUSED_RESULT, job
+
+    for source in candidates:
+        if source["file_path"]:
+            job = await _reuse_source(source, job_id, filename, length, model)
+            if job is not None:
+                return REUSED_SOURCE, job
+
+    return None
@@ -1,101 +1,574 @@
 """
 Database-backed job service for persistent storage
 """
-from datetime import datetime
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, and_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, update, delete, and_, func, bindparam, tuple_, cast, Text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.models.db_models import Job, Stem
+from app.models.db_models import (
+    Job, Stem, Batch, JobMetrics, JobCounter, JobInvalidation, jobs_archive, stems_archive, job_metrics_archive
+)
 from app.models.audio import ProcessingStatus
-from app.core.database import AsyncSessionLocal
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, IS_POSTGRES, db_writer
+from app.services.job_cache import job_cache
+from app.services.job_events import job_events
+from app.services.progress_store import progress_store
+from app.services.storage import remove_job_files
+
+TERMINAL_STATUSES = [
+    ProcessingStatus.COMPLETED,
+    ProcessingStatus.FAILED,
+    ProcessingStatus.CANCELLED
+]
+
+# Hot paths use Core statements on the table: no identity map, no object hydration
+jobs_table = Job.__table__
+
+def _job_dict(row) -> Dict[str, Any]:
+    """Build the same dict as ``Job.to_dict`` straight from a ``jobs`` row"""
+    job = dict(row._mapping)
+    job.pop("id", None)
+    job["status"] = job["status"].value if job["status"] else "pending"
+    job["attempts"] = job["attempts"] or 0
+    return job
+
+def _metrics_dict(row) -> Dict[str, Any]:
+    """Build the same dict as ``JobMetrics.to_dict`` from a metrics row"""
+    metrics = dict(row._mapping)
+    metrics.pop("id", None)
+    metrics.pop("job_id_fk", None)
+    return metrics
+
+stems_table = Stem.__table__
+metrics_table = JobMetrics.__table__
+
+# (jobs, stems, metrics) of the hot tables, then of the archive
+TIERS = (
+    (jobs_table, stems_table, metrics_table),
+    (jobs_archive, stems_archive, job_metrics_archive),
+)
+
+# Stem dict key -> stems column, selected as "stem_<key>" next to the job's columns
+STEM_FIELDS = {"name": "name", "filename": "filename", "size": "file_size", "file_path": "file_path"}
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque pagination cursor pointing just past a job"""
+    payload = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of ``encode_cursor``; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+counters_table = JobCounter.__table__
+COUNTER_HOURS = 24  # Window for throughput_per_hour
+COUNTER_RETENTION_DAYS = 7  # Hourly buckets older than this are pruned
+
+def _hour_key(moment: datetime) -> str:
+    return f"completed_hour:{moment:%Y-%m-%dT%H}"
+
+async def _bump_counter(session: AsyncSession, name: str, delta: float):
+    """Add ``delta`` to a named counter, creating it if needed"""
+    if IS_POSTGRES:
+        # Concurrent writers: an atomic upsert instead of update-then-insert
+        statement = pg_insert(counters_table).values(name=name, value=delta)
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[counters_table.c.name],
+            set_={"value": counters_table.c.value + statement.excluded.value}
+        ))
+        return
+    result = await session.execute(
+        update(counters_table)
+        .where(counters_table.c.name == name)
+        .values(value=counters_table.c.value + delta)
+    )
+    if result.rowcount == 0:
+        await session.execute(insert(counters_table).values(name=name, value=delta))
+
+async def _count_statuses(session: AsyncSession, statuses: List[ProcessingStatus]) -> Dict[str, int]:
+    """Jobs in each of ``statuses``, archived ones included"""
+    counts = {status.value: 0 for status in statuses}
+    for jobs, _, _ in TIERS:
+        result = await session.execute(
+            select(jobs.c.status, func.count())
+            .where(jobs.c.status.in_(statuses))
+            .group_by(jobs.c.status)
+        )
+        for status, count in result.all():
+            counts[status.value] += count
+    return counts
+
+async def _current_status(session: AsyncSession, job_id: str) -> Optional[ProcessingStatus]:
+    """Status of a job before a transition, locking the row where supported"""
+    result = await session.execute(
+        select(jobs_table.c.status).where(jobs_table.c.job_id == job_id).with_for_update()
+    )
+    return result.scalar_one_or_none()
+
+async def _record_transition(session: AsyncSession, old_status: Optional[ProcessingStatus], row):
+    """Adjust counters for a job that moved from ``old_status`` to ``row.status``"""
+    new_status = row.status
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        await _bump_counter(session, f"status:{ProcessingStatus(old_status).value}", -1)
+    await _bump_counter(session, f"status:{ProcessingStatus(new_status).value}", 1)
+    
+    if new_status == ProcessingStatus.COMPLETED and row.completed_at:
+        await _bump_counter(session, _hour_key(row.completed_at), 1)
+        if row.started_at:
+            seconds = (row.completed_at - row.started_at).total_seconds()
+            await _bump_counter(session, "processing_seconds_total", seconds)
+            await _bump_counter(session, "processing_count", 1)
+
+invalidations_table = JobInvalidation.__table__
+
+async def _notify_job_events(session: AsyncSession, job_ids: List[str]):
+    """
+    NOTIFY listeners of changed jobs; delivered when the transaction commits.
+    
+    The payload is built server-side from the row as written. Jobs no
+    longer present were deleted.
+    """
+    channel = settings.job_events_channel
+    payload = cast(func.json_build_object(
+        "job_id", jobs_table.c.job_id,
+        "status", func.lower(cast(jobs_table.c.status, Text)),
+        "progress", jobs_table.c.progress,
+        "message", func.left(jobs_table.c.message, 1000)  # NOTIFY payloads are capped at 8000 bytes
+    ), Text)
+    result = await session.execute(
+        select(jobs_table.c.job_id, func.pg_notify(channel, payload))
+        .where(jobs_table.c.job_id.in_(job_ids))
+    )
+    found = {row.job_id for row in result.all()}
+    for job_id in set(job_ids) - found:
+        await session.execute(
+            select(func.pg_notify(channel, json.dumps({"job_id": job_id, "deleted": True})))
+        )
 
 class DatabaseJobService:
     """Database-backed job management service"""
     
+    async def _write_jobs(self, job_ids: List[str], write, fields: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Run a write that changes job rows, then drop their cached copies.
+        
+        Other processes learn about the change in the same transaction:
+        through NOTIFY on PostgreSQL, otherwise (with several workers)
+        through the ``job_invalidations`` table their caches poll.
+        ``fields`` optionally supplies per-job values for local events.
+        """
+        async def notified(session: AsyncSession):
+            result = await write(session)
+            if IS_POSTGRES:
+                await _notify_job_events(session, job_ids)
+            elif settings.workers > 1:
+                now = datetime.utcnow()
+                await session.execute(
+                    insert(invalidations_table),
+                    [{"job_id": job_id, "created_at": now} for job_id in job_ids]
+                )
+            return result
+        
+        try:
+            result = await db_writer.run(notified)
+        finally:
+            job_cache.invalidate(*job_ids)
+        job_events.publish_local(job_ids, result, fields)
+        return result
+    
     async def create_job(
         self,
         job_id: str,
         filename: str,
         file_path: str,
-        model: str
+        model: str,
+        batch_id: Optional[str] = None,
+        message: str = "Job created",
+        content_hash: Optional[str] = None,
+        file_size: Optional[int] = None,
+        stems: Optional[List[Dict[str, Any]]] = None,
+        output_dir: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Create a new job"""
-        async with AsyncSessionLocal() as session:
-            db_job = Job(
+        """
+        Create a new job, directly in its PENDING state.
+        
+        With ``stems`` (as for ``create_stems``) the job is created already
+        COMPLETED with them and ``output_dir``, in the same transaction.
+        """
+        now = datetime.utcnow()
+        completed = stems is not None
+        statement = (
+            insert(jobs_table)
+            .values(
                 job_id=job_id,
                 filename=filename,
                 file_path=file_path,
                 model=model,
-                status=ProcessingStatus.PENDING,
-                progress=0.0,
-                message="Job created",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                batch_id=batch_id,
+                content_hash=content_hash,
+                file_size=file_size,
+                status=ProcessingStatus.COMPLETED if completed else ProcessingStatus.PENDING,
+                progress=100.0 if completed else 0.0,
+                message=message,
+                output_dir=output_dir,
+                attempts=0,
+                created_at=now,
+                updated_at=now,
+                completed_at=now if completed else None
             )
-            
-            session.add(db_job)
-            await session.commit()
-            await session.refresh(db_job)
-            
-            return db_job.to_dict()
+            .returning(*jobs_table.c)
+        )
+        
+        async def write(session: AsyncSession):
+            row = (await session.execute(statement)).one()
+            if stems:
+                await session.execute(insert(stems_table), [
+                    {
+                        "job_id_fk": job_id,
+                        "name": stem["name"],
+                        "filename": stem["filename"],
+                        "file_path": stem["file_path"],
+                        "file_size": stem["file_size"],
+                        "created_at": now,
+                    }
+                    for stem in stems
+                ])
+            await _record_transition(session, None, row)
+            return _job_dict(row)
+        
+        # Published like any other change, so feeds and other workers see new jobs
+        return await self._write_jobs([job_id], write)
     
     async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Get job by ID"""
+        """Get job by ID (served from the job cache when possible, else the hot table, then the archive)"""
+        job = job_cache.get(job_id)
+        if job is not None:
+            return progress_store.overlay(job)
+        
+        epoch = job_cache.epoch
         async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Job).where(Job.job_id == job_id)
-            )
-            job = result.scalar_one_or_none()
-            
-            if job:
-                return job.to_dict()
+            for jobs, _, _ in TIERS:
+                result = await session.execute(
+                    select(jobs).where(jobs.c.job_id == job_id)
+                )
+                row = result.first()
+                
+                if row:
+                    job = _job_dict(row)
+                    job_cache.put(job_id, job, epoch)
+                    return progress_store.overlay(job)
             return None
     
-    async def update_job(self, job_id: str, **kwargs) -> Optional[Dict[str, Any]]:
-        """Update job properties"""
+    async def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several jobs by ID: cached ones first, then one IN query per table for the rest"""
+        jobs = {}
+        missing = []
+        for job_id in job_ids:
+            job = job_cache.get(job_id)
+            if job is not None:
+                jobs[job_id] = progress_store.overlay(job)
+            else:
+                missing.append(job_id)
+        
+        epoch = job_cache.epoch
+        async with AsyncSessionLocal() as session:
+            for table, _, _ in TIERS:
+                if not missing:
+                    break
+                result = await session.execute(
+                    select(table).where(table.c.job_id.in_(missing))
+                )
+                for row in result.all():
+                    job = _job_dict(row)
+                    job_cache.put(job["job_id"], job, epoch)
+                    jobs[job["job_id"]] = progress_store.overlay(job)
+                missing = [job_id for job_id in missing if job_id not in jobs]
+        
+        return jobs
+    
+    async def get_job_with_stems(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job and its stems in one query (a second one for archived jobs).
+        
+        The job dict gets a ``stems`` list of ``{name, filename, size,
+        file_path}`` dicts (empty if the job has none).
+        """
+        epoch = job_cache.epoch
+        rows = []
+        async with AsyncSessionLocal() as session:
+            for jobs, stems, _ in TIERS:
+                result = await session.execute(
+                    select(jobs, *(
+                        stems.c[column].label(f"stem_{key}") for key, column in STEM_FIELDS.items()
+                    ))
+                    .select_from(jobs.outerjoin(stems, stems.c.job_id_fk == jobs.c.job_id))
+                    .where(jobs.c.job_id == job_id)
+                    .order_by(stems.c.id)
+                )
+                rows = result.all()
+                if rows:
+                    break
+        
+        if not rows:
+            return None
+        
+        job = _job_dict(rows[0])
+        for key in STEM_FIELDS:
+            job.pop(f"stem_{key}")
+        job_cache.put(job_id, job, epoch)
+        
+        job = progress_store.overlay(dict(job))
+        job["stems"] = [
+            {key: row._mapping[f"stem_{key}"] for key in STEM_FIELDS}
+            for row in rows if row.stem_name is not None
+        ]
+        return job
+    
+    async def get_invalidations_since(self, last_id: int) -> tuple:
+        """
+        Job ids changed by any process after notification ``last_id``.
+        
+        Returns (latest notification id, job_ids). With ``last_id`` of -1 only
+        the latest id is returned, so a new process starts from now.
+        """
         async with AsyncSessionLocal() as session:
+            if last_id < 0:
+                result = await session.execute(select(func.max(invalidations_table.c.id)))
+                return result.scalar() or 0, []
             result = await session.execute(
-                select(Job).where(Job.job_id == job_id)
+                select(invalidations_table.c.id, invalidations_table.c.job_id)
+                .where(invalidations_table.c.id > last_id)
+                .order_by(invalidations_table.c.id)
+                .limit(10000)
             )
-            job = result.scalar_one_or_none()
-            
-            if not job:
+            rows = result.all()
+            if not rows:
+                return last_id, []
+            return rows[-1].id, [row.job_id for row in rows]
+    
+    async def prune_invalidations(self, before: datetime) -> int:
+        """Delete change notifications every process has had time to read"""
+        async def write(session: AsyncSession):
+            result = await session.execute(
+                delete(invalidations_table).where(invalidations_table.c.created_at < before)
+            )
+            return result.rowcount
+        
+        return await db_writer.run(write)
+    
+    def update_progress(self, job_id: str, progress: float, message: str):
+        """
+        Record progress of a running job.
+        
+        Buffered in memory and visible to readers at once; written to the
+        database in batches by the progress store's flush loop.
+        """
+        progress_store.update(job_id, progress=progress, message=message)
+    
+    async def bulk_update_progress(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered progress of several jobs in one transaction"""
+        if not updates:
+            return 0
+        # executemany needs the same columns per statement; group by field set
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for job_id, fields in updates.items():
+            keys = tuple(sorted(fields))
+            groups.setdefault(keys, []).append(
+                {"b_job_id": job_id, **{f"b_{key}": value for key, value in fields.items()}}
+            )
+        
+        table = Job.__table__
+        async def write(session: AsyncSession) -> int:
+            updated = 0
+            for keys, rows in groups.items():
+                result = await session.execute(
+                    table.update()
+                    .where(and_(
+                        table.c.job_id == bindparam("b_job_id"),
+                        # Never overwrite a job that has moved on meanwhile
+                        table.c.status == ProcessingStatus.PROCESSING
+                    ))
+                    .values({key: bindparam(f"b_{key}") for key in keys}),
+                    rows
+                )
+                updated += result.rowcount
+            return updated
+        
+        return await self._write_jobs(list(updates), write, updates)
+    
+    async def update_job(self, job_id: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Update job properties with a single UPDATE ... RETURNING"""
+        # Direct writes absorb buffered progress so the two never disagree
+        kwargs = {**progress_store.take(job_id), **kwargs}
+        values = {key: value for key, value in kwargs.items() if key in jobs_table.c}
+        
+        # Update timestamp
+        now = datetime.utcnow()
+        values["updated_at"] = now
+        
+        # Set completed_at if status is terminal
+        if kwargs.get("status") in TERMINAL_STATUSES:
+            values["completed_at"] = now
+        
+        statement = (
+            update(jobs_table)
+            .where(jobs_table.c.job_id == job_id)
+            .values(**values)
+            .returning(*jobs_table.c)
+        )
+        
+        async def write(session: AsyncSession):
+            old_status = await _current_status(session, job_id) if "status" in values else None
+            row = (await session.execute(statement)).first()
+            if row is None:
                 return None
-            
-            # Update fields
-            for key, value in kwargs.items():
-                if hasattr(job, key):
-                    setattr(job, key, value)
-            
-            # Update timestamp
-            job.updated_at = datetime.utcnow()
-            
-            # Set completed_at if status is terminal
-            if kwargs.get("status") in [
-                ProcessingStatus.COMPLETED,
-                ProcessingStatus.FAILED,
-                ProcessingStatus.CANCELLED
-            ]:
-                job.completed_at = datetime.utcnow()
-            
-            await session.commit()
-            await session.refresh(job)
-            
-            return job.to_dict()
+            if "status" in values:
+                await _record_transition(session, old_status, row)
+            return _job_dict(row)
+        
+        return await self._write_jobs([job_id], write)
+    
+    async def mark_started(self, job_id: str, worker_id: str, message: str) -> Optional[Dict[str, Any]]:
+        """Claim a job for a worker: set PROCESSING and count the attempt"""
+        progress_store.take(job_id)
+        now = datetime.utcnow()
+        statement = (
+            update(jobs_table)
+            .where(jobs_table.c.job_id == job_id)
+            .values(
+                status=ProcessingStatus.PROCESSING,
+                worker_id=worker_id,
+                attempts=func.coalesce(jobs_table.c.attempts, 0) + 1,
+                started_at=now,
+                next_retry_at=None,
+                progress=0,
+                message=message,
+                error=None,
+                updated_at=now
+            )
+            .returning(*jobs_table.c)
+        )
+        
+        async def write(session: AsyncSession):
+            old_status = await _current_status(session, job_id)
+            row = (await session.execute(statement)).first()
+            if row is None:
+                return None
+            await _record_transition(session, old_status, row)
+            return _job_dict(row)
+        
+        return await self._write_jobs([job_id], write)
+    
+    async def requeue_job(self, job_id: str, worker_id: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Put a job this worker is processing back to PENDING with ``kwargs`` set.
+        
+        The update only applies while the job is still PROCESSING and
+        claimed by ``worker_id``; returns None if it was cancelled, deleted
+        or taken over meanwhile.
+        """
+        progress_store.take(job_id)
+        values = {key: value for key, value in kwargs.items() if key in jobs_table.c}
+        statement = (
+            update(jobs_table)
+            .where(and_(
+                jobs_table.c.job_id == job_id,
+                jobs_table.c.status == ProcessingStatus.PROCESSING,
+                jobs_table.c.worker_id == worker_id
+            ))
+            .values(**values, status=ProcessingStatus.PENDING, worker_id=None, updated_at=datetime.utcnow())
+            .returning(*jobs_table.c)
+        )
+        
+        async def write(session: AsyncSession):
+            row = (await session.execute(statement)).first()
+            if row is None:
+                return None
+            await _record_transition(session, ProcessingStatus.PROCESSING, row)
+            return _job_dict(row)
+        
+        return await self._write_jobs([job_id], write)
+    
+    async def cancel_jobs(self, job_ids: List[str], message: str) -> List[str]:
+        """
+        Cancel the PENDING/PROCESSING jobs among ``job_ids`` in one transaction.
+        
+        Returns the ids that were cancelled; jobs in any other state are
+        left alone.
+        """
+        active = [ProcessingStatus.PENDING, ProcessingStatus.PROCESSING]
+        now = datetime.utcnow()
+        for job_id in job_ids:
+            progress_store.take(job_id)
+        
+        async def write(session: AsyncSession):
+            result = await session.execute(
+                select(jobs_table.c.job_id, jobs_table.c.status)
+                .where(and_(jobs_table.c.job_id.in_(job_ids), jobs_table.c.status.in_(active)))
+                .with_for_update()
+            )
+            old_statuses = dict(result.all())
+            if not old_statuses:
+                return []
+            result = await session.execute(
+                update(jobs_table)
+                .where(and_(jobs_table.c.job_id.in_(list(old_statuses)), jobs_table.c.status.in_(active)))
+                .values(status=ProcessingStatus.CANCELLED, message=message, updated_at=now, completed_at=now)
+                .returning(*jobs_table.c)
+            )
+            rows = result.all()
+            for row in rows:
+                await _record_transition(session, old_statuses[row.job_id], row)
+            return [_job_dict(row) for row in rows]
+        
+        cancelled = await self._write_jobs(job_ids, write)
+        return [job["job_id"] for job in cancelled]
     
     async def delete_job(self, job_id: str) -> bool:
         """Delete a job and its stems"""
+        return await self.delete_jobs([job_id]) > 0
+    
+    async def _list_rows(
+        self,
+        status: Optional[str],
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> list:
+        """
+        The newest ``limit`` job rows across the hot table and the archive.
+        
+        Each table is read with its own index range scan (newest first,
+        after ``cursor``) and the two runs are merged in the same
+        (created_at, id) order, so a cursor works across both.
+        """
+        keyset = decode_cursor(cursor) if cursor else None
+        rows = []
         async with AsyncSessionLocal() as session:
-            # Delete job (stems will be deleted via cascade)
-            result = await session.execute(
-                delete(Job).where(Job.job_id == job_id)
-            )
-            await session.commit()
-            
-            return result.rowcount > 0
+            for jobs, _, _ in TIERS:
+                query = select(jobs)
+                if status:
+                    query = query.where(jobs.c.status == status)
+                if keyset:
+                    query = query.where(tuple_(jobs.c.created_at, jobs.c.id) < tuple_(*keyset))
+                # id breaks ties between jobs created in the same instant
+                query = query.order_by(jobs.c.created_at.desc(), jobs.c.id.desc()).limit(limit)
+                rows.extend((await session.execute(query)).all())
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+        return rows[:limit]
     
     async def list_jobs(
         self,
@@ -103,45 +576,271 @@ class DatabaseJobService:
         limit: int = 50,
         offset: int = 0
     ) -> List[Dict[str, Any]]:
-        """List all jobs, optionally filtered by status"""
-        async with AsyncSessionLocal() as session:
-            query = select(Job)
-            
-            if status:
-                query = query.where(Job.status == status)
-            
-            # Order by created_at descending
-            query = query.order_by(Job.created_at.desc())
-            
-            # Apply pagination
-            query = query.offset(offset).limit(limit)
-            
-            result = await session.execute(query)
-            jobs = result.scalars().all()
+        """List jobs newest first, archived ones included, optionally filtered by status"""
+        rows = await self._list_rows(status, offset + limit)
+        return [progress_store.overlay(_job_dict(row)) for row in rows[offset:]]
+    
+    async def list_jobs_page(
+        self,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> tuple:
+        """
+        List jobs newest first using keyset pagination.
+        
+        Returns (jobs, next_cursor); next_cursor is None on the last page.
+        Each page is an index range scan on (status, created_at, id) in the
+        hot table and in the archive, so its cost does not depend on how
+        deep into the list it is, and archived jobs stay listed.
+        """
+        rows = await self._list_rows(status, limit + 1, cursor)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        
+        return [progress_store.overlay(_job_dict(row)) for row in rows], next_cursor
+    
+    async def claim_retry(self, job_id: str, next_retry_at: datetime) -> bool:
+        """
+        Take ownership of a scheduled retry.
+        
+        Clears ``next_retry_at`` only if it still holds the expected value,
+        so a retry is started by exactly one worker or sweeper.
+        """
+        async def write(session: AsyncSession):
+            result = await session.execute(
+                update(Job)
+                .where(and_(
+                    Job.job_id == job_id,
+                    Job.status == ProcessingStatus.PENDING,
+                    Job.next_retry_at == next_retry_at
+                ))
+                .values(next_retry_at=None, updated_at=datetime.utcnow())
+            )
             
-            return [job.to_dict() for job in jobs]
+            return result.rowcount > 0
+        
+        return await self._write_jobs([job_id], write)
     
-    async def get_job_stats(self) -> Dict[str, int]:
-        """Get job statistics"""
+    async def get_due_retries(self, before: datetime, limit: int) -> List[Dict[str, Any]]:
+        """PENDING jobs whose scheduled retry time is earlier than ``before``"""
         async with AsyncSessionLocal() as session:
-            # Count jobs by status
-            stats = {}
-            
-            for status in ProcessingStatus:
-                result = await session.execute(
-                    select(func.count(Job.id)).where(Job.status == status)
-                )
-                stats[status.value] = result.scalar() or 0
-            
-            # Total count
-            result = await session.execute(select(func.count(Job.id)))
-            stats['total'] = result.scalar() or 0
+            result = await session.execute(
+                select(jobs_table)
+                .where(and_(
+                    Job.status == ProcessingStatus.PENDING,
+                    Job.next_retry_at.is_not(None),
+                    Job.next_retry_at < before
+                ))
+                .order_by(Job.next_retry_at)
+                .limit(limit)
+            )
+            return [_job_dict(row) for row in result.all()]
+    
+    async def get_jobs_by_status(self, status: ProcessingStatus) -> List[Dict[str, Any]]:
+        """Get every job currently in a status (meant for the small active set)"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(jobs_table).where(Job.status == status)
+            )
+            return [progress_store.overlay(_job_dict(row)) for row in result.all()]
+    
+    async def find_jobs_by_hash(self, content_hash: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Jobs (archived included) whose upload had this SHA-256, newest first"""
+        async with AsyncSessionLocal() as session:
+            query = union_all(*(
+                select(jobs).where(jobs.c.content_hash == content_hash)
+                for jobs, _, _ in TIERS
+            ))
+            result = await session.execute(
+                query.order_by(query.selected_columns.created_at.desc()).limit(limit)
+            )
+            return [progress_store.overlay(_job_dict(row)) for row in result.all()]
+    
+    async def get_job_statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        """Map job_id -> status for the ids that exist (archived included), using one IN query"""
+        if not job_ids:
+            return {}
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(union_all(*(
+                select(jobs.c.job_id, jobs.c.status).where(jobs.c.job_id.in_(job_ids))
+                for jobs, _, _ in TIERS
+            )))
+            return {job_id: status.value for job_id, status in result.all()}
+    
+    async def release_job(
+        self,
+        job_id: str,
+        worker_id: Optional[str],
+        status: ProcessingStatus,
+        message: str,
+        error: Optional[str] = None
+    ) -> bool:
+        """
+        Take a PROCESSING job away from a worker that is gone.
+        
+        The update only applies if the job is still claimed by ``worker_id``,
+        so concurrent sweepers cannot both re-queue the same job.
+        """
+        now = datetime.utcnow()
+        values = {
+            "status": status,
+            "message": message,
+            "error": error,
+            "worker_id": None,
+            "updated_at": now,
+        }
+        if status == ProcessingStatus.PENDING:
+            values["progress"] = 0.0
+        else:
+            values["completed_at"] = now
+        
+        async def write(session: AsyncSession):
+            result = await session.execute(
+                update(Job)
+                .where(and_(
+                    Job.job_id == job_id,
+                    Job.status == ProcessingStatus.PROCESSING,
+                    Job.worker_id.is_(None) if worker_id is None else Job.worker_id == worker_id
+                ))
+                .values(**values)
+            )
             
-            return stats
+            if result.rowcount == 0:
+                return False
+            await _bump_counter(session, f"status:{ProcessingStatus.PROCESSING.value}", -1)
+            await _bump_counter(session, f"status:{ProcessingStatus(status).value}", 1)
+            return True
+        
+        return await self._write_jobs([job_id], write)
+    
+    async def scan_jobs(
+        self,
+        after_id: int,
+        limit: int,
+        statuses: List[ProcessingStatus]
+    ) -> List[tuple]:
+        """
+        Walk the jobs table in primary-key order (keyset, no OFFSET).
+        
+        Returns (row id, job dict) pairs; pass the last row id back in as
+        ``after_id`` to continue.
+        """
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(jobs_table)
+                .where(and_(Job.id > after_id, Job.status.in_(statuses)))
+                .order_by(Job.id)
+                .limit(limit)
+            )
+            return [(row.id, _job_dict(row)) for row in result.all()]
+    
+    async def count_jobs_by_status(self) -> Dict[str, int]:
+        """Count jobs per status, archived ones included (scans both tables)"""
+        async with AsyncSessionLocal() as session:
+            return await _count_statuses(session, list(ProcessingStatus))
+    
+    async def seed_job_counters(self) -> List[str]:
+        """
+        Create missing status counters and prune old hourly buckets.
+        
+        Run at startup. Existing counters are left alone, so this costs a
+        few primary-key lookups unless the counters table is new (databases
+        created before it existed); then the missing statuses are counted
+        in the same writer transaction, so no concurrent change is lost
+        and another worker starting meanwhile cannot double them. Returns
+        the statuses that were seeded.
+        """
+        names = {f"status:{status.value}": status for status in ProcessingStatus}
+        oldest = _hour_key(datetime.utcnow() - timedelta(days=COUNTER_RETENTION_DAYS))
+        
+        async def write(session: AsyncSession) -> List[str]:
+            result = await session.execute(
+                select(counters_table.c.name).where(counters_table.c.name.in_(list(names)))
+            )
+            present = set(result.scalars())
+            missing = [status for name, status in names.items() if name not in present]
+            counts = await _count_statuses(session, missing) if missing else {}
+            for status, count in counts.items():
+                if IS_POSTGRES:
+                    # Another worker seeding at the same time already counted
+                    statement = pg_insert(counters_table).values(name=f"status:{status}", value=count)
+                    await session.execute(statement.on_conflict_do_nothing(index_elements=[counters_table.c.name]))
+                else:
+                    await session.execute(insert(counters_table).values(name=f"status:{status}", value=count))
+            await session.execute(
+                delete(counters_table).where(and_(
+                    counters_table.c.name.like("completed_hour:%"),
+                    counters_table.c.name < oldest
+                ))
+            )
+            return list(counts)
+        
+        return await db_writer.run(write)
+    
+    async def rebuild_job_counters(self) -> Dict[str, int]:
+        """
+        Recompute every status counter from the job tables (full scan).
+        
+        A maintenance operation (``python -m app.maintenance
+        rebuild-counters``) for counters that drifted, e.g. after writes
+        made outside the service. The counters are locked, the jobs counted
+        and the counters reset in one writer transaction, so status changes
+        committed meanwhile are not lost.
+        """
+        names = [f"status:{status.value}" for status in ProcessingStatus]
+        
+        async def write(session: AsyncSession) -> Dict[str, int]:
+            # Status changes of other transactions wait for this one (PostgreSQL)
+            await session.execute(
+                select(counters_table.c.name).where(counters_table.c.name.in_(names)).with_for_update()
+            )
+            counts = await _count_statuses(session, list(ProcessingStatus))
+            await session.execute(delete(counters_table).where(counters_table.c.name.in_(names)))
+            await session.execute(
+                insert(counters_table),
+                [{"name": f"status:{status}", "value": count} for status, count in counts.items()]
+            )
+            return counts
+        
+        return await db_writer.run(write)
+    
+    async def get_job_stats(self) -> Dict[str, Any]:
+        """Dashboard statistics from the counters table (primary-key lookups only)"""
+        now = datetime.utcnow()
+        hour_keys = [_hour_key(now - timedelta(hours=hours)) for hours in range(COUNTER_HOURS)]
+        names = [f"status:{status.value}" for status in ProcessingStatus]
+        names += ["processing_seconds_total", "processing_count"] + hour_keys
+        
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(counters_table.c.name, counters_table.c.value)
+                .where(counters_table.c.name.in_(names))
+            )
+            values = dict(result.all())
+        
+        stats: Dict[str, Any] = {
+            status.value: int(values.get(f"status:{status.value}", 0)) for status in ProcessingStatus
+        }
+        stats["total"] = sum(stats.values())
+        
+        completed_recently = int(sum(values.get(key, 0) for key in hour_keys))
+        stats["completed_last_24h"] = completed_recently
+        stats["throughput_per_hour"] = round(completed_recently / COUNTER_HOURS, 2)
+        
+        processed = values.get("processing_count", 0)
+        stats["avg_processing_seconds"] = (
+            round(values["processing_seconds_total"] / processed, 1) if processed else None
+        )
+        
+        return stats
     
     async def create_stems(self, job_id: str, stems_data: List[Dict[str, Any]]):
         """Create stem records for a completed job"""
-        async with AsyncSessionLocal() as session:
+        async def write(session: AsyncSession):
             stems = []
             for stem_data in stems_data:
                 stem = Stem(
@@ -155,31 +854,322 @@ class DatabaseJobService:
                 stems.append(stem)
             
             session.add_all(stems)
-            await session.commit()
+        
+        await db_writer.run(write)
     
     async def get_stems(self, job_id: str) -> List[Dict[str, Any]]:
-        """Get stems for a job"""
+        """Get stems for a job, archived or not"""
+        query = union_all(*(
+            select(stems.c.id, stems.c.name, stems.c.filename, stems.c.file_size)
+            .where(stems.c.job_id_fk == job_id)
+            for _, stems, _ in TIERS
+        ))
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query.order_by(query.selected_columns.id))
+            
+            return [
+                {"name": row.name, "filename": row.filename, "size": row.file_size}
+                for row in result.all()
+            ]
+    
+    async def save_job_metrics(self, job_id: str, metrics: Dict[str, Any]):
+        """Store the resource metrics of a job run, replacing earlier attempts"""
+        async def write(session: AsyncSession):
+            await session.execute(
+                delete(JobMetrics).where(JobMetrics.job_id_fk == job_id)
+            )
+            session.add(JobMetrics(
+                job_id_fk=job_id,
+                created_at=datetime.utcnow(),
+                **{key: value for key, value in metrics.items() if hasattr(JobMetrics, key)}
+            ))
+        
+        await db_writer.run(write)
+    
+    async def get_job_metrics(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the resource metrics of a job, if it has been processed"""
+        async with AsyncSessionLocal() as session:
+            for _, _, metrics in TIERS:
+                result = await session.execute(
+                    select(metrics).where(metrics.c.job_id_fk == job_id)
+                )
+                row = result.first()
+                if row:
+                    return _metrics_dict(row)
+            return None
+    
+    async def get_jobs_metrics(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Map job_id -> resource metrics for the jobs that have them, using one IN query"""
+        if not job_ids:
+            return {}
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(union_all(*(
+                select(metrics).where(metrics.c.job_id_fk.in_(job_ids))
+                for _, _, metrics in TIERS
+            )))
+            return {row.job_id_fk: _metrics_dict(row) for row in result.all()}
+    
+    async def list_job_metrics(
+        self,
+        since: Optional[datetime] = None,
+        limit: int = 10000
+    ) -> List[Dict[str, Any]]:
+        """Most recent metrics rows (archived jobs included), newest first, for aggregation"""
+        def recent(metrics):
+            query = select(metrics)
+            if since:
+                query = query.where(metrics.c.created_at >= since)
+            return query.order_by(metrics.c.created_at.desc()).limit(limit).subquery().select()
+        
+        query = union_all(*(recent(metrics) for _, _, metrics in TIERS))
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(Stem).where(Stem.job_id_fk == job_id)
+                query.order_by(query.selected_columns.created_at.desc()).limit(limit)
             )
-            stems = result.scalars().all()
-            
-            return [stem.to_dict() for stem in stems]
+            return [_metrics_dict(row) for row in result.all()]
     
-    async def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
-        """Remove jobs older than specified hours"""
-        from datetime import timedelta
+    async def touch_job(self, job_id: str):
+        """Record that a job's output was just accessed (drives LRU retention)"""
+        async def write(session: AsyncSession):
+            now = datetime.utcnow()
+            result = await session.execute(
+                update(Job).where(Job.job_id == job_id).values(last_accessed_at=now)
+            )
+            if result.rowcount == 0:
+                await session.execute(
+                    update(jobs_archive).where(jobs_archive.c.job_id == job_id).values(last_accessed_at=now)
+                )
+        
+        await self._write_jobs([job_id], write)
+    
+    async def get_output_usage(self) -> int:
+        """Total bytes of stem files recorded for jobs, archived ones included"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(*(
+                select(func.coalesce(func.sum(stems.c.file_size), 0)).scalar_subquery()
+                for _, stems, _ in TIERS
+            )))
+            return sum(result.one())
+    
+    async def get_eviction_candidates(
+        self,
+        limit: int,
+        before: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Finished jobs in least-recently-used order, with their output size.
+        
+        Last use is the last download, or completion for jobs never
+        downloaded. ``before`` restricts the result to jobs unused since then.
+        Archived jobs are candidates too. Each dict carries an extra
+        ``output_bytes`` key.
+        """
+        def candidates(jobs, stems):
+            last_used = func.coalesce(jobs.c.last_accessed_at, jobs.c.completed_at, jobs.c.created_at)
+            output_bytes = (
+                select(func.coalesce(func.sum(stems.c.file_size), 0))
+                .where(stems.c.job_id_fk == jobs.c.job_id)
+                .scalar_subquery()
+            )
+            query = select(jobs, output_bytes.label("output_bytes"), last_used.label("last_used"))
+            query = query.where(jobs.c.status.in_(TERMINAL_STATUSES))
+            if before:
+                query = query.where(last_used < before)
+            return query.order_by(last_used.asc()).limit(limit).subquery().select()
+        
+        query = union_all(*(candidates(jobs, stems) for jobs, stems, _ in TIERS))
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                query.order_by(query.selected_columns.last_used.asc()).limit(limit)
+            )
+            jobs = [_job_dict(row) for row in result.all()]
+            for job in jobs:
+                del job["last_used"]
+            return jobs
+    
+    async def delete_jobs(self, job_ids: List[str]) -> int:
+        """Delete several jobs (archived or not) and their child rows in one transaction"""
+        if not job_ids:
+            return 0
+        for job_id in job_ids:
+            progress_store.take(job_id)
+        async def write(session: AsyncSession):
+            deleted = 0
+            for jobs, stems, metrics in TIERS:
+                counts = await session.execute(
+                    select(jobs.c.status, func.count())
+                    .where(jobs.c.job_id.in_(job_ids))
+                    .group_by(jobs.c.status)
+                )
+                # Bulk deletes bypass ORM cascades, so remove child rows explicitly
+                await session.execute(delete(stems).where(stems.c.job_id_fk.in_(job_ids)))
+                await session.execute(delete(metrics).where(metrics.c.job_id_fk.in_(job_ids)))
+                result = await session.execute(delete(jobs).where(jobs.c.job_id.in_(job_ids)))
+                for status, count in counts.all():
+                    await _bump_counter(session, f"status:{status.value}", -count)
+                deleted += result.rowcount
+            
+            return deleted
         
+        return await self._write_jobs(job_ids, write, {job_id: {"deleted": True} for job_id in job_ids})
+    
+    async def cleanup_old_jobs(self, max_age_hours: int = 24, batch_size: int = 100) -> int:
+        """Remove finished jobs unused for the specified hours, files included"""
         cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        removed = 0
+        
+        while True:
+            jobs = await self.get_eviction_candidates(batch_size, before=cutoff)
+            if not jobs:
+                return removed
+            removed += await self.delete_jobs([job["job_id"] for job in jobs])
+            for job in jobs:
+                await asyncio.to_thread(remove_job_files, job)
+
+    async def archive_jobs(self, before: datetime, limit: int) -> int:
+        """
+        Move up to ``limit`` finished jobs created and last updated before
+        ``before`` into the archive tables, with their stems and metrics.
+        
+        Jobs with a retry still scheduled stay. Rows are copied and removed
+        in one transaction; status counters are untouched since archived
+        jobs still count.
+        """
+        async def write(session: AsyncSession) -> int:
+            result = await session.execute(
+                select(jobs_table.c.job_id)
+                .where(and_(
+                    jobs_table.c.status.in_(TERMINAL_STATUSES),
+                    jobs_table.c.created_at < before,
+                    jobs_table.c.updated_at < before,
+                    jobs_table.c.next_retry_at.is_(None)
+                ))
+                .order_by(jobs_table.c.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            job_ids = result.scalars().all()
+            if not job_ids:
+                return 0
+            
+            (hot_jobs, hot_stems, hot_metrics), (old_jobs, old_stems, old_metrics) = TIERS
+            # Parents first on the way in, children first on the way out
+            moves = [
+                (hot_jobs, old_jobs, "job_id"),
+                (hot_stems, old_stems, "job_id_fk"),
+                (hot_metrics, old_metrics, "job_id_fk"),
+            ]
+            for source, target, key in moves:
+                await session.execute(
+                    insert(target).from_select(
+                        list(source.c.keys()),
+                        select(source).where(source.c[key].in_(job_ids))
+                    )
+                )
+            for source, _, key in reversed(moves):
+                await session.execute(delete(source).where(source.c[key].in_(job_ids)))
+            return len(job_ids)
+        
+        return await db_writer.run(write)
+    
+    async def create_batch(
+        self,
+        batch_id: str,
+        name: Optional[str],
+        model: str,
+        total_jobs: int
+    ) -> Dict[str, Any]:
+        """Create a new batch record"""
+        async def write(session: AsyncSession):
+            db_batch = Batch(
+                batch_id=batch_id,
+                name=name,
+                model=model,
+                status=ProcessingStatus.PENDING,
+                message="Batch created",
+                total_jobs=total_jobs,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            
+            session.add(db_batch)
+            await session.flush()
+            
+            return db_batch.to_dict()
         
+        return await db_writer.run(write)
+    
+    async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get batch by ID"""
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                delete(Job).where(Job.created_at < cutoff)
+                select(Batch).where(Batch.batch_id == batch_id)
             )
-            await session.commit()
+            batch = result.scalar_one_or_none()
             
-            return result.rowcount
+            if batch:
+                return batch.to_dict()
+            return None
+    
+    async def update_batch(self, batch_id: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Update batch properties"""
+        async def write(session: AsyncSession):
+            result = await session.execute(
+                select(Batch).where(Batch.batch_id == batch_id)
+            )
+            batch = result.scalar_one_or_none()
+            
+            if not batch:
+                return None
+            
+            for key, value in kwargs.items():
+                if hasattr(batch, key):
+                    setattr(batch, key, value)
+            
+            batch.updated_at = datetime.utcnow()
+            
+            if kwargs.get("status") in [
+                ProcessingStatus.COMPLETED,
+                ProcessingStatus.FAILED,
+                ProcessingStatus.CANCELLED
+            ]:
+                batch.completed_at = datetime.utcnow()
+            
+            await session.flush()
+            
+            return batch.to_dict()
+        
+        return await db_writer.run(write)
+    
+    async def get_batch_statuses(self, batch_ids: List[str]) -> Dict[str, str]:
+        """Map batch_id -> status for the ids that exist"""
+        if not batch_ids:
+            return {}
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Batch.batch_id, Batch.status).where(Batch.batch_id.in_(batch_ids))
+            )
+            return {batch_id: status.value for batch_id, status in result.all()}
+    
+    async def get_batches_by_status(self, status: ProcessingStatus) -> List[Dict[str, Any]]:
+        """Get every batch currently in a status"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Batch).where(Batch.status == status)
+            )
+            return [batch.to_dict() for batch in result.scalars().all()]
+    
+    async def get_batch_jobs(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Get the child jobs of a batch (archived included) in submission order"""
+        query = union_all(*(select(jobs).where(jobs.c.batch_id == batch_id) for jobs, _, _ in TIERS))
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query.order_by(query.selected_columns.id))
+            
+            return [progress_store.overlay(_job_dict(row)) for row in result.all()]
 
 # Global database job service instance
-db_job_service = DatabaseJobService() 
\ No newline at end of file
+db_job_service = DatabaseJobService()
+progress_store.set_writer(db_job_service.bulk_update_progress)
+if not IS_POSTGRES:
+    # PostgreSQL invalidates through the job event listener instead
+    job_cache.set_invalidation_source(db_job_service.get_invalidations_since)
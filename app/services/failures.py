@@ -0,0 +1,100 @@
+"""
+Failure classification and retry policy for processing jobs
+"""
+import errno
+import random
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+# Failure kinds
+MEMORY = "memory"  # OOM kill or allocation failure; retry with a cheaper configuration
+TRANSIENT = "transient"  # Crash, busy disk, locked database; retry as-is
+FATAL = "fatal"  # Bad input, missing model, bug; retrying would fail the same way
+
+_MEMORY_MARKERS = (
+    "out of memory",
+    "memoryerror",
+    "cannot allocate memory",
+    "std::bad_alloc",
+)
+
+_TRANSIENT_MARKERS = (
+    "database is locked",
+    "device or resource busy",
+    "resource temporarily unavailable",
+    "no space left on device",
+    "input/output error",
+    "connection reset",
+    "broken pipe",
+)
+
+_TRANSIENT_ERRNOS = {errno.EBUSY, errno.EAGAIN, errno.EIO, errno.ENOSPC, errno.EINTR}
+
+class ProcessingError(Exception):
+    """A processing failure that has already been classified"""
+
+    def __init__(self, message: str, kind: str = FATAL):
+        super().__init__(message)
+        self.kind = kind
+
+def classify_text(text: str) -> Optional[str]:
+    """Classify from error output alone, or None if nothing matches"""
+    lowered = text.lower()
+    if any(marker in lowered for marker in _MEMORY_MARKERS):
+        return MEMORY
+    # What a shell prints when the OOM killer ends its child, alone on a line
+    if any(line.strip() == "Killed" for line in text.splitlines()):
+        return MEMORY
+    if any(marker in lowered for marker in _TRANSIENT_MARKERS):
+        return TRANSIENT
+    return None
+
+def classify_exit(return_code: int, stderr: str) -> str:
+    """
+    Classify a failed demucs run from its exit status and stderr.
+
+    SIGKILL (-9, or 137 through a shell) is what the kernel OOM killer
+    sends. Other signals mean the worker crashed. A plain non-zero exit is
+    only retried when stderr points at memory or a transient condition.
+    """
+    if return_code in (-9, 137):
+        return MEMORY
+    kind = classify_text(stderr)
+    if kind:
+        return kind
+    if return_code < 0:
+        return TRANSIENT
+    return FATAL
+
+def classify_exception(error: BaseException) -> str:
+    """Classify an exception raised while preparing or finishing a job"""
+    if isinstance(error, ProcessingError):
+        return error.kind
+    if isinstance(error, MemoryError):
+        return MEMORY
+    if isinstance(error, OSError) and error.errno in _TRANSIENT_ERRNOS:
+        return TRANSIENT
+    return classify_text(str(error)) or FATAL
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given (1-based) failed attempt"""
+    delay = min(settings.retry_max_delay, settings.retry_base_delay * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+def fallback_options(kind: str, error: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cheaper processing options for the next attempt after a memory failure.
+
+    Shorter segments lower peak memory at a small quality cost; a GPU out
+    of memory additionally moves the job to the CPU.
+    """
+    if kind != MEMORY:
+        return {}
+    options: Dict[str, Any] = {}
+    segment = job.get("segment")
+    if segment is None or segment > settings.retry_fallback_segment:
+        options["segment"] = settings.retry_fallback_segment
+    if "cuda" in error.lower() and job.get("device") != "cpu":
+        options["device"] = "cpu"
+    return options
@@ -0,0 +1,131 @@
+"""
+In-process read-through cache of job rows
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class JobCache:
+    """
+    LRU cache of job dicts with a TTL, invalidated on every job write.
+
+    A read that misses records the invalidation epoch before it queries the
+    database; if the job is invalidated while the query is in flight, the
+    (possibly stale) result is not stored. The TTL bounds staleness for
+    writes this process never hears about.
+
+    With several worker processes (``settings.workers > 1``) each write also
+    appends to the ``job_invalidations`` table, and every process polls it
+    to drop the entries other processes changed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, poll_interval: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._epoch = 0
+        self._cleared_at = 0  # Epoch of the last clear()
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()  # job_id -> epoch of last invalidation
+        self._source: Optional[Callable[[int], Awaitable[Tuple[int, List[str]]]]] = None
+        self._last_seen = -1
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self) -> int:
+        """Token to pass to ``put`` for a read started now"""
+        return self._epoch
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached job, or None on a miss"""
+        entry = self._entries.get(job_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[job_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(job_id)
+        self.hits += 1
+        return dict(entry[1])
+
+    def put(self, job_id: str, job: Dict[str, Any], epoch: int):
+        """Store a job read that started at ``epoch``, unless it was invalidated since"""
+        if epoch < self._cleared_at or self._invalidated.get(job_id, -1) > epoch:
+            return
+        self._entries[job_id] = (time.monotonic(), dict(job))
+        self._entries.move_to_end(job_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *job_ids: str):
+        self._epoch += 1
+        for job_id in job_ids:
+            self._entries.pop(job_id, None)
+            self._invalidated[job_id] = self._epoch
+            self._invalidated.move_to_end(job_id)
+            self.invalidations += 1
+        while len(self._invalidated) > self.max_entries:
+            self._invalidated.popitem(last=False)
+
+    def clear(self):
+        self._epoch += 1
+        self._cleared_at = self._epoch
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "cross_process": self._task is not None,
+        }
+
+    def set_invalidation_source(self, source: Callable[[int], Awaitable[Tuple[int, List[str]]]]):
+        """
+        Register the coroutine polled for other processes' writes.
+
+        It takes the last seen notification id (-1 for "start from now") and
+        returns (latest id, job_ids changed after the given id).
+        """
+        self._source = source
+
+    def start(self):
+        """Poll for cross-process invalidations when running several workers"""
+        if self._task is None and self._source is not None and settings.workers > 1:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self._last_seen, job_ids = await self._source(self._last_seen)
+                if job_ids:
+                    self.invalidate(*set(job_ids))
+            except Exception as e:
+                # Entries may have been changed elsewhere; start over cold
+                logger.error(f"Polling job invalidations failed: {e}")
+                self.clear()
+            await asyncio.sleep(self.poll_interval)
+
+# Global job cache instance
+job_cache = JobCache(settings.cache_max_entries, settings.cache_ttl, settings.cache_poll_interval)
@@ -0,0 +1,135 @@
+"""
+Job change events: PostgreSQL LISTEN/NOTIFY bridge and in-process fan-out
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.database import DATABASE_URL, IS_POSTGRES
+from app.services.job_cache import job_cache
+
+logger = logging.getLogger(__name__)
+
+class JobEventBridge:
+    """
+    Delivers job change events to in-process subscribers.
+
+    On PostgreSQL every job write issues ``NOTIFY`` in its transaction, and
+    each process keeps one dedicated ``LISTEN`` connection that feeds the
+    events here, so API processes see changes made by any worker without
+    polling the table. Events also invalidate the local job cache. On other
+    databases only this process's own writes are published, after commit.
+
+    Events are dicts with ``job_id`` and, when known, ``status``,
+    ``progress`` and ``message``; ``deleted`` is set for removed jobs.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """Queue receiving every subsequent event; pass it to ``unsubscribe`` when done"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        """Hand an event to every subscriber, dropping its oldest one if it is full"""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def publish_local(
+        self,
+        job_ids: Iterable[str],
+        result: Any = None,
+        fields: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """
+        Publish this process's committed writes (databases without NOTIFY).
+
+        Event fields come from ``result`` when it is the written job's dict
+        (or a list of them), or from ``fields`` keyed by job_id.
+        """
+        if IS_POSTGRES or not self._subscribers:
+            return
+        written = result if isinstance(result, list) else [result]
+        written = {job["job_id"]: job for job in written if isinstance(job, dict) and "job_id" in job}
+        for job_id in job_ids:
+            event: Dict[str, Any] = {"job_id": job_id}
+            source = written.get(job_id)
+            if source is None and fields:
+                source = fields.get(job_id)
+            if source:
+                event.update({
+                    key: source[key] for key in ("status", "progress", "message", "deleted") if key in source
+                })
+            self.publish(event)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed job event: {payload!r}")
+            return
+        job_cache.invalidate(event["job_id"])
+        self.publish(event)
+
+    def start(self):
+        """Open the LISTEN connection (PostgreSQL only)"""
+        if self._task is None and IS_POSTGRES:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        import asyncpg
+
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        delay = 1.0
+        while True:
+            try:
+                self._connection = await asyncpg.connect(dsn)
+                await self._connection.add_listener(self.channel, self._on_notify)
+                # Changes made while disconnected were never delivered
+                job_cache.clear()
+                delay = 1.0
+                logger.info(f"Listening for job events on '{self.channel}'")
+                while not self._connection.is_closed():
+                    await asyncio.sleep(1.0)
+                logger.warning("Job event connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job event listener failed: {e}")
+            finally:
+                if self._connection is not None and not self._connection.is_closed():
+                    await self._connection.close()
+                self._connection = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+# Global job event bridge instance
+job_events = JobEventBridge(settings.job_events_channel)
@@ -0,0 +1,128 @@
+"""
+Multiplexed job feed: status, progress and log deltas for many jobs per client
+"""
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+from app.services.job_events import job_events
+from app.services.log_capture import LogRecord, log_capture
+
+class FeedSubscriber:
+    """
+    One feed client: the jobs it follows and the changes not yet sent.
+
+    Changes are merged per job as they arrive; status fields keep their
+    latest value and log records are appended, up to ``max_logs`` per job
+    between two sends. Further records are only counted (``logs_skipped``);
+    the client can fetch them from the logs endpoint after the last ``seq``
+    it received.
+    """
+
+    def __init__(self, interval: float, max_logs: int):
+        self.interval = interval
+        self.max_logs = max_logs
+        self.job_ids: Set[str] = set()
+        self.all_jobs = False
+        self.logs = True
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.notices: Dict[str, Any] = {}  # Sent once with the next message (not_found, error)
+        self.ready = asyncio.Event()
+
+    def wants(self, job_id: str) -> bool:
+        return self.all_jobs or job_id in self.job_ids
+
+    def add_state(self, job_id: str, fields: Dict[str, Any]):
+        delta = self.pending.setdefault(job_id, {})
+        delta.update({key: fields[key] for key in ("status", "progress", "message", "deleted") if key in fields})
+        self.ready.set()
+
+    def add_log(self, job_id: str, record: LogRecord):
+        if not self.logs:
+            return
+        delta = self.pending.setdefault(job_id, {})
+        logs = delta.setdefault("logs", [])
+        if len(logs) < self.max_logs:
+            seq, _, level, message = record
+            logs.append([seq, level, message])
+        else:
+            delta["logs_skipped"] = delta.get("logs_skipped", 0) + 1
+        self.ready.set()
+
+    def notice(self, key: str, value: Any):
+        self.notices[key] = value
+        self.ready.set()
+
+    def take(self) -> Dict[str, Any]:
+        """The next message to send, clearing what it contains"""
+        message: Dict[str, Any] = {"type": "update", "jobs": self.pending, **self.notices}
+        self.pending = {}
+        self.notices = {}
+        self.ready.clear()
+        return message
+
+class JobFeedHub:
+    """
+    Routes job changes to feed subscribers.
+
+    Like ``JobStreamHub``, one task reads the job event bridge while there
+    are subscribers, and log records arrive through the ``LogCapture``
+    listener hook; each change is offered to every subscriber following
+    that job. Subscribers batch what they receive and send it at their own
+    interval, so a busy job costs each client one message per tick.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[FeedSubscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        log_capture.add_listener(self._on_log)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def connect(self, subscriber: FeedSubscriber):
+        self._loop = asyncio.get_running_loop()
+        self._subscribers.add(subscriber)
+        if self._task is None:
+            self._events = job_events.subscribe(maxsize=settings.sse_queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    def disconnect(self, subscriber: FeedSubscriber):
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            job_events.unsubscribe(self._events)
+            self._events = None
+
+    def _publish_log(self, job_id: str, record: LogRecord):
+        for subscriber in self._subscribers:
+            if subscriber.wants(job_id):
+                subscriber.add_log(job_id, record)
+
+    def _on_log(self, job_id: str, record: LogRecord):
+        """LogCapture listener; may be called from any thread"""
+        if not self._subscribers or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._publish_log(job_id, record)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._publish_log, job_id, record)
+
+    async def _run(self):
+        events = self._events
+        while True:
+            event = await events.get()
+            for subscriber in self._subscribers:
+                if subscriber.wants(event["job_id"]):
+                    subscriber.add_state(event["job_id"], event)
+
+# Global job feed hub instance
+job_feed = JobFeedHub()
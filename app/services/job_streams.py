@@ -0,0 +1,95 @@
+"""
+Per-job fan-out of log records and status changes to streaming clients
+"""
+import asyncio
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.job_events import job_events
+from app.services.log_capture import LogRecord, format_record, log_capture
+
+# Queue items: ("log", log dict), ("status", job event) or ("resync", None)
+StreamEvent = Tuple[str, Optional[Dict[str, Any]]]
+
+class JobStreamHub:
+    """
+    Pushes each job's new log records and status changes to its viewers.
+
+    Viewers subscribe to one job and wait on their own queue, so they only
+    wake when there is something new for that job. Log records arrive from
+    the ``LogCapture`` listener hook; status changes come from a single
+    task reading the job event bridge, started with the first viewer and
+    stopped with the last, whatever the number of jobs or viewers.
+
+    A viewer that falls ``queue_size`` events behind gets a ``resync`` item
+    instead of the backlog and re-reads the job's log from its last
+    sequence number.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._streams: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        log_capture.add_listener(self._on_log)
+
+    @property
+    def viewers(self) -> int:
+        return sum(len(queues) for queues in self._streams.values())
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Queue receiving the job's events from now on; pass it to ``unsubscribe`` when done"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._streams.setdefault(job_id, set()).add(queue)
+        if self._task is None:
+            self._events = job_events.subscribe(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        queues = self._streams.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._streams[job_id]
+        if not self._streams and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            job_events.unsubscribe(self._events)
+            self._events = None
+
+    def _publish(self, job_id: str, event: StreamEvent):
+        for queue in self._streams.get(job_id, ()):
+            if queue.full():
+                # Too far behind: drop the backlog and let it catch up from the job's log
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", None))
+            else:
+                queue.put_nowait(event)
+
+    def _on_log(self, job_id: str, record: LogRecord):
+        """LogCapture listener; may be called from any thread"""
+        if job_id not in self._streams or self._loop is None:
+            return
+        event = ("log", format_record(record))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._publish(job_id, event)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._publish, job_id, event)
+
+    async def _run(self):
+        events = self._events
+        while True:
+            event = await events.get()
+            if event["job_id"] in self._streams:
+                self._publish(event["job_id"], ("status", event))
+
+# Global job stream hub instance
+job_streams = JobStreamHub(settings.sse_queue_size)
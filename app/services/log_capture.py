@@ -0,0 +1,541 @@
+"""
+Job logs: persistent per-job log files with a hot tail in memory
+"""
+import asyncio
+import itertools
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.log_files import LogFileStore, LogRecord, record_filter
+
+logger = logging.getLogger(__name__)
+
+# Rough per-record cost of the tuple, its int/float and the deque slot
+RECORD_OVERHEAD = 120
+
+def _record_size(record: LogRecord) -> int:
+    return RECORD_OVERHEAD + len(record[2]) + len(record[3])
+
+def format_record(record: LogRecord) -> Dict[str, Any]:
+    """The dict served for a log record"""
+    seq, timestamp, level, message = record
+    return {
+        "seq": seq,
+        "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+        "level": level,
+        "message": message,
+    }
+
+# tqdm-style bar: "<description>: 42%|█████▏     | 98.3/234.0 [...]"
+PROGRESS_BAR = re.compile(r"^(.*?)(\d+)%\|")
+
+class ProgressLineCoalescer:
+    """
+    Keeps only the latest line of each tqdm-style progress bar.
+
+    A bar redraws itself many times a second; ``feed`` holds its newest
+    state back and returns it once the bar is done (another bar starts, or
+    an ordinary line follows), so the log gets one line per bar instead of
+    one per redraw. ``flush`` returns whatever is still held at the end.
+    """
+
+    def __init__(self):
+        self._bar: Optional[str] = None
+        self._key: Optional[Tuple[str, int]] = None
+
+    def feed(self, line: str) -> List[str]:
+        """Lines to log now, in order"""
+        match = PROGRESS_BAR.match(line)
+        if match is None:
+            return self.flush() + [line]
+        description, percent = match.group(1).strip(), int(match.group(2))
+        out: List[str] = []
+        if self._key is not None and (self._key[0] != description or percent < self._key[1]):
+            # A different bar, or the same one starting over
+            out = self.flush()
+        self._bar, self._key = line, (description, percent)
+        return out
+
+    def flush(self) -> List[str]:
+        bar, self._bar, self._key = self._bar, None, None
+        return [bar] if bar is not None else []
+
+class ConsoleMirror:
+    """
+    Copies job log lines to stdout without blocking the caller.
+
+    ``write`` only queues the line; a background task writes what has
+    queued once per ``interval`` in one call, from a worker thread. At most
+    ``rate`` lines a second (with bursts of up to one second's worth) are
+    queued; the rest are dropped and counted, and the count is reported
+    on the console. Nothing is mirrored until ``start``.
+    """
+
+    def __init__(self, rate: int, interval: float = 0.25):
+        self.rate = rate
+        self.interval = interval
+        self.mirrored = 0
+        self.dropped = 0
+        self._reported = 0
+        self._lines: Deque[str] = deque()
+        self._tokens = float(rate)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self, line: str):
+        if self._task is None or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.rate), self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                self.dropped += 1
+                return
+            self._tokens -= 1
+            self._lines.append(line)
+
+    def _take(self) -> List[str]:
+        with self._lock:
+            lines, self._lines = list(self._lines), deque()
+            dropped = self.dropped - self._reported
+            self._reported = self.dropped
+        if dropped:
+            lines.append(f"[LOG_CAPTURE] {dropped} log lines not shown (over {self.rate}/s)")
+        return lines
+
+    def _emit(self, lines: List[str]):
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        self.mirrored += len(lines)
+
+    def start(self):
+        if self._task is None and self.rate > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop mirroring and write out what is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            lines = self._take()
+            if lines:
+                await asyncio.to_thread(self._emit, lines)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            lines = self._take()
+            if lines:
+                try:
+                    await asyncio.to_thread(self._emit, lines)
+                except Exception as e:
+                    logger.error(f"Console mirror failed: {e}")
+
+class _JobLog:
+    __slots__ = ("records", "pending", "blocks", "bytes", "last_write", "next_seq")
+
+    def __init__(self, tail_entries: int, last_seq: int):
+        self.records: Deque[LogRecord] = deque(maxlen=tail_entries)  # Hot tail
+        self.pending: List[LogRecord] = []  # Records of the block being filled
+        self.blocks: List[List[LogRecord]] = []  # Full blocks waiting to be written
+        self.bytes = 0
+        self.last_write = 0.0
+        self.next_seq = last_seq + 1
+
+    def unwritten(self) -> List[LogRecord]:
+        """Records not yet in the log file, oldest first"""
+        return [record for block in self.blocks for record in block] + self.pending
+
+class LogCapture:
+    """
+    Captures and stores logs for streaming.
+
+    Every record is appended to the job's log file (see ``LogFileStore``)
+    in compressed blocks of ``block_entries``. ``add_log`` never touches
+    the disk itself: it queues a full block and wakes the flush loop,
+    which writes blocks from a worker thread, and every ``flush_interval``
+    seconds partial blocks too, so logs survive a restart and other worker
+    processes can read them. Only each job's newest ``tail_entries``
+    records stay in memory, as compact tuples turned into dicts when
+    served; older ranges are read from the file.
+
+    Sequence numbers are per job, start at 1 and continue from the file
+    after a restart (they only start over once the job's logs are
+    cleared), so a reader that remembers the last number it saw fetches
+    only newer records with ``get_logs_since``. ``open_jobs`` loads where
+    a job's numbering continues; call it off the event loop before a job
+    starts logging, or ``add_log`` reads it from the file itself.
+
+    The in-memory tails of all jobs together are held to ``max_bytes``
+    (approximate). Over the cap, the tails of jobs idle for
+    ``idle_seconds`` are dropped, least recently written first (records
+    not yet written out are kept until the next flush); if only active
+    jobs remain, their oldest records go.
+
+    Listeners registered with ``add_listener`` are called with
+    ``(job_id, record)`` for every new record, on the thread that logged it.
+    Records are mirrored to the console through a rate-limited
+    ``ConsoleMirror``.
+    """
+
+    def __init__(
+        self,
+        files: LogFileStore,
+        tail_entries: int,
+        max_bytes: int,
+        idle_seconds: float,
+        block_entries: int = 256,
+        flush_interval: float = 2.0,
+        console_rate: int = 50
+    ):
+        self.files = files
+        self.tail_entries = tail_entries
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.block_entries = block_entries
+        self.flush_interval = flush_interval
+        self._logs: "OrderedDict[str, _JobLog]" = OrderedDict()  # Least recently written first
+        self._retired: Dict[str, _JobLog] = {}  # Evicted, with records still to be written
+        self._bytes = 0
+        self._log_lock = threading.Lock()  # Guards the in-memory state; never held for I/O
+        self._write_lock = threading.Lock()  # One writer at a time, so blocks stay in order
+        self.evicted_jobs = 0
+        self._listeners: List[Callable[[str, LogRecord], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.console = ConsoleMirror(console_rate)
+
+    def _job_log(self, job_id: str) -> Optional[_JobLog]:
+        """A job's in-memory log, evicted or not (lock held)"""
+        return self._logs.get(job_id) or self._retired.get(job_id)
+
+    def open_jobs(self, job_ids: List[str]):
+        """
+        Load where each job's sequence numbers continue from its log file.
+
+        Blocking (it reads the index files); jobs already in memory are
+        skipped.
+        """
+        with self._log_lock:
+            new_ids = [job_id for job_id in job_ids if self._job_log(job_id) is None]
+        last_seqs = {job_id: self.files.last_seq(job_id) for job_id in new_ids}
+        with self._log_lock:
+            for job_id, last_seq in last_seqs.items():
+                if self._job_log(job_id) is None:
+                    self._logs[job_id] = _JobLog(self.tail_entries, last_seq)
+
+    def add_log(self, job_id: str, level: str, message: str) -> int:
+        """Add a log entry for a job and return its sequence number"""
+        if job_id not in self._logs and job_id not in self._retired:
+            # Not opened beforehand: read where its numbering continues here
+            self.open_jobs([job_id])
+        now = time.time()
+        block_ready = False
+        with self._log_lock:
+            job_log = self._logs.get(job_id)
+            if job_log is None:
+                # Evicted meanwhile (or cleared): take it back, or start over
+                job_log = self._retired.pop(job_id, None) or _JobLog(self.tail_entries, 0)
+                self._logs[job_id] = job_log
+            else:
+                self._logs.move_to_end(job_id)
+
+            records = job_log.records
+            if len(records) == records.maxlen:
+                # The append below pushes the oldest record out
+                dropped = _record_size(records[0])
+                job_log.bytes -= dropped
+                self._bytes -= dropped
+
+            record = (job_log.next_seq, now, level, message)
+            job_log.next_seq += 1
+            size = _record_size(record)
+            records.append(record)
+            job_log.pending.append(record)
+            job_log.bytes += size
+            job_log.last_write = now
+            self._bytes += size
+
+            if len(job_log.pending) >= self.block_entries:
+                # Only handed over here; the flush loop writes it
+                job_log.blocks.append(job_log.pending)
+                job_log.pending = []
+                block_ready = True
+            if self._bytes > self.max_bytes:
+                self._evict(now)
+
+        if block_ready:
+            self._request_flush()
+
+        for listener in self._listeners:
+            try:
+                listener(job_id, record)
+            except Exception as e:
+                logger.warning(f"Log listener failed: {e}")
+
+        self.console.write(f"[LOG_CAPTURE] [{job_id}] {level}: {message}")
+        return record[0]
+
+    def add_listener(self, listener: Callable[[str, LogRecord], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, LogRecord], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _request_flush(self):
+        """Wake the flush loop for a full block (any thread); without one, write now"""
+        loop, wake = self._loop, self._wake
+        if wake is None or loop is None or loop.is_closed():
+            self.flush()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    def flush(self, full_blocks_only: bool = False):
+        """
+        Write pending records to the log files (blocking).
+
+        The lock is only held to take the records; the blocks are written
+        after it is released, so ``add_log`` never waits for the disk.
+        Records that fail to write are kept and retried by the next flush.
+        """
+        with self._write_lock:
+            with self._log_lock:
+                batches = []
+                for job_id, job_log in itertools.chain(self._logs.items(), self._retired.items()):
+                    if job_log.pending and not full_blocks_only:
+                        job_log.blocks.append(job_log.pending)
+                        job_log.pending = []
+                    if job_log.blocks:
+                        batches.append((job_id, job_log, list(job_log.blocks)))
+
+            for job_id, job_log, blocks in batches:
+                written = 0
+                for block in blocks:
+                    try:
+                        self.files.append(job_id, block)
+                    except OSError as e:
+                        logger.error(f"Could not write logs for {job_id}: {e}")
+                        break
+                    written += 1
+                with self._log_lock:
+                    # add_log only appends after these, so they are still first
+                    del job_log.blocks[:written]
+                    if not job_log.blocks and not job_log.pending and self._retired.get(job_id) is job_log:
+                        del self._retired[job_id]
+
+    def _evict(self, now: float):
+        """Bring the total under the cap (lock held)"""
+        while self._bytes > self.max_bytes and self._logs:
+            job_id, job_log = next(iter(self._logs.items()))
+            if now - job_log.last_write >= self.idle_seconds:
+                self._retire(job_id, job_log)
+                self.evicted_jobs += 1
+                continue
+            # Everything left was written recently: trim the oldest records
+            while self._bytes > self.max_bytes and job_log.records:
+                dropped = _record_size(job_log.records.popleft())
+                job_log.bytes -= dropped
+                self._bytes -= dropped
+            if not job_log.records:
+                self._retire(job_id, job_log)
+
+    def _retire(self, job_id: str, job_log: _JobLog):
+        """Drop a job's tail; records not written yet wait for the next flush (lock held)"""
+        del self._logs[job_id]
+        self._bytes -= job_log.bytes
+        job_log.bytes = 0
+        job_log.records.clear()
+        if job_log.blocks or job_log.pending:
+            self._retired[job_id] = job_log
+
+    def _read(self, job_id: str, seq: int, limit: Optional[int]) -> List[LogRecord]:
+        """Records above ``seq`` from the hot tail when it reaches back far enough, else from the file"""
+        if limit is not None and limit <= 0:
+            return []
+        with self._log_lock:
+            job_log = self._job_log(job_id)
+            unflushed: List[LogRecord] = []
+            if job_log is not None:
+                tail = job_log.records
+                if tail and tail[0][0] <= seq + 1:
+                    records = list(itertools.takewhile(lambda record: record[0] > seq, reversed(tail)))
+                    records.reverse()
+                    return records if limit is None else records[:limit]
+                unflushed = job_log.unwritten()
+
+        records = self.files.read(job_id, seq, limit)
+        # Pending records may have been written since the snapshot: skip what the file had
+        newest = records[-1][0] if records else seq
+        records.extend(record for record in unflushed if record[0] > newest)
+        return records if limit is None else records[:limit]
+
+    def get_logs(self, job_id: str) -> List[dict]:
+        """Get all logs for a job"""
+        return self.get_logs_since(job_id, 0)
+
+    def get_logs_since(self, job_id: str, seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """
+        Get logs with a sequence number above ``seq``, oldest first.
+
+        Recent ranges come from memory; older ones are read from the log
+        file, decompressing only the blocks that overlap the range. With
+        ``limit``, only the oldest ``limit`` of them are returned; ask again
+        from the last one for the rest.
+        """
+        return [format_record(record) for record in self._read(job_id, seq, limit)]
+
+    def get_latest(self, job_id: str, limit: int) -> List[dict]:
+        """Get the newest ``limit`` logs for a job, oldest first"""
+        return self.get_logs_since(job_id, max(self.last_seq(job_id) - limit, 0), limit)
+
+    def query(
+        self,
+        job_id: str,
+        after_seq: int = 0,
+        before_seq: Optional[int] = None,
+        levels: Optional[List[str]] = None,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+        predicate: Optional[Callable[[LogRecord], bool]] = None,
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Get logs matching every given filter, oldest first.
+
+        Searches the log file through its indexes (see ``LogFileStore.query``),
+        then records not yet written to it. With ``limit``, ask again after
+        the last returned ``seq`` for the next page.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        with self._log_lock:
+            job_log = self._job_log(job_id)
+            unflushed = job_log.unwritten() if job_log is not None else []
+
+        records, searched = self.files.query(
+            job_id, after_seq, before_seq, levels, start_ts, end_ts, predicate, limit
+        )
+        if limit is None or len(records) < limit:
+            matches = record_filter(levels, start_ts, end_ts, predicate)
+            for record in unflushed:
+                if record[0] <= searched or not matches(record):
+                    continue
+                if before_seq is not None and record[0] >= before_seq:
+                    break
+                records.append(record)
+                if limit is not None and len(records) >= limit:
+                    break
+        return [format_record(record) for record in records]
+
+    def count(self, job_id: str) -> int:
+        """Number of log entries recorded for a job"""
+        return self.last_seq(job_id)
+
+    def last_seq(self, job_id: str) -> int:
+        """Sequence number of a job's newest log entry (0 if none)"""
+        with self._log_lock:
+            job_log = self._job_log(job_id)
+            if job_log is not None:
+                return job_log.next_seq - 1
+        return self.files.last_seq(job_id)
+
+    def clear_logs(self, job_id: str):
+        """Clear logs for a job, in memory and on disk"""
+        # No flush may write a block for the job between the two
+        with self._write_lock:
+            with self._log_lock:
+                self._retired.pop(job_id, None)
+                job_log = self._logs.pop(job_id, None)
+                if job_log is not None:
+                    self._bytes -= job_log.bytes
+            self.files.delete(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._log_lock:
+            return {
+                "jobs": len(self._logs),
+                "records": sum(len(job_log.records) for job_log in self._logs.values()),
+                "unflushed": sum(
+                    len(job_log.unwritten())
+                    for job_log in itertools.chain(self._logs.values(), self._retired.values())
+                ),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evicted_jobs": self.evicted_jobs,
+                "console_mirrored": self.console.mirrored,
+                "console_dropped": self.console.dropped,
+            }
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self.console.start()
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still pending"""
+        await self.console.stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+            self._loop = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        last_full = time.monotonic()
+        while True:
+            timeout = max(0.0, last_full + self.flush_interval - time.monotonic())
+            # Not wait_for: on 3.11 it can swallow a cancel that races the wake-up
+            waiter = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
+            self._wake.clear()
+            # Full blocks as soon as they are ready, partial ones every interval
+            full_blocks_only = time.monotonic() - last_full < self.flush_interval
+            if not full_blocks_only:
+                last_full = time.monotonic()
+            try:
+                await asyncio.to_thread(self.flush, full_blocks_only)
+            except Exception as e:
+                logger.error(f"Log flush failed: {e}")
+
+# Global log capture instance
+log_capture = LogCapture(
+    LogFileStore(settings.log_dir),
+    settings.log_tail_entries,
+    settings.log_max_bytes,
+    settings.log_idle_seconds,
+    settings.log_block_entries,
+    settings.log_flush_interval,
+    settings.log_console_rate
+)
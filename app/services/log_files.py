@@ -0,0 +1,226 @@
+"""
+Append-only, block-compressed job log files with an offset index
+"""
+import bisect
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (seq, unix timestamp, level, message)
+LogRecord = Tuple[int, float, str, str]
+
+# One entry per block: offset, length, count, first_seq, last_seq, first_ts, last_ts
+INDEX_ENTRY = struct.Struct("<QIIQQdd")
+
+# Level index, one entry per block: offset, bitmask of the levels it contains
+LEVEL_ENTRY = struct.Struct("<QI")
+LEVEL_BITS = {
+    level: 1 << bit
+    for bit, level in enumerate(("DEBUG", "INFO", "WARNING", "ERROR", "STDOUT", "STDERR", "PROGRESS"))
+}
+OTHER_LEVELS = 1 << 31  # Any level not listed above
+ALL_LEVELS = 0xFFFFFFFF
+
+def level_mask(levels: Iterable[str]) -> int:
+    mask = 0
+    for level in levels:
+        mask |= LEVEL_BITS.get(level, OTHER_LEVELS)
+    return mask
+
+def record_filter(
+    levels: Optional[Iterable[str]] = None,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    predicate: Optional[Callable[[LogRecord], bool]] = None
+) -> Callable[[LogRecord], bool]:
+    """Test for records with one of ``levels``, within the time range and accepted by ``predicate``"""
+    level_set = set(levels) if levels is not None else None
+
+    def matches(record: LogRecord) -> bool:
+        return (
+            (level_set is None or record[2] in level_set)
+            and (start_ts is None or record[1] >= start_ts)
+            and (end_ts is None or record[1] <= end_ts)
+            and (predicate is None or predicate(record))
+        )
+
+    return matches
+
+class BlockInfo:
+    """Index entry of one compressed block"""
+    __slots__ = ("offset", "length", "count", "first_seq", "last_seq", "first_ts", "last_ts")
+
+    def __init__(self, offset, length, count, first_seq, last_seq, first_ts, last_ts):
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.first_seq = first_seq
+        self.last_seq = last_seq
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+
+class LogFileStore:
+    """
+    Job logs on disk, one pair of files per job.
+
+    ``<job_id>.log`` is a sequence of zlib-compressed blocks, each holding
+    a run of records as JSON lines. ``<job_id>.idx`` has one fixed-size
+    entry per block (byte offset, length, record count, first/last
+    sequence number and timestamp), so a range of records is found by
+    binary search over the index and read with one seek per block, without
+    decompressing the rest of the file. ``<job_id>.lvl`` maps each block's
+    offset to the set of levels in it, so level queries skip blocks that
+    cannot match; blocks missing from it are assumed to contain every level.
+
+    Blocks are only ever appended, the data before its index entry, so a
+    reader in another process never follows an entry to missing data; a
+    torn trailing index entry is ignored.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _paths(self, job_id: str) -> Tuple[Path, Path]:
+        if not job_id or Path(job_id).name != job_id:
+            raise ValueError(f"Invalid log id: {job_id!r}")
+        return self.directory / f"{job_id}.log", self.directory / f"{job_id}.idx"
+
+    def _levels_path(self, job_id: str) -> Path:
+        return self._paths(job_id)[0].with_suffix(".lvl")
+
+    def append(self, job_id: str, records: Sequence[LogRecord]):
+        """Write records (in sequence order) as one compressed block"""
+        if not records:
+            return
+        data_path, index_path = self._paths(job_id)
+        payload = zlib.compress(
+            "\n".join(json.dumps(record, ensure_ascii=False) for record in records).encode()
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(data_path, "ab") as data_file:
+            offset = data_file.tell()
+            data_file.write(payload)
+        entry = INDEX_ENTRY.pack(
+            offset, len(payload), len(records),
+            records[0][0], records[-1][0], records[0][1], records[-1][1]
+        )
+        with open(self._levels_path(job_id), "ab") as levels_file:
+            levels_file.write(LEVEL_ENTRY.pack(offset, level_mask({record[2] for record in records})))
+        with open(index_path, "ab") as index_file:
+            index_file.write(entry)
+
+    def index(self, job_id: str) -> List[BlockInfo]:
+        """All block entries of a job's log, oldest first"""
+        _, index_path = self._paths(job_id)
+        try:
+            raw = index_path.read_bytes()
+        except FileNotFoundError:
+            return []
+        usable = len(raw) - len(raw) % INDEX_ENTRY.size
+        return [BlockInfo(*fields) for fields in INDEX_ENTRY.iter_unpack(raw[:usable])]
+
+    def level_masks(self, job_id: str) -> Dict[int, int]:
+        """Block offset -> bitmask of the levels it contains"""
+        try:
+            raw = self._levels_path(job_id).read_bytes()
+        except FileNotFoundError:
+            return {}
+        usable = len(raw) - len(raw) % LEVEL_ENTRY.size
+        return dict(LEVEL_ENTRY.iter_unpack(raw[:usable]))
+
+    def last_seq(self, job_id: str) -> int:
+        """Sequence number of the last record on disk (0 if none)"""
+        _, index_path = self._paths(job_id)
+        try:
+            with open(index_path, "rb") as index_file:
+                size = index_file.seek(0, 2)
+                usable = size - size % INDEX_ENTRY.size
+                if not usable:
+                    return 0
+                index_file.seek(usable - INDEX_ENTRY.size)
+                return BlockInfo(*INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))).last_seq
+        except FileNotFoundError:
+            return 0
+
+    def read_block(self, data_file, block: BlockInfo) -> List[LogRecord]:
+        data_file.seek(block.offset)
+        payload = zlib.decompress(data_file.read(block.length))
+        return [tuple(json.loads(line)) for line in payload.decode().split("\n")]
+
+    def read(self, job_id: str, after_seq: int = 0, limit: Optional[int] = None,
+             blocks: Optional[List[BlockInfo]] = None) -> List[LogRecord]:
+        """Records with a sequence number above ``after_seq``, oldest first"""
+        data_path, _ = self._paths(job_id)
+        blocks = self.index(job_id) if blocks is None else blocks
+        start = bisect.bisect_right([block.last_seq for block in blocks], after_seq)
+        if start == len(blocks):
+            return []
+
+        records: List[LogRecord] = []
+        with open(data_path, "rb") as data_file:
+            for block in blocks[start:]:
+                records.extend(record for record in self.read_block(data_file, block) if record[0] > after_seq)
+                if limit is not None and len(records) >= limit:
+                    return records[:limit]
+        return records
+
+    def query(
+        self,
+        job_id: str,
+        after_seq: int = 0,
+        before_seq: Optional[int] = None,
+        levels: Optional[Iterable[str]] = None,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+        predicate: Optional[Callable[[LogRecord], bool]] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[LogRecord], int]:
+        """
+        Records matching every given filter, oldest first.
+
+        Only blocks that can match are decompressed: the index rules out
+        blocks outside the sequence and time range, and the level index
+        those without any wanted level. Also returns the sequence number
+        the file was searched up to, for continuing with newer records.
+        """
+        data_path, _ = self._paths(job_id)
+        blocks = self.index(job_id)
+        level_set = set(levels) if levels is not None else None
+        wanted = level_mask(level_set) if level_set is not None else ALL_LEVELS
+        masks = self.level_masks(job_id) if level_set is not None else {}
+        start = bisect.bisect_right([block.last_seq for block in blocks], after_seq)
+        searched = max(after_seq, blocks[-1].last_seq) if blocks else after_seq
+        matches = record_filter(level_set, start_ts, end_ts, predicate)
+
+        records: List[LogRecord] = []
+        if start == len(blocks):
+            return records, searched
+        with open(data_path, "rb") as data_file:
+            for block in blocks[start:]:
+                if before_seq is not None and block.first_seq >= before_seq:
+                    break
+                if (
+                    (start_ts is not None and block.last_ts < start_ts)
+                    or (end_ts is not None and block.first_ts > end_ts)
+                    or not masks.get(block.offset, ALL_LEVELS) & wanted
+                ):
+                    continue
+                for record in self.read_block(data_file, block):
+                    if record[0] <= after_seq:
+                        continue
+                    if before_seq is not None and record[0] >= before_seq:
+                        break
+                    if matches(record):
+                        records.append(record)
+                        if limit is not None and len(records) >= limit:
+                            return records, record[0]
+        return records, searched
+
+    def delete(self, job_id: str):
+        for path in (*self._paths(job_id), self._levels_path(job_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
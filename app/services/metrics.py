@@ -0,0 +1,208 @@
+"""
+Per-job resource accounting: phase timings, CPU time, peak memory
+"""
+import asyncio
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # Optional; falls back to /proc on Linux
+    psutil = None
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+METRIC_FIELDS = [
+    "queue_wait_seconds",
+    "decode_seconds",
+    "inference_seconds",
+    "encode_seconds",
+    "processing_seconds",
+    "cpu_seconds",
+    "peak_rss_bytes",
+    "audio_duration_seconds",
+    "real_time_factor",
+]
+
+PERCENTILES = [50, 90, 95, 99]
+
+def audio_duration(file_path: Path) -> Optional[float]:
+    """Duration of an audio file in seconds, if soundfile can read its header"""
+    if soundfile is None:
+        return None
+    try:
+        return float(soundfile.info(str(file_path)).duration)
+    except Exception:
+        return None
+
+def preset_name(options: Dict[str, Any]) -> str:
+    """Stable label for the processing options a job ran with"""
+    used = {key: value for key, value in options.items() if value is not None}
+    if not used:
+        return "default"
+    return ",".join(f"{key}={value}" for key, value in sorted(used.items()))
+
+def _read_proc(pid: int) -> Optional[tuple]:
+    """(cpu_seconds, peak_rss_bytes) from /proc, or None if unavailable"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime, stime, cutime, cstime are fields 14-17 (1-based) of stat
+        ticks = sum(int(value) for value in fields[11:15])
+        cpu = ticks / os.sysconf("SC_CLK_TCK")
+        peak = None
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+                    break
+        return cpu, peak
+    except (OSError, IndexError, ValueError):
+        return None
+
+class ProcessSampler:
+    """
+    Periodically samples CPU time and resident memory of a subprocess.
+
+    Readings stop when the process exits, so totals are accurate to one
+    sampling interval. Uses psutil when installed and /proc otherwise;
+    on platforms with neither the values stay None.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_seconds: Optional[float] = None
+        self.peak_rss_bytes: Optional[int] = None
+        self._process = None
+        self._task: Optional[asyncio.Task] = None
+        if psutil is not None:
+            try:
+                self._process = psutil.Process(pid)
+            except psutil.Error:
+                self._process = None
+
+    def sample(self) -> None:
+        if self._process is not None:
+            try:
+                with self._process.oneshot():
+                    times = self._process.cpu_times()
+                    cpu = times.user + times.system + times.children_user + times.children_system
+                    rss = self._process.memory_info().rss
+                for child in self._process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+            except psutil.Error:
+                return
+        else:
+            reading = _read_proc(self.pid)
+            if reading is None:
+                return
+            cpu, rss = reading
+
+        self.cpu_seconds = cpu
+        if rss is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, rss)
+
+    def start(self) -> None:
+        self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class PhaseTimer:
+    """
+    Wall-clock phases of one track inside a demucs run.
+
+    Demucs loads the model and decodes the audio before its first progress
+    line, runs inference while the progress bar advances, and writes the
+    stems after the last one, so progress lines mark the phase boundaries.
+    """
+
+    def __init__(self, sampler: Optional[ProcessSampler] = None):
+        self.sampler = sampler
+        self.started = time.monotonic()
+        self.first_progress: Optional[float] = None
+        self.last_progress: Optional[float] = None
+        self.cpu_start = sampler.cpu_seconds if sampler else None
+
+    def progress(self) -> None:
+        now = time.monotonic()
+        if self.first_progress is None:
+            self.first_progress = now
+        self.last_progress = now
+
+    def finish(self) -> Dict[str, Any]:
+        """Phase durations up to now plus the CPU/memory readings"""
+        ended = time.monotonic()
+        metrics: Dict[str, Any] = {"processing_seconds": ended - self.started}
+        if self.first_progress is not None:
+            metrics["decode_seconds"] = self.first_progress - self.started
+            metrics["inference_seconds"] = self.last_progress - self.first_progress
+            metrics["encode_seconds"] = ended - self.last_progress
+        if self.sampler is not None:
+            self.sampler.sample()
+            if self.sampler.cpu_seconds is not None:
+                metrics["cpu_seconds"] = self.sampler.cpu_seconds - (self.cpu_start or 0)
+            metrics["peak_rss_bytes"] = self.sampler.peak_rss_bytes
+        return metrics
+
+def build_metrics(
+    job: Dict[str, Any],
+    phases: Dict[str, Any],
+    duration: Optional[float],
+    preset: str
+) -> Dict[str, Any]:
+    """Combine phase timings with queue wait, audio duration and real-time factor"""
+    metrics = dict(phases)
+    metrics["model"] = job["model"]
+    metrics["preset"] = preset
+    metrics["audio_duration_seconds"] = duration
+
+    queued_at = job.get("queued_at") or job.get("created_at")
+    if job.get("started_at") and queued_at:
+        metrics["queue_wait_seconds"] = max(0.0, (job["started_at"] - queued_at).total_seconds())
+
+    if duration:
+        metrics["real_time_factor"] = metrics["processing_seconds"] / duration
+    return metrics
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Count, mean and percentiles of every metric over a group of jobs"""
+    summary: Dict[str, Any] = {"jobs": len(rows)}
+    for field in METRIC_FIELDS:
+        values = sorted(row[field] for row in rows if row.get(field) is not None)
+        if not values:
+            summary[field] = None
+            continue
+        summary[field] = {
+            "mean": sum(values) / len(values),
+            **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES},
+            "max": values[-1],
+        }
+    return summary
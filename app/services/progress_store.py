@@ -0,0 +1,97 @@
+"""
+Write-coalescing store for job progress updates
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ProgressStore:
+    """
+    Holds the latest progress and message of running jobs in memory.
+
+    Progress lines arrive many times per second per job; writing each one
+    is a separate SQLite transaction competing for the single writer lock.
+    Updates land here instead, readers overlay them on the row they load,
+    and a background task writes every dirty job in one transaction at a
+    bounded rate. Status transitions go straight to the database and take
+    the job's buffered fields with them (see ``take``).
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._live: Dict[str, Dict[str, Any]] = {}  # What readers should see
+        self._dirty: set = set()  # Jobs with values not yet in the database
+        self._writer: Optional[Callable[[Dict[str, Dict[str, Any]]], Awaitable[int]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def set_writer(self, writer: Callable[[Dict[str, Dict[str, Any]]], Awaitable[int]]):
+        """Register the coroutine that persists {job_id: fields} in one transaction"""
+        self._writer = writer
+
+    def update(self, job_id: str, **fields):
+        """Record new values for a job; visible to readers immediately"""
+        fields["updated_at"] = datetime.utcnow()
+        self._live.setdefault(job_id, {}).update(fields)
+        self._dirty.add(job_id)
+
+    def take(self, job_id: str) -> Dict[str, Any]:
+        """Remove and return a job's buffered values, for a direct write to absorb"""
+        self._dirty.discard(job_id)
+        return self._live.pop(job_id, {})
+
+    def overlay(self, job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Apply buffered values to a job dict loaded from the database"""
+        if job is not None:
+            live = self._live.get(job["job_id"])
+            if live:
+                job.update(live)
+        return job
+
+    async def flush(self) -> int:
+        """Write every dirty job in a single transaction"""
+        if not self._dirty or self._writer is None:
+            return 0
+        job_ids, self._dirty = self._dirty, set()
+        updates = {job_id: dict(self._live[job_id]) for job_id in job_ids if job_id in self._live}
+        try:
+            return await self._writer(updates)
+        except Exception:
+            # Try again on the next tick
+            self._dirty.update(job_ids)
+            raise
+        finally:
+            # Written values are now in the row; keep only newer ones in memory
+            for job_id, fields in updates.items():
+                if job_id not in self._dirty and self._live.get(job_id) == fields:
+                    self._live.pop(job_id, None)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Progress flush failed: {e}")
+
+# Global progress store instance
+progress_store = ProgressStore(settings.progress_flush_interval)
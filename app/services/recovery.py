@@ -0,0 +1,332 @@
+"""
+Crash recovery: reconcile job rows with live workers and files on disk
+"""
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.audio import ProcessingStatus
+from app.services.audio_processor import WORKER_ID, audio_processor
+from app.services.db_job_service import db_job_service
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {
+    ProcessingStatus.COMPLETED.value,
+    ProcessingStatus.FAILED.value,
+    ProcessingStatus.CANCELLED.value,
+}
+
+def _parse_uuid(value: str) -> Optional[str]:
+    """Return value if it is a UUID string, else None"""
+    try:
+        return str(uuid.UUID(value)) if len(value) == 36 else None
+    except ValueError:
+        return None
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process with this PID exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def worker_is_gone(job: Dict[str, Any], now: datetime) -> bool:
+    """
+    Decide whether the worker that claimed a PROCESSING job has died.
+
+    Workers on this host are checked directly by PID. A job claimed by an
+    earlier incarnation of this very process (same PID, different token) is
+    always orphaned. Anything else is judged by how long the row has gone
+    without an update.
+    """
+    worker_id = job.get("worker_id")
+    if worker_id == WORKER_ID:
+        return False
+
+    if worker_id:
+        host, _, rest = worker_id.partition(":")
+        pid_text = rest.split(":", 1)[0]
+        if host == socket.gethostname() and pid_text.isdigit():
+            pid = int(pid_text)
+            if pid == os.getpid():
+                return True
+            return not _pid_alive(pid)
+
+    last_seen = job.get("updated_at") or job["created_at"]
+    return (now - last_seen).total_seconds() > settings.recovery_stale_after
+
+class DirectoryScanner:
+    """
+    Resumable, bounded walk over the entries of one directory.
+
+    Keeps its ``os.scandir`` iterator between calls, so every call looks at a
+    fixed number of entries regardless of directory size, and successive
+    calls cover the whole directory before starting over.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._iterator = None
+
+    def next_batch(self, limit: int) -> List[Tuple[str, bool, float]]:
+        """Return up to ``limit`` (name, is_dir, mtime) tuples"""
+        entries = []
+        while len(entries) < limit:
+            if self._iterator is None:
+                if not self.path.exists():
+                    break
+                self._iterator = os.scandir(self.path)
+            try:
+                entry = next(self._iterator)
+            except StopIteration:
+                self._iterator.close()
+                self._iterator = None
+                break
+            try:
+                entries.append((entry.name, entry.is_dir(), entry.stat().st_mtime))
+            except FileNotFoundError:
+                continue
+        return entries
+
+def _remove_path(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    elif path.exists():
+        path.unlink()
+
+class RecoverySweeper:
+    """
+    Startup and periodic reconciliation of jobs, batches and files.
+
+    Each pass does a bounded amount of work: active jobs are few, and the
+    jobs table and the temp/output directories are walked incrementally
+    with cursors that carry over between passes.
+    """
+
+    def __init__(self):
+        self._temp_scanner = DirectoryScanner(settings.temp_dir)
+        self._output_scanner = DirectoryScanner(settings.output_dir)
+        self._row_cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Run a pass now and then every ``settings.recovery_interval`` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                stats = await self.sweep()
+                if any(stats.values()):
+                    logger.info(f"Recovery sweep: {stats}")
+            except Exception as e:
+                logger.error(f"Recovery sweep failed: {e}")
+            await asyncio.sleep(settings.recovery_interval)
+
+    async def sweep(self) -> Dict[str, int]:
+        """Run one reconciliation pass"""
+        return {
+            "orphaned_jobs": await self.recover_orphaned_jobs(),
+            "resumed_retries": await self.resume_lost_retries(),
+            "finalized_batches": await self.reconcile_batches(),
+            "missing_files": await self.check_job_files(),
+            "removed_entries": await self.remove_orphaned_entries(),
+            "pruned_invalidations": await self.prune_invalidations(),
+        }
+
+    async def recover_orphaned_jobs(self) -> int:
+        """Re-queue or fail PROCESSING jobs whose worker is gone"""
+        now = datetime.utcnow()
+        recovered = 0
+
+        for job in await db_job_service.get_jobs_by_status(ProcessingStatus.PROCESSING):
+            if not worker_is_gone(job, now):
+                continue
+
+            job_id = job["job_id"]
+            file_path = Path(job["file_path"]) if job.get("file_path") else None
+            requeue = (
+                settings.recovery_policy == "requeue"
+                and job.get("attempts", 0) < settings.recovery_max_attempts
+                and file_path is not None
+                and file_path.exists()
+            )
+
+            if requeue:
+                released = await db_job_service.release_job(
+                    job_id,
+                    job.get("worker_id"),
+                    ProcessingStatus.PENDING,
+                    message="Re-queued after the worker processing it stopped"
+                )
+                if not released:
+                    continue
+                # Drop partial output from the interrupted run
+                await asyncio.to_thread(_remove_path, settings.output_dir / job_id)
+                audio_processor.submit(job_id, file_path, job["model"])
+            else:
+                released = await db_job_service.release_job(
+                    job_id,
+                    job.get("worker_id"),
+                    ProcessingStatus.FAILED,
+                    message="Processing failed: worker stopped before the job finished",
+                    error="Worker stopped before the job finished"
+                )
+                if not released:
+                    continue
+                if file_path is not None:
+                    await asyncio.to_thread(_remove_path, file_path)
+
+            recovered += 1
+            logger.warning(f"Recovered orphaned job {job_id} ({'re-queued' if requeue else 'failed'})")
+
+        return recovered
+
+    async def resume_lost_retries(self) -> int:
+        """
+        Start retries whose timer died with the process that scheduled it.
+
+        A retry still waiting long after its due time has no live timer;
+        claiming it first keeps a late timer elsewhere from running it twice.
+        """
+        overdue = datetime.utcnow() - timedelta(seconds=60)
+        resumed = 0
+        for job in await db_job_service.get_due_retries(overdue, settings.recovery_scan_batch):
+            if not await db_job_service.claim_retry(job["job_id"], job["next_retry_at"]):
+                continue
+            audio_processor.submit(job["job_id"], Path(job["file_path"]), job["model"])
+            resumed += 1
+        return resumed
+    
+    async def reconcile_batches(self) -> int:
+        """Close batches whose children have all reached a terminal state"""
+        finalized = 0
+        for batch in await db_job_service.get_batches_by_status(ProcessingStatus.PROCESSING):
+            jobs = await db_job_service.get_batch_jobs(batch["batch_id"])
+            if not jobs or any(job["status"] not in TERMINAL_STATUSES for job in jobs):
+                continue
+            completed = sum(1 for job in jobs if job["status"] == ProcessingStatus.COMPLETED.value)
+            await db_job_service.update_batch(
+                batch["batch_id"],
+                status=ProcessingStatus.COMPLETED if completed else ProcessingStatus.FAILED,
+                message=f"Processed {completed} of {len(jobs)} tracks"
+            )
+            finalized += 1
+        return finalized
+
+    async def check_job_files(self) -> int:
+        """Fail PENDING/COMPLETED jobs whose files are no longer on disk"""
+        rows = await db_job_service.scan_jobs(
+            self._row_cursor,
+            settings.recovery_scan_batch,
+            [ProcessingStatus.PENDING, ProcessingStatus.COMPLETED]
+        )
+        self._row_cursor = rows[-1][0] if len(rows) == settings.recovery_scan_batch else 0
+
+        def missing(job: Dict[str, Any]) -> bool:
+            if job["status"] == ProcessingStatus.PENDING.value:
+                return not job.get("file_path") or not Path(job["file_path"]).exists()
+            return not job.get("output_dir") or not Path(job["output_dir"]).exists()
+
+        jobs = [job for _, job in rows]
+        flags = await asyncio.to_thread(lambda: [missing(job) for job in jobs])
+
+        failed = 0
+        for job, is_missing in zip(jobs, flags):
+            if not is_missing:
+                continue
+            what = "Uploaded file" if job["status"] == ProcessingStatus.PENDING.value else "Output files"
+            await db_job_service.update_job(
+                job["job_id"],
+                status=ProcessingStatus.FAILED,
+                error=f"{what} missing on disk",
+                message=f"{what} missing on disk"
+            )
+            failed += 1
+        return failed
+
+    async def remove_orphaned_entries(self) -> int:
+        """
+        Remove temp/output entries that no job or batch row accounts for.
+
+        Only names this app creates are considered (``<job_id>``,
+        ``<job_id>.<ext>`` and ``batch_<batch_id>``), and only once they are
+        older than the grace period, so in-flight uploads are left alone.
+        """
+        cutoff = time.time() - settings.recovery_grace_period
+        limit = settings.recovery_scan_batch
+        temp_entries = await asyncio.to_thread(self._temp_scanner.next_batch, limit)
+        output_entries = await asyncio.to_thread(self._output_scanner.next_batch, limit)
+
+        job_paths: Dict[str, List[Tuple[Path, bool]]] = {}  # job_id -> [(path, is_temp)]
+        batch_paths: Dict[str, Path] = {}
+
+        for name, is_dir, mtime in temp_entries:
+            if mtime > cutoff:
+                continue
+            if is_dir and name.startswith("batch_"):
+                batch_id = _parse_uuid(name[len("batch_"):])
+                if batch_id:
+                    batch_paths[batch_id] = settings.temp_dir / name
+            elif not is_dir:
+                job_id = _parse_uuid(Path(name).stem)
+                if job_id:
+                    job_paths.setdefault(job_id, []).append((settings.temp_dir / name, True))
+
+        for name, is_dir, mtime in output_entries:
+            job_id = _parse_uuid(name)
+            if is_dir and job_id and mtime <= cutoff:
+                job_paths.setdefault(job_id, []).append((settings.output_dir / name, False))
+
+        statuses = await db_job_service.get_job_statuses(list(job_paths))
+        batch_statuses = await db_job_service.get_batch_statuses(list(batch_paths))
+
+        to_remove = []
+        for job_id, paths in job_paths.items():
+            status = statuses.get(job_id)
+            for path, is_temp in paths:
+                # Uploads are deleted once a job finishes; outputs only with the row
+                if status is None or (is_temp and status in TERMINAL_STATUSES):
+                    to_remove.append(path)
+        for batch_id, path in batch_paths.items():
+            status = batch_statuses.get(batch_id)
+            if status is None or status in TERMINAL_STATUSES:
+                to_remove.append(path)
+
+        for path in to_remove:
+            await asyncio.to_thread(_remove_path, path)
+            logger.info(f"Removed orphaned path: {path}")
+
+        return len(to_remove)
+
+    async def prune_invalidations(self) -> int:
+        """Drop cross-process cache notifications older than any poller lags behind"""
+        if settings.workers <= 1:
+            return 0
+        keep = max(60.0, settings.cache_poll_interval * 100)
+        return await db_job_service.prune_invalidations(datetime.utcnow() - timedelta(seconds=keep))
+
+# Global recovery sweeper instance
+recovery_sweeper = RecoverySweeper()
@@ -0,0 +1,94 @@
+"""
+Retention of separated outputs: age TTL and disk quota with LRU eviction
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+from app.services.storage import remove_job_files
+
+logger = logging.getLogger(__name__)
+
+class RetentionManager:
+    """
+    Keeps ``settings.output_dir`` within its age and size limits.
+
+    Finished jobs are evicted least-recently-downloaded first, in batches:
+    the rows of a batch are deleted in one transaction, then their files
+    are removed off the event loop.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Enforce retention now and then every ``settings.retention_interval`` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                stats = await self.enforce()
+                if stats["expired_jobs"] or stats["evicted_jobs"]:
+                    logger.info(f"Retention: {stats}")
+            except Exception as e:
+                logger.error(f"Retention pass failed: {e}")
+            await asyncio.sleep(settings.retention_interval)
+
+    async def _evict(self, jobs: List[Dict[str, Any]]) -> int:
+        """Delete rows first so nothing new starts reading, then the files"""
+        deleted = await db_job_service.delete_jobs([job["job_id"] for job in jobs])
+        for job in jobs:
+            await asyncio.to_thread(remove_job_files, job)
+        return deleted
+
+    async def enforce(self) -> Dict[str, int]:
+        """Run one retention pass: age TTL first, then the byte quota"""
+        stats = {"expired_jobs": 0, "evicted_jobs": 0, "freed_bytes": 0}
+        batch_size = settings.retention_batch_size
+
+        if settings.retention_max_age_hours is not None:
+            cutoff = datetime.utcnow() - timedelta(hours=settings.retention_max_age_hours)
+            while True:
+                jobs = await db_job_service.get_eviction_candidates(batch_size, before=cutoff)
+                if not jobs:
+                    break
+                stats["expired_jobs"] += await self._evict(jobs)
+                stats["freed_bytes"] += sum(job["output_bytes"] for job in jobs)
+
+        if settings.retention_max_bytes is not None:
+            usage = await db_job_service.get_output_usage()
+            if usage > settings.retention_max_bytes:
+                # Evict below the quota so the next job doesn't trigger another pass
+                target = settings.retention_max_bytes * settings.retention_target_ratio
+                while usage > target:
+                    jobs = await db_job_service.get_eviction_candidates(batch_size)
+                    if not jobs:
+                        break
+                    # Only take as many LRU jobs as needed to reach the target
+                    selected = []
+                    for job in jobs:
+                        if usage <= target:
+                            break
+                        selected.append(job)
+                        usage -= job["output_bytes"]
+                    stats["evicted_jobs"] += await self._evict(selected)
+                    stats["freed_bytes"] += sum(job["output_bytes"] for job in selected)
+
+        return stats
+
+# Global retention manager instance
+retention_manager = RetentionManager()
@@ -0,0 +1,51 @@
+"""
+Filesystem helpers for job inputs and outputs
+"""
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.services.log_capture import log_capture
+
+logger = logging.getLogger(__name__)
+
+def remove_job_files(job: Dict[str, Any]) -> None:
+    """
+    Remove the uploaded file, all separated output and the logs of a job.
+
+    Blocking; call it from a thread when running on the event loop with
+    large output directories.
+    """
+    job_id = job["job_id"]
+
+    try:
+        if job.get("file_path"):
+            file_path = Path(job["file_path"])
+            if file_path.exists():
+                file_path.unlink()
+                logger.info(f"Deleted original file: {file_path}")
+    except Exception as e:
+        logger.warning(f"Error deleting original file for {job_id}: {e}")
+
+    try:
+        # The whole job directory, not just the stem directory inside it
+        job_dir = settings.output_dir / job_id
+        if job_dir.exists():
+            shutil.rmtree(job_dir)
+            logger.info(f"Deleted job directory: {job_dir}")
+
+        # Also delete the output_dir if it lives somewhere else
+        if job.get("output_dir"):
+            output_dir = Path(job["output_dir"])
+            if output_dir.exists() and job_dir not in output_dir.parents and output_dir != job_dir:
+                shutil.rmtree(output_dir)
+                logger.info(f"Deleted output directory: {output_dir}")
+    except Exception as e:
+        logger.warning(f"Error deleting directories for {job_id}: {e}")
+
+    try:
+        log_capture.clear_logs(job_id)
+    except Exception as e:
+        logger.warning(f"Error deleting logs for {job_id}: {e}")
@@ -0,0 +1,225 @@
+"""
+Resumable uploads: sessions that receive a file in chunks at arbitrary offsets
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.uploads import UploadError
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge ``(start, end)`` ranges into sorted, non-overlapping ones"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class UploadSessionStore:
+    """
+    Upload sessions kept under ``<temp_dir>/uploads/<session_id>/``.
+
+    A session declares its file's length up front; ``data`` is created at
+    that size and chunks are written into it at their offsets, so
+    independent chunks can arrive in parallel, over several requests or
+    processes. Each chunk is appended to ``ranges`` once it is on disk, and
+    the upload offset is where the received data starting at 0 ends. All
+    state is in files, so a session survives restarts and is visible to
+    every worker.
+
+    Sessions without activity for ``settings.upload_session_ttl`` seconds
+    are removed by a background sweep.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._task: Optional[asyncio.Task] = None
+
+    def _path(self, session_id: str) -> Optional[Path]:
+        if not SESSION_ID.match(session_id):
+            return None
+        path = self.directory / session_id
+        return path if path.is_dir() else None
+
+    def create(self, filename: str, length: int, model: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Start a session for a file of ``length`` bytes, optionally with the SHA-256 it must have"""
+        session_id = uuid.uuid4().hex
+        path = self.directory / session_id
+        path.mkdir()
+        with open(path / "data", "wb") as f:
+            f.truncate(length)
+        meta = {
+            "session_id": session_id,
+            "filename": filename,
+            "length": length,
+            "model": model,
+            "content_hash": content_hash,
+            "created_at": time.time(),
+        }
+        # Written last and atomically: a session directory without meta is incomplete
+        tmp_path = path / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, path / "meta.json")
+        return self._state(path, meta)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session metadata with ``ranges`` received, ``offset`` and ``expires_at``"""
+        path = self._path(session_id)
+        if path is None:
+            return None
+        try:
+            meta = json.loads((path / "meta.json").read_text())
+            return self._state(path, meta)
+        except (OSError, ValueError):
+            return None
+
+    def _state(self, path: Path, meta: Dict[str, Any]) -> Dict[str, Any]:
+        ranges: List[Tuple[int, int]] = []
+        try:
+            with open(path / "ranges") as f:
+                for line in f:
+                    start, size = line.split()
+                    ranges.append((int(start), int(start) + int(size)))
+        except FileNotFoundError:
+            pass
+        ranges = merge_ranges(ranges)
+        offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+        return {
+            **meta,
+            "ranges": ranges,
+            "received": sum(end - start for start, end in ranges),
+            "offset": offset,
+            "expires_at": self._last_activity(path) + settings.upload_session_ttl,
+        }
+
+    def _last_activity(self, path: Path) -> float:
+        for name in ("ranges", "meta.json"):
+            try:
+                return (path / name).stat().st_mtime
+            except FileNotFoundError:
+                continue
+        return path.stat().st_mtime
+
+    async def write(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Write a request body into a session at ``offset``.
+
+        Data is written in ``settings.upload_chunk_size`` pieces from a worker
+        thread, and each piece is recorded as received once it is on disk,
+        so an interrupted request keeps what it delivered. Data past the
+        declared length is refused. Returns the bytes written.
+        """
+        state = self.get(session_id)
+        if state is None:
+            raise UploadError(404, "Upload not found")
+        if offset < 0 or offset > state["length"]:
+            raise UploadError(409, f"Offset {offset} is outside the upload (length {state['length']})")
+        path = self.directory / session_id
+        fd = await asyncio.to_thread(os.open, path / "data", os.O_WRONLY)
+        position = offset
+        buffer = bytearray()
+
+        def write_piece(piece: bytes, at: int):
+            os.pwrite(fd, piece, at)
+            with open(path / "ranges", "a") as f:
+                f.write(f"{at} {len(piece)}\n")
+
+        try:
+            async for data in chunks:
+                if position + len(buffer) + len(data) > state["length"]:
+                    raise UploadError(400, f"Chunk extends past the upload length of {state['length']} bytes")
+                buffer += data
+                if len(buffer) >= settings.upload_chunk_size:
+                    piece, buffer = bytes(buffer), bytearray()
+                    await asyncio.to_thread(write_piece, piece, position)
+                    position += len(piece)
+        finally:
+            # Keep whatever arrived before a disconnect or a refused piece
+            if buffer:
+                await asyncio.to_thread(write_piece, bytes(buffer), position)
+                position += len(buffer)
+            await asyncio.to_thread(os.close, fd)
+        return position - offset
+
+    def finish(self, session_id: str, destination: Path) -> Tuple[int, str]:
+        """
+        Move a complete session's file to ``destination`` and end the session.
+
+        Returns the size and SHA-256 (hex) of the file. Chunks may arrive in
+        any order, so the hash is computed here in one pass over the file.
+        """
+        path = self.directory / session_id
+        os.replace(path / "data", destination)
+        # Fresh mtime, so the orphan sweep sees a new upload rather than an old file
+        os.utime(destination)
+        shutil.rmtree(path, ignore_errors=True)
+        digest = hashlib.sha256()
+        size = 0
+        with open(destination, "rb") as f:
+            while chunk := f.read(settings.upload_chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+        return size, digest.hexdigest()
+
+    def delete(self, session_id: str) -> bool:
+        path = self._path(session_id)
+        if path is None:
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+
+    def expire(self) -> int:
+        """Remove sessions idle for longer than ``settings.upload_session_ttl``"""
+        cutoff = time.time() - settings.upload_session_ttl
+        removed = 0
+        for path in self.directory.iterdir():
+            try:
+                if path.is_dir() and self._last_activity(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except FileNotFoundError:
+                continue  # Finished or deleted meanwhile
+        return removed
+
+    def start(self):
+        """Expire abandoned sessions now and then every ``settings.upload_session_sweep_interval`` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.expire)
+                if removed:
+                    logger.info(f"Expired {removed} abandoned upload session(s)")
+            except Exception as e:
+                logger.error(f"Upload session sweep failed: {e}")
+            await asyncio.sleep(settings.upload_session_sweep_interval)
+
+# Global upload session store instance
+upload_sessions = UploadSessionStore(settings.temp_dir / "uploads")
@@ -0,0 +1,216 @@
+"""
+Streaming uploads: request bodies written to disk in chunks while being hashed
+"""
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import ClientDisconnect, Request
+
+from app.core.config import settings
+
+# Multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# OpenAPI description of a body with one "file" field, for endpoints that read it themselves
+FILE_UPLOAD_BODY: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+class UploadError(Exception):
+    """An upload that was rejected; ``status_code`` and ``detail`` are for the response"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def too_large(max_bytes: int) -> UploadError:
+    return UploadError(400, f"File too large. Maximum size: {max_bytes / 1024 / 1024}MB")
+
+def check_extension(filename: str) -> str:
+    """The lower-cased extension of ``filename``, if it is an accepted audio type"""
+    file_ext = Path(filename).suffix.lower()
+    if file_ext not in settings.allowed_extensions:
+        raise UploadError(
+            400,
+            f"File type {file_ext} not supported. Allowed types: {', '.join(settings.allowed_extensions)}"
+        )
+    return file_ext
+
+class StoredUpload(NamedTuple):
+    filename: str
+    path: Path
+    size: int
+    content_hash: str  # SHA-256, hex
+
+class ChunkedFileWriter:
+    """
+    Writes data to a file in ``chunk_size`` pieces from a worker thread.
+
+    Incoming data is buffered until a chunk is full, so memory stays
+    bounded by one chunk whatever the file size. The SHA-256 of the content
+    is computed on the same thread as each chunk is written, and
+    ``max_bytes`` is enforced as data arrives.
+    """
+
+    def __init__(self, path: Path, max_bytes: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size or settings.upload_chunk_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise too_large(self.max_bytes)
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_size:
+            await self._flush()
+
+    async def _flush(self):
+        chunk, self._buffer = bytes(self._buffer), bytearray()
+        await asyncio.to_thread(self._write_chunk, chunk)
+
+    def _write_chunk(self, chunk: bytes):
+        if self._file is None:
+            self._file = open(self.path, "wb")
+        self._file.write(chunk)
+        self._hash.update(chunk)
+
+    async def close(self) -> str:
+        """Write what is left and return the content hash"""
+        await self._flush()
+        await asyncio.to_thread(self._file.close)
+        return self._hash.hexdigest()
+
+    def discard(self):
+        """Abandon the file, removing what was written"""
+        if self._file is not None:
+            self._file.close()
+        self.path.unlink(missing_ok=True)
+
+class _MultipartEvents:
+    """Parser callbacks, recorded in order for the async side to act on"""
+
+    def __init__(self):
+        self.items: List[Tuple[str, Any]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def on_headers_finished(self):
+        self.items.append(("part", self._headers))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        self.items.append(("data", data[start:end]))
+
+    def on_part_end(self):
+        self.items.append(("end", None))
+
+    def drain(self) -> List[Tuple[str, Any]]:
+        items, self.items = self.items, []
+        return items
+
+async def receive_file(
+    request: Request,
+    path_for: Callable[[str], Path],
+    max_bytes: int,
+    field: str = "file"
+) -> StoredUpload:
+    """
+    Stream the file in a multipart request's ``field`` straight to disk.
+
+    The body is parsed as it arrives and never held in memory beyond one
+    chunk: ``path_for(filename)`` picks the destination once the part's
+    headers are in (raise ``UploadError`` there to refuse the file before
+    any of it is written), and the upload fails as soon as it passes
+    ``max_bytes``. Other form fields are ignored. The partial file is
+    removed on any failure.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError(400, "Expected a multipart/form-data body")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD:
+        raise too_large(max_bytes)
+
+    events = _MultipartEvents()
+    parser = MultipartParser(boundary, events.callbacks())
+    writer: Optional[ChunkedFileWriter] = None
+    filename: Optional[str] = None
+    in_file = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in events.drain():
+                if kind == "part":
+                    _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode("latin-1")
+                    in_file = writer is None and name == field and b"filename" in disposition
+                    if in_file:
+                        filename = Path(disposition[b"filename"].decode("utf-8", errors="replace")).name
+                        writer = ChunkedFileWriter(path_for(filename), max_bytes)
+                elif kind == "data" and in_file:
+                    await writer.write(value)
+                elif kind == "end":
+                    in_file = False
+        parser.finalize()
+        if writer is None:
+            raise UploadError(400, f"No file in form field '{field}'")
+        content_hash = await writer.close()
+    except (ClientDisconnect, MultipartParseError) as e:
+        if writer is not None:
+            writer.discard()
+        if isinstance(e, ClientDisconnect):
+            raise UploadError(400, "Upload interrupted")
+        raise UploadError(400, f"Malformed multipart body: {e}")
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+
+    return StoredUpload(filename, writer.path, writer.size, content_hash)
@@ -0,0 +1,132 @@
+"""
+Streaming zip archives: written on a worker thread and sent while being written
+"""
+import asyncio
+import os
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Chunks written ahead of the client; memory stays within this many chunks
+QUEUE_CHUNKS = 4
+
+# Seconds between checks for a client that went away while the queue is full
+PUT_TIMEOUT = 0.5
+
+# Audio gains little (PCM) or nothing (compressed formats) from deflate
+STORED_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a", ".aac"}
+
+# Marks the end of the archive in the queue
+_DONE = object()
+
+class _StreamClosed(Exception):
+    """The consumer stopped reading"""
+
+class _ChunkWriter:
+    """
+    Write-only file object for ``zipfile`` that hands data to the event loop.
+
+    Writes are gathered into ``chunk_size`` pieces; handing one over blocks
+    while ``QUEUE_CHUNKS`` are already waiting to be sent, and fails once
+    the consumer has gone away.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, chunk_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = threading.Event()
+        self._loop = loop
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._slots = threading.Semaphore(QUEUE_CHUNKS)
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+            self.put(chunk)
+
+    def put(self, item):
+        while not self._slots.acquire(timeout=PUT_TIMEOUT):
+            if self.closed.is_set():
+                raise _StreamClosed()
+        if self.closed.is_set():
+            raise _StreamClosed()
+        self._loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Queue the end of the stream (or the error that ended it); never blocks"""
+        try:
+            self._loop.call_soon_threadsafe(self.queue.put_nowait, error or _DONE)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def taken(self):
+        """Free the slot of a chunk the consumer took"""
+        self._slots.release()
+
+def _write_zip(writer: _ChunkWriter, entries: List[Tuple[Path, str]], chunk_size: int):
+    """
+    Write the archive for ``entries`` (path, name in archive) to ``writer``.
+
+    Files are read ``chunk_size`` at a time; ones that no longer exist are
+    left out. Audio is stored rather than deflated.
+    """
+    try:
+        with zipfile.ZipFile(writer, "w") as archive:
+            for path, arcname in entries:
+                try:
+                    source = open(path, "rb")
+                except FileNotFoundError:
+                    continue
+                with source:
+                    stat = os.fstat(source.fileno())
+                    info = zipfile.ZipInfo(arcname, datetime.fromtimestamp(stat.st_mtime).timetuple()[:6])
+                    info.file_size = stat.st_size  # Lets zipfile decide on ZIP64 up front
+                    if path.suffix.lower() in STORED_EXTENSIONS:
+                        info.compress_type = zipfile.ZIP_STORED
+                    else:
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                    with archive.open(info, "w") as entry:
+                        while chunk := source.read(chunk_size):
+                            entry.write(chunk)
+        writer.flush()
+        writer.finish()
+    except _StreamClosed:
+        pass
+    except BaseException as e:
+        writer.finish(e)
+
+async def stream_zip(entries: List[Tuple[Path, str]], chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Yield a zip archive of ``entries`` as it is written.
+
+    The archive is written on a worker thread into a bounded queue, so the
+    first bytes go out as soon as they exist and memory stays at a few
+    chunks whatever the size of the files. Nothing is seeked: each entry's
+    sizes and CRC follow its data (a data descriptor). Closing the iterator
+    early stops the writer.
+    """
+    chunk_size = chunk_size or settings.download_chunk_size
+    writer = _ChunkWriter(asyncio.get_running_loop(), chunk_size)
+    producer = asyncio.create_task(asyncio.to_thread(_write_zip, writer, entries, chunk_size))
+    try:
+        while True:
+            item = await writer.queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            writer.taken()
+            yield item
+        await producer
+    finally:
+        writer.closed.set()
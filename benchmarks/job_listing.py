@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark job listing: OFFSET pagination vs keyset cursors
+
+Fills a temporary SQLite database with N jobs for each size and times
+GET /api/jobs/ style queries through the job service: the first page, a
+page 90% of the way down the list (OFFSET vs cursor), and the same for a
+status-filtered list.
+
+Usage: python benchmarks/job_listing.py [--sizes 10000 100000 1000000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STATUSES = ["COMPLETED"] * 85 + ["FAILED"] * 10 + ["CANCELLED"] * 3 + ["PENDING"] * 2
+PAGE = 50
+
+def populate(db_path: Path, rows: int):
+    """Bulk-insert synthetic jobs with plain sqlite3 (much faster than the service)"""
+    connection = sqlite3.connect(db_path)
+    start = datetime(2024, 1, 1)
+    chunk = 50000
+    for offset in range(0, rows, chunk):
+        batch = []
+        for i in range(offset, min(rows, offset + chunk)):
+            created = (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S.%f")
+            batch.append((str(uuid.uuid4()), f"track_{i}.wav", "htdemucs", random.choice(STATUSES), 100.0, 0, created, created))
+        connection.executemany(
+            "INSERT INTO jobs (job_id, filename, model, status, progress, attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+        connection.commit()
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+
+def cursor_at(db_path: Path, depth: int, status: str = None) -> str:
+    """Cursor for the page starting ``depth`` rows into the (filtered) list"""
+    from app.services.db_job_service import encode_cursor
+
+    connection = sqlite3.connect(db_path)
+    where = "WHERE status = ?" if status else ""
+    params = [status.upper()] if status else []
+    created_at, row_id = connection.execute(
+        f"SELECT created_at, id FROM jobs {where} ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+        params + [depth - 1]
+    ).fetchone()
+    connection.close()
+    return encode_cursor(datetime.fromisoformat(created_at), row_id)
+
+async def timed(operation, repeat: int) -> float:
+    """Median milliseconds of ``repeat`` runs"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await operation()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def run_size(db_path: Path, rows: int, repeat: int):
+    from app.services.db_job_service import db_job_service
+
+    depth = int(rows * 0.9)
+    completed_depth = int(rows * 0.85 * 0.9)
+    deep_cursor = cursor_at(db_path, depth)
+    completed_cursor = cursor_at(db_path, completed_depth, "completed")
+
+    return {
+        "first page": await timed(lambda: db_job_service.list_jobs_page(limit=PAGE), repeat),
+        "deep offset": await timed(lambda: db_job_service.list_jobs(limit=PAGE, offset=depth), repeat),
+        "deep cursor": await timed(lambda: db_job_service.list_jobs_page(limit=PAGE, cursor=deep_cursor), repeat),
+        "status offset": await timed(
+            lambda: db_job_service.list_jobs(status="completed", limit=PAGE, offset=completed_depth), repeat
+        ),
+        "status cursor": await timed(
+            lambda: db_job_service.list_jobs_page(status="completed", limit=PAGE, cursor=completed_cursor), repeat
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = Path(tmp) / "bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["SYNC_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.chdir(tmp)
+    sys.path.insert(0, str(ROOT))
+
+    import app.models.db_models  # noqa: F401  (registers the tables)
+    from app.core.database import init_db, close_db
+
+    print("Job listing benchmark")
+    print("=" * 50)
+    print(f"Page size {PAGE}, median of {args.repeat} runs, milliseconds\n")
+
+    results = {}
+    loaded = 0
+    for rows in sorted(args.sizes):
+        asyncio.run(init_db())
+        asyncio.run(close_db())
+        print(f"Populating {rows} jobs...")
+        populate(db_path, rows - loaded)
+        loaded = rows
+
+        async def measure():
+            try:
+                return await run_size(db_path, rows, args.repeat)
+            finally:
+                await close_db()
+        results[rows] = asyncio.run(measure())
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    labels = list(next(iter(results.values())))
+    print(f"\n{'rows':>10} " + " ".join(f"{label:>14}" for label in labels))
+    for rows, timings in results.items():
+        print(f"{rows:>10} " + " ".join(f"{timings[label]:>14.2f}" for label in labels))
+
+if __name__ == "__main__":
+    main()
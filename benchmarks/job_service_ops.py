@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of job create/get/update throughput
+
+Compares the job service's single-statement Core paths against the
+previous ORM pattern (load object, set attributes, commit, refresh) on a
+temporary SQLite database. Operations run back to back on one task, so
+the numbers reflect per-operation cost rather than concurrency.
+
+Usage: python benchmarks/job_service_ops.py [--ops 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+async def orm_create(job_id: str):
+    from app.core.database import AsyncSessionLocal
+    from app.models.db_models import Job
+    from app.models.audio import ProcessingStatus
+
+    async with AsyncSessionLocal() as session:
+        job = Job(
+            job_id=job_id, filename="bench.wav", file_path="/dev/null", model="htdemucs",
+            status=ProcessingStatus.PENDING, progress=0.0, message="Job created",
+            created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+        )
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job.to_dict()
+
+async def orm_get(job_id: str):
+    from sqlalchemy import select
+    from app.core.database import AsyncSessionLocal
+    from app.models.db_models import Job
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job).where(Job.job_id == job_id))
+        job = result.scalar_one_or_none()
+        return job.to_dict() if job else None
+
+async def orm_update(job_id: str, **kwargs):
+    from sqlalchemy import select
+    from app.core.database import AsyncSessionLocal
+    from app.models.db_models import Job
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job).where(Job.job_id == job_id))
+        job = result.scalar_one_or_none()
+        for key, value in kwargs.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.utcnow()
+        await session.commit()
+        await session.refresh(job)
+        return job.to_dict()
+
+async def measure(label: str, operation, job_ids) -> float:
+    start = time.perf_counter()
+    for i, job_id in enumerate(job_ids):
+        await operation(job_id, i)
+    elapsed = time.perf_counter() - start
+    rate = len(job_ids) / elapsed
+    print(f"  {label:8} {rate:10.0f} ops/s  ({elapsed * 1000 / len(job_ids):.2f} ms/op)")
+    return rate
+
+async def run(ops: int):
+    from app.core.database import init_db, close_db
+    from app.services.db_job_service import db_job_service
+
+    await init_db()
+    results = {}
+
+    print("\nORM (select + setattr + commit + refresh)")
+    ids = [str(uuid.uuid4()) for _ in range(ops)]
+    results["orm"] = [
+        await measure("create", lambda job_id, i: orm_create(job_id), ids),
+        await measure("get", lambda job_id, i: orm_get(job_id), ids),
+        await measure("update", lambda job_id, i: orm_update(job_id, progress=i % 100, message=f"{i}%"), ids),
+    ]
+
+    print("\nCore (INSERT/UPDATE ... RETURNING, row -> dict)")
+    ids = [str(uuid.uuid4()) for _ in range(ops)]
+    results["core"] = [
+        await measure("create", lambda job_id, i: db_job_service.create_job(job_id, "bench.wav", "/dev/null", "htdemucs"), ids),
+        await measure("get", lambda job_id, i: db_job_service.get_job(job_id), ids),
+        await measure("update", lambda job_id, i: db_job_service.update_job(job_id, progress=i % 100, message=f"{i}%"), ids),
+    ]
+
+    print("\nSpeedup")
+    for name, orm_rate, core_rate in zip(["create", "get", "update"], results["orm"], results["core"]):
+        print(f"  {name:8} {core_rate / orm_rate:10.2f}x")
+
+    await close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        os.environ["SYNC_DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        os.chdir(tmp)
+        sys.path.insert(0, str(ROOT))
+        print("Job service microbenchmark")
+        print("=" * 50)
+        print(f"{args.ops} operations per measurement")
+        asyncio.run(run(args.ops))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark job update/read throughput with and without the SQLite profile
+
+Runs the same workload twice against a fresh database file: once with
+SQLITE_TUNING=false (rollback journal, no busy timeout, direct writes) and
+once with the tuned profile (WAL, pragmas, single writer task). Each run
+starts concurrent writers calling update_job and readers calling get_job
+for a fixed time. The job cache is disabled (CACHE_TTL=0) so every read
+reaches the database.
+
+Usage: python benchmarks/sqlite_profile.py [--jobs 200] [--writers 8] [--readers 8] [--seconds 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+async def run_workload(jobs: int, writers: int, readers: int, seconds: float) -> dict:
+    from app.core.database import init_db, close_db, db_writer
+    from app.services.db_job_service import db_job_service
+
+    await init_db()
+    db_writer.start()
+    job_ids = [str(uuid.uuid4()) for _ in range(jobs)]
+    for job_id in job_ids:
+        await db_job_service.create_job(job_id, "bench.wav", "/dev/null", "htdemucs")
+
+    counts = {"updates": 0, "reads": 0, "errors": 0}
+    latencies = {"updates": [], "reads": []}
+    deadline = time.perf_counter() + seconds
+
+    async def writer(index: int):
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await db_job_service.update_job(job_ids[i % jobs], progress=i % 100, message=f"Processing stems... {i % 100}%")
+                counts["updates"] += 1
+                latencies["updates"].append(time.perf_counter() - start)
+            except Exception:
+                counts["errors"] += 1
+            i += writers
+
+    async def reader(index: int):
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await db_job_service.get_job(job_ids[i % jobs])
+                counts["reads"] += 1
+                latencies["reads"].append(time.perf_counter() - start)
+            except Exception:
+                counts["errors"] += 1
+            i += readers
+
+    await asyncio.gather(
+        *(writer(i) for i in range(writers)),
+        *(reader(i) for i in range(readers))
+    )
+    await db_writer.stop()
+    await close_db()
+
+    def p99(values):
+        values = sorted(values)
+        return values[int(len(values) * 0.99) - 1] * 1000 if values else 0.0
+
+    return {
+        "updates_per_sec": counts["updates"] / seconds,
+        "reads_per_sec": counts["reads"] / seconds,
+        "update_p99_ms": p99(latencies["updates"]),
+        "read_p99_ms": p99(latencies["reads"]),
+        "errors": counts["errors"],
+    }
+
+def run_mode(tuned: bool, args) -> dict:
+    """Run one mode in a subprocess so the engine is configured from scratch"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+            SYNC_DATABASE_URL=f"sqlite:///{db_path}",
+            SQLITE_TUNING="true" if tuned else "false",
+            CACHE_TTL="0",
+            PYTHONPATH=str(ROOT),
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--child",
+             "--jobs", str(args.jobs), "--writers", str(args.writers),
+             "--readers", str(args.readers), "--seconds", str(args.seconds)],
+            env=env, cwd=tmp, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_workload(args.jobs, args.writers, args.readers, args.seconds))
+        print(json.dumps(result))
+        return
+
+    print("SQLite profile benchmark")
+    print("=" * 50)
+    print(f"{args.jobs} jobs, {args.writers} writers, {args.readers} readers, {args.seconds}s per run\n")
+
+    results = {
+        "default": run_mode(False, args),
+        "tuned": run_mode(True, args),
+    }
+    print(f"{'':10} {'updates/s':>10} {'reads/s':>10} {'upd p99 ms':>11} {'read p99 ms':>12} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:10} {r['updates_per_sec']:10.0f} {r['reads_per_sec']:10.0f} "
+              f"{r['update_p99_ms']:11.1f} {r['read_p99_ms']:12.1f} {r['errors']:7d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading a job with its stems (download endpoints)
+
+Fills a temporary SQLite database with N completed jobs of four stems
+each and times, through the job service, what the download endpoints
+run per request: the previous get_job + get_stems pair with and without
+the stems.job_id_fk index, and get_job_with_stems. The job cache is
+cleared before each call so every run reaches the database.
+
+Usage: python benchmarks/stems_loading.py [--sizes 10000 100000 1000000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STEMS = ["vocals", "drums", "bass", "other"]
+INDEX = "ix_stems_job_id_fk"
+
+def populate(db_path: Path, rows: int) -> list:
+    """Bulk-insert synthetic jobs and stems with plain sqlite3; returns the job ids"""
+    connection = sqlite3.connect(db_path)
+    created = "2024-01-01 00:00:00.000000"
+    job_ids = []
+    chunk = 50000
+    for offset in range(0, rows, chunk):
+        jobs, stems = [], []
+        for i in range(offset, min(rows, offset + chunk)):
+            job_id = str(uuid.uuid4())
+            job_ids.append(job_id)
+            jobs.append((job_id, f"track_{i}.wav", "htdemucs", "COMPLETED", 100.0, 0, f"separated/{job_id}", created, created))
+            stems.extend(
+                (job_id, name, f"{name}.wav", f"separated/{job_id}/{name}.wav", 40_000_000, created) for name in STEMS
+            )
+        connection.executemany(
+            "INSERT INTO jobs (job_id, filename, model, status, progress, attempts, output_dir, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            jobs
+        )
+        connection.executemany(
+            "INSERT INTO stems (job_id_fk, name, filename, file_path, file_size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            stems
+        )
+        connection.commit()
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+    return job_ids
+
+def set_index(db_path: Path, present: bool):
+    connection = sqlite3.connect(db_path)
+    if present:
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {INDEX} ON stems (job_id_fk)")
+    else:
+        connection.execute(f"DROP INDEX IF EXISTS {INDEX}")
+    connection.commit()
+    connection.close()
+
+async def timed(operation, job_ids: list, repeat: int) -> float:
+    """Median milliseconds of ``repeat`` runs on random jobs"""
+    from app.services.job_cache import job_cache
+
+    samples = []
+    for _ in range(repeat):
+        job_id = random.choice(job_ids)
+        job_cache.clear()
+        start = time.perf_counter()
+        await operation(job_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def two_queries(job_id: str):
+    from app.services.db_job_service import db_job_service
+
+    await db_job_service.get_job(job_id)
+    await db_job_service.get_stems(job_id)
+
+async def one_query(job_id: str):
+    from app.services.db_job_service import db_job_service
+
+    await db_job_service.get_job_with_stems(job_id)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = Path(tmp) / "bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["SYNC_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.chdir(tmp)
+    sys.path.insert(0, str(ROOT))
+
+    import app.models.db_models  # noqa: F401  (registers the tables)
+    from app.core.database import init_db, close_db
+
+    print("Job + stems loading benchmark")
+    print("=" * 50)
+    print(f"{len(STEMS)} stems per job, median of {args.repeat} runs, milliseconds\n")
+
+    results = {}
+    job_ids = []
+    for rows in sorted(args.sizes):
+        asyncio.run(init_db())
+        asyncio.run(close_db())
+        print(f"Populating {rows} jobs...")
+        job_ids += populate(db_path, rows - len(job_ids))
+
+        async def measure():
+            try:
+                timings = {}
+                set_index(db_path, False)
+                timings["2 queries, no index"] = await timed(two_queries, job_ids, args.repeat)
+                set_index(db_path, True)
+                timings["2 queries, index"] = await timed(two_queries, job_ids, args.repeat)
+                timings["1 query, index"] = await timed(one_query, job_ids, args.repeat)
+                return timings
+            finally:
+                await close_db()
+        results[rows] = asyncio.run(measure())
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    labels = list(next(iter(results.values())))
+    print(f"\n{'jobs':>10} " + " ".join(f"{label:>20}" for label in labels))
+    for rows, timings in results.items():
+        print(f"{rows:>10} " + " ".join(f"{timings[label]:>20.2f}" for label in labels))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared fixtures: the app runs against a temporary SQLite database
+
+The database URL and the storage directories are read when ``app`` is
+imported, so the environment is set up here, at collection time, before
+any test module imports it.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="stem_separator_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir}/test.db"
+os.environ.pop("SYNC_DATABASE_URL", None)
+for _name in ("output_dir", "temp_dir", "log_dir"):
+    os.environ[_name.upper()] = os.path.join(_workdir, _name)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.archive import archive_manager  # noqa: E402
+from app.services.db_job_service import db_job_service  # noqa: E402
+from app.services.recovery import recovery_sweeper  # noqa: E402
+from app.services.retention import retention_manager  # noqa: E402
+
+@pytest.fixture(scope="session")
+def client():
+    """A client for the app, started up once for the whole run"""
+    with TestClient(app) as test_client:
+        # The sweepers would fail or move the tests' jobs (no files on disk)
+        for sweeper in (recovery_sweeper, retention_manager, archive_manager):
+            test_client.portal.call(sweeper.stop)
+        yield test_client
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+@pytest.fixture
+def call(client):
+    """Run a coroutine function on the app's event loop: ``call(fn, *args)``"""
+    return client.portal.call
+
+@pytest.fixture
+def wav_bytes():
+    """A small file with a .wav header (never decoded)"""
+    return b"RIFF0000WAVEfmt " + b"\0" * 2000
+
+@pytest.fixture
+def completed_job(call):
+    """
+    Create a completed job as processing would leave it: ``completed_job(stems,
+    upload=b"...")`` with ``stems`` mapping stem names to their file contents.
+    Returns the job dict.
+    """
+    def create(stems, upload=b"uploaded audio", model="htdemucs"):
+        job_id = str(uuid.uuid4())
+        stem_dir = settings.output_dir / job_id / model / job_id
+        stem_dir.mkdir(parents=True)
+        stems_data = []
+        for name, content in stems.items():
+            path = stem_dir / f"{name}.wav"
+            path.write_bytes(content)
+            stems_data.append({
+                "name": name, "filename": path.name, "file_path": str(path), "file_size": len(content)
+            })
+        return call(lambda: db_job_service.create_job(
+            job_id, "song.wav", None, model,
+            content_hash=hashlib.sha256(upload).hexdigest(), file_size=len(upload),
+            stems=stems_data, output_dir=str(stem_dir)
+        ))
+    return create
@@ -0,0 +1,69 @@
+"""
+Archived jobs: moved out of the hot tables, still found, downloaded and deleted
+"""
+import io
+import zipfile
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.models.audio import ProcessingStatus
+from app.services.db_job_service import db_job_service
+
+STATUSES = [status.value for status in ProcessingStatus]
+
+async def _backdate(job_id: str):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE jobs SET created_at = :moment, updated_at = :moment WHERE job_id = :job_id"),
+            {"moment": "1985-01-01 00:00:00.000000", "job_id": job_id}
+        )
+        await session.commit()
+
+async def _tier(job_id: str) -> str:
+    async with AsyncSessionLocal() as session:
+        for table in ("jobs", "jobs_archive"):
+            found = await session.execute(text(f"SELECT 1 FROM {table} WHERE job_id = :job_id"), {"job_id": job_id})
+            if found.first():
+                return table
+    return "none"
+
+def _stats(client):
+    return client.get("/api/jobs/stats").json()
+
+def test_archived_job_round_trip(client, call, completed_job):
+    stems = {"vocals": b"vocals" * 100, "drums": b"drums" * 100}
+    job = completed_job(stems)
+    job_id = job["job_id"]
+    call(_backdate, job_id)
+    before = _stats(client)
+
+    assert call(db_job_service.archive_jobs, datetime(1986, 1, 1), 100) == 1
+    assert call(_tier, job_id) == "jobs_archive"
+    # Archiving moves rows without changing what is counted
+    assert _stats(client) == before
+
+    assert call(db_job_service.get_job, job_id)["status"] == "completed"
+    assert sorted(stem["name"] for stem in call(db_job_service.get_job_with_stems, job_id)["stems"]) == sorted(stems)
+    assert len(call(db_job_service.get_stems, job_id)) == 2
+    assert client.get(f"/api/jobs/{job_id}").status_code == 200
+
+    response = client.get(f"/api/audio/download/{job_id}/vocals")
+    assert response.status_code == 200
+    assert response.content == stems["vocals"]
+    with zipfile.ZipFile(io.BytesIO(client.get(f"/api/audio/download/{job_id}").content)) as archive:
+        assert sorted(archive.namelist()) == ["song_drums.wav", "song_vocals.wav"]
+    # Downloads count as use for retention, in the archive too
+    assert call(db_job_service.get_job, job_id)["last_accessed_at"] is not None
+
+    assert client.delete(f"/api/audio/job/{job_id}").status_code == 200
+    assert call(_tier, job_id) == "none"
+    assert call(db_job_service.get_stems, job_id) == []
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+
+    after = _stats(client)
+    assert after["completed"] == before["completed"] - 1
+    assert after["total"] == before["total"] - 1
+    counts = call(db_job_service.count_jobs_by_status)
+    assert {status: after[status] for status in STATUSES} == counts
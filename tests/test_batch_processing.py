@@ -0,0 +1,96 @@
+"""
+Batch processing: one demucs run whose output drives every child job as it goes
+"""
+import hashlib
+import io
+import sys
+import textwrap
+import uuid
+import zipfile
+
+import pytest
+
+from app.core.config import settings
+from app.services.audio_processor import audio_processor
+from app.services.db_job_service import db_job_service
+from app.services.log_capture import log_capture
+
+# Prints like demucs: "Separating track" on stdout (without flushing, as
+# print does when piped), progress bars on stderr, and takes a while per track
+FAKE_DEMUCS = textwrap.dedent('''
+    import argparse, shutil, sys, time
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n")
+    parser.add_argument("-o")
+    parser.add_argument("-d")
+    parser.add_argument("--segment")
+    parser.add_argument("tracks", nargs="+")
+    args = parser.parse_args()
+
+    for track in map(Path, args.tracks):
+        print(f"Separating track {track}")
+        for percent in (10, 50, 100):
+            time.sleep(0.15)
+            print(f" {percent}%|###  | 1.0/2.0 [00:01<00:01, 1.0seconds/s]", file=sys.stderr, flush=True)
+        stem_dir = Path(args.o) / args.n / track.stem
+        stem_dir.mkdir(parents=True, exist_ok=True)
+        for stem in ("vocals", "drums", "bass", "other"):
+            shutil.copy(track, stem_dir / f"{stem}.wav")
+''')
+
+@pytest.fixture
+def fake_demucs(tmp_path, monkeypatch):
+    package = tmp_path / "demucs"
+    package.mkdir()
+    (package / "__init__.py").write_text('__version__ = "fake"\n')
+    (package / "__main__.py").write_text(FAKE_DEMUCS)
+    # Imported here (availability check) and run in the child
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path))
+    monkeypatch.delenv("PYTHONUNBUFFERED", raising=False)  # The worker has to ask for it itself
+    monkeypatch.delitem(sys.modules, "demucs", raising=False)
+
+def test_tracks_complete_as_demucs_moves_on(client, call, fake_demucs, wav_bytes):
+    batch_id = str(uuid.uuid4())
+    call(db_job_service.create_batch, batch_id, "album", "htdemucs", 2)
+    job_ids = []
+    for number in range(2):
+        job_id = str(uuid.uuid4())
+        path = settings.temp_dir / f"{job_id}.wav"
+        path.write_bytes(wav_bytes)
+        call(lambda: db_job_service.create_job(job_id, f"track{number}.wav", str(path), "htdemucs", batch_id=batch_id))
+        job_ids.append(job_id)
+
+    call(audio_processor.process_batch, batch_id, "htdemucs")
+
+    first, second = (call(db_job_service.get_job, job_id) for job_id in job_ids)
+    assert first["status"] == second["status"] == "completed"
+    assert call(db_job_service.get_batch, batch_id)["status"] == "completed"
+    # The first track finished while demucs still worked on the second
+    assert (second["completed_at"] - first["completed_at"]).total_seconds() >= 0.3
+    metrics = call(db_job_service.get_job_metrics, job_ids[1])
+    assert metrics["queue_wait_seconds"] >= 0.3
+    # Progress lines went to the track being separated, not the batch
+    for job_id in job_ids:
+        assert any(log["level"] == "STDERR" and "100%" in log["message"] for log in log_capture.get_logs(job_id))
+
+def test_uploaded_batch_records_each_file(client, call, wav_bytes):
+    album = io.BytesIO()
+    with zipfile.ZipFile(album, "w") as archive:
+        archive.writestr("disc1/01 intro.wav", wav_bytes + b"intro")
+        archive.writestr("disc1/cover.jpg", b"not audio")
+    files = [
+        ("files", ("album.zip", album.getvalue(), "application/zip")),
+        ("files", ("bonus.wav", wav_bytes, "audio/wav")),
+    ]
+    response = client.post("/api/batches/", files=files, params={"name": "album"})
+    assert response.status_code == 200
+    jobs = response.json()["jobs"]
+    assert [job["filename"] for job in jobs] == ["01 intro.wav", "bonus.wav"]
+
+    for job, content in zip(jobs, (wav_bytes + b"intro", wav_bytes)):
+        stored = call(db_job_service.get_job, job["job_id"])
+        assert stored["content_hash"] == hashlib.sha256(content).hexdigest()
+        assert stored["file_size"] == len(content)
@@ -0,0 +1,82 @@
+"""
+Bulk job endpoints: status, cancel and delete for many jobs per request
+"""
+import uuid
+
+from app.core.config import settings
+from app.models.audio import ProcessingStatus
+from app.services.db_job_service import db_job_service
+
+STATUSES = [status.value for status in ProcessingStatus]
+
+def _job(call, status=None) -> str:
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    if status == ProcessingStatus.PROCESSING:
+        call(db_job_service.mark_started, job_id, "worker", "Started")
+    elif status is not None:
+        call(lambda: db_job_service.update_job(job_id, status=status))
+    return job_id
+
+def _stats(client):
+    return client.get("/api/jobs/stats").json()
+
+def _assert_counters_match(client, call):
+    stats = _stats(client)
+    assert {status: stats[status] for status in STATUSES} == call(db_job_service.count_jobs_by_status)
+
+def test_bulk_status(client, call):
+    pending, failed = _job(call), _job(call, ProcessingStatus.FAILED)
+    unknown = str(uuid.uuid4())
+
+    response = client.post("/api/jobs/bulk/status", json={"job_ids": [failed, unknown, pending, failed]})
+    assert response.status_code == 200
+    body = response.json()
+    # Request order, duplicates dropped
+    assert [(job["job_id"], job["status"]) for job in body["jobs"]] == [(failed, "failed"), (pending, "pending")]
+    assert body["not_found"] == [unknown]
+
+    too_many = {"job_ids": [str(uuid.uuid4()) for _ in range(settings.bulk_max_jobs + 1)]}
+    assert client.post("/api/jobs/bulk/status", json=too_many).status_code == 400
+
+def test_bulk_cancel_skips_finished_jobs(client, call, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    active = [_job(call), _job(call, ProcessingStatus.PROCESSING), _job(call)]
+    completed, cancelled = _job(call, ProcessingStatus.COMPLETED), _job(call, ProcessingStatus.CANCELLED)
+    unknown = str(uuid.uuid4())
+    before = _stats(client)
+
+    body = client.post("/api/jobs/bulk/cancel", json={"job_ids": active + [completed, cancelled, unknown]}).json()
+    assert body["succeeded"] == active
+    assert body["not_found"] == [unknown]
+    assert body["skipped"] == {
+        completed: "Cannot cancel job with status: completed",
+        cancelled: "Cannot cancel job with status: cancelled",
+    }
+    statuses = call(db_job_service.get_job_statuses, active + [completed])
+    assert statuses == {**{job_id: "cancelled" for job_id in active}, completed: "completed"}
+
+    after = _stats(client)
+    assert after["cancelled"] == before["cancelled"] + 3
+    assert after["pending"] == before["pending"] - 2
+    assert after["processing"] == before["processing"] - 1
+    _assert_counters_match(client, call)
+
+def test_bulk_delete(client, call, completed_job, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    finished = completed_job({"vocals": b"vocals" * 10})["job_id"]
+    others = [_job(call), _job(call, ProcessingStatus.FAILED)]
+    unknown = str(uuid.uuid4())
+    before = _stats(client)
+
+    body = client.post("/api/jobs/bulk/delete", json={"job_ids": [finished, unknown] + others}).json()
+    assert body["succeeded"] == [finished] + others
+    assert body["not_found"] == [unknown]
+    assert call(db_job_service.get_jobs, [finished] + others) == {}
+    assert not (settings.output_dir / finished).exists()
+
+    after = _stats(client)
+    assert after["total"] == before["total"] - 3
+    for status in ("completed", "pending", "failed"):
+        assert after[status] == before[status] - 1
+    _assert_counters_match(client, call)
@@ -0,0 +1,82 @@
+"""
+Job cache: read-through caching and epoch-based invalidation
+"""
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, query_counter
+from app.services.db_job_service import db_job_service
+from app.services.job_cache import JobCache, job_cache
+
+def _create_job(call) -> str:
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    return job_id
+
+def test_repeated_reads_are_served_from_the_cache(client, call):
+    job_id = _create_job(call)
+    call(db_job_service.get_job, job_id)
+    queries, hits = query_counter.count, job_cache.hits
+    for _ in range(5):
+        assert call(db_job_service.get_job, job_id)["job_id"] == job_id
+    assert query_counter.count == queries
+    assert job_cache.hits == hits + 5
+
+def test_writes_invalidate_the_cached_job(client, call):
+    job_id = _create_job(call)
+    call(db_job_service.get_job, job_id)
+    call(lambda: db_job_service.update_job(job_id, message="changed"))
+    assert client.get(f"/api/jobs/{job_id}").json()["message"] == "changed"
+
+def test_read_started_before_an_invalidation_is_not_stored():
+    cache = JobCache(max_entries=10, ttl=60, poll_interval=1)
+    epoch = cache.epoch  # A read starts...
+    cache.invalidate("job")  # ...the job changes while it is in flight...
+    cache.put("job", {"message": "stale"}, epoch)  # ...and its result arrives
+    assert cache.get("job") is None
+
+    cache.put("job", {"message": "fresh"}, cache.epoch)
+    assert cache.get("job") == {"message": "fresh"}
+
+    epoch = cache.epoch
+    cache.clear()
+    cache.put("other", {"message": "stale"}, epoch)
+    assert cache.get("other") is None
+
+def test_ttl_bounds_staleness():
+    cache = JobCache(max_entries=10, ttl=0.01, poll_interval=1)
+    cache.put("job", {"message": "old"}, cache.epoch)
+    time.sleep(0.02)
+    assert cache.get("job") is None
+
+async def _change_elsewhere(job_id: str, message: str):
+    """What another worker process does: update the row and leave a notification"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE jobs SET message = :message WHERE job_id = :job_id"),
+            {"message": message, "job_id": job_id}
+        )
+        await session.execute(
+            text("INSERT INTO job_invalidations (job_id, created_at) VALUES (:job_id, CURRENT_TIMESTAMP)"),
+            {"job_id": job_id}
+        )
+        await session.commit()
+
+def test_changes_by_other_processes_are_polled(client, call, monkeypatch):
+    monkeypatch.setattr(settings, "workers", 2)
+    monkeypatch.setattr(job_cache, "poll_interval", 0.05)
+    job_id = _create_job(call)
+    call(job_cache.start)
+    try:
+        time.sleep(0.1)  # The first poll records where to start from
+        call(db_job_service.get_job, job_id)
+        call(_change_elsewhere, job_id, "changed elsewhere")
+        deadline = time.monotonic() + 5
+        while call(db_job_service.get_job, job_id)["message"] != "changed elsewhere":
+            assert time.monotonic() < deadline, "invalidation was never picked up"
+            time.sleep(0.05)
+    finally:
+        call(job_cache.stop)
@@ -0,0 +1,70 @@
+"""
+Status counters behind /api/jobs/stats
+"""
+import uuid
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.models.audio import ProcessingStatus
+from app.services.db_job_service import db_job_service
+
+STATUSES = [status.value for status in ProcessingStatus]
+
+def _stats(client):
+    response = client.get("/api/jobs/stats")
+    assert response.status_code == 200
+    return response.json()
+
+def _assert_counters_match(client, call):
+    stats = _stats(client)
+    counts = call(db_job_service.count_jobs_by_status)
+    assert {status: stats[status] for status in STATUSES} == counts
+    assert stats["total"] == sum(counts.values())
+
+async def _execute(statement: str):
+    async with AsyncSessionLocal() as session:
+        await session.execute(text(statement))
+        await session.commit()
+
+def _create_job(call) -> str:
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    return job_id
+
+def test_counters_follow_status_changes(client, call):
+    before = _stats(client)
+    done, cancelled, deleted = _create_job(call), _create_job(call), _create_job(call)
+    assert _stats(client)["pending"] == before["pending"] + 3
+
+    call(db_job_service.mark_started, done, "worker", "Started")
+    assert _stats(client)["processing"] == before["processing"] + 1
+    call(lambda: db_job_service.update_job(done, status=ProcessingStatus.COMPLETED))
+    call(lambda: db_job_service.update_job(cancelled, status=ProcessingStatus.CANCELLED))
+    # Not a transition: the counters stay as they are
+    call(lambda: db_job_service.update_job(cancelled, status=ProcessingStatus.CANCELLED))
+    call(db_job_service.delete_job, deleted)
+
+    after = _stats(client)
+    assert after["pending"] == before["pending"]
+    assert after["processing"] == before["processing"]
+    assert after["completed"] == before["completed"] + 1
+    assert after["cancelled"] == before["cancelled"] + 1
+    assert after["completed_last_24h"] == before["completed_last_24h"] + 1
+    _assert_counters_match(client, call)
+
+def test_seed_counts_only_missing_counters(client, call):
+    _create_job(call)
+    call(_execute, "DELETE FROM job_counters WHERE name = 'status:pending'")
+    call(_execute, "UPDATE job_counters SET value = 1000 WHERE name = 'status:failed'")
+
+    assert call(db_job_service.seed_job_counters) == ["pending"]
+    assert call(db_job_service.seed_job_counters) == []
+    stats = _stats(client)
+    assert stats["pending"] == call(db_job_service.count_jobs_by_status)["pending"]
+    # Existing counters are not recounted, even when they drifted
+    assert stats["failed"] == 1000
+
+    counts = call(db_job_service.rebuild_job_counters)
+    assert counts == call(db_job_service.count_jobs_by_status)
+    _assert_counters_match(client, call)
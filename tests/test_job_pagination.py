@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination of /api/jobs/
+"""
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.models.audio import ProcessingStatus
+from app.services.db_job_service import db_job_service
+
+def _pages(client, **params):
+    """Follow X-Next-Cursor to the end; returns the pages of job IDs"""
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/jobs/", params=query)
+        assert response.status_code == 200
+        pages.append([job["job_id"] for job in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+async def _same_created_at(job_ids):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE jobs SET created_at = '2000-01-01 00:00:00.000000' WHERE job_id IN ({})".format(
+                ", ".join(f"'{job_id}'" for job_id in job_ids)
+            ))
+        )
+        await session.commit()
+
+def test_cursor_pages_cover_every_job_once(client, call):
+    created = [str(uuid.uuid4()) for _ in range(23)]
+    for job_id in created:
+        call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    # Jobs created in the same instant are ordered by id, not skipped or repeated
+    call(_same_created_at, created[:8])
+
+    pages = _pages(client, limit=5)
+    listed = [job_id for page in pages for job_id in page]
+    assert all(len(page) <= 5 for page in pages)
+    assert len(listed) == len(set(listed))
+    assert set(created) <= set(listed)
+    # Newest first: the tied jobs come last, latest id first
+    mine = [job_id for job_id in listed if job_id in created]
+    assert mine == created[8:][::-1] + created[:8][::-1]
+    assert "X-Next-Cursor" not in client.get("/api/jobs/", params={"limit": len(listed) + 1}).headers
+
+def test_cursor_with_status_filter(client, call):
+    job_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for job_id in job_ids:
+        call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+        call(lambda: db_job_service.update_job(job_id, status=ProcessingStatus.FAILED))
+
+    listed = [job_id for page in _pages(client, status="failed", limit=2) for job_id in page]
+    assert set(job_ids) <= set(listed)
+    statuses = call(db_job_service.get_job_statuses, listed)
+    assert set(statuses.values()) == {ProcessingStatus.FAILED.value}
+
+def test_invalid_cursor(client):
+    assert client.get("/api/jobs/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+async def _backdate(job_id: str, moment: str):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE jobs SET created_at = :moment, updated_at = :moment WHERE job_id = :job_id"),
+            {"moment": moment, "job_id": job_id}
+        )
+        await session.commit()
+
+def test_archived_jobs_stay_listed(client, call):
+    # Finished jobs (archived) interleaved in time with pending ones (kept hot)
+    created = []
+    for second in range(10):
+        job_id = str(uuid.uuid4())
+        call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+        if second % 2 == 0:
+            call(lambda: db_job_service.update_job(job_id, status=ProcessingStatus.COMPLETED))
+        call(_backdate, job_id, f"1999-12-31 00:00:{second:02d}.000000")
+        created.append(job_id)
+    assert call(db_job_service.archive_jobs, datetime(2000, 1, 1), 100) == 5
+
+    listed = [job_id for page in _pages(client, limit=3) for job_id in page]
+    assert [job_id for job_id in listed if job_id in created] == created[::-1]
+    completed = [job_id for page in _pages(client, status="completed", limit=2) for job_id in page]
+    assert [job_id for job_id in completed if job_id in created] == created[::2][::-1]
+    # Offset paging sees the same list
+    offset_listed = [job["job_id"] for job in client.get("/api/jobs/", params={"offset": 1, "limit": 1000}).json()]
+    assert offset_listed == listed[1:1001]
@@ -0,0 +1,150 @@
+"""
+Job logs: block files with indexes, the in-memory tail and the log API
+"""
+import asyncio
+import threading
+import uuid
+
+from app.api import audio
+from app.services.db_job_service import db_job_service
+from app.services.log_capture import LogCapture, log_capture
+from app.services.log_files import LogFileStore
+
+def _capture(directory, **options) -> LogCapture:
+    options = {"tail_entries": 20, "max_bytes": 10**6, "idle_seconds": 60, "block_entries": 10, **options}
+    return LogCapture(LogFileStore(directory), console_rate=0, **options)
+
+def _fill(capture: LogCapture, job_id: str, count: int):
+    for number in range(1, count + 1):
+        level = "ERROR" if number % 25 == 0 else "INFO"
+        capture.add_log(job_id, level, f"line {number}")
+
+def test_records_are_written_in_indexed_blocks(tmp_path):
+    capture = _capture(tmp_path)
+    _fill(capture, "job", 105)
+
+    # Full blocks are on disk; the last five records are still pending
+    blocks = capture.files.index("job")
+    assert [(block.first_seq, block.last_seq) for block in blocks] == [
+        (start, start + 9) for start in range(1, 101, 10)
+    ]
+    assert capture.stats()["unflushed"] == 5
+
+    # Old ranges come from the file, recent ones from memory
+    assert [log["seq"] for log in capture.get_logs_since("job", 0)] == list(range(1, 106))
+    assert [log["seq"] for log in capture.get_logs_since("job", 40, 3)] == [41, 42, 43]
+    assert capture.get_logs_since("job", 103)[0]["message"] == "line 104"
+
+    capture.flush()
+    assert capture.files.last_seq("job") == 105
+
+def test_level_queries_skip_blocks_without_the_level(tmp_path, monkeypatch):
+    capture = _capture(tmp_path)
+    _fill(capture, "job", 100)
+    capture.flush()
+
+    read = []
+    original = capture.files.read_block
+    def read_block(data_file, block):
+        read.append(block.first_seq)
+        return original(data_file, block)
+    monkeypatch.setattr(capture.files, "read_block", read_block)
+
+    errors = capture.query("job", levels=["ERROR"])
+    assert [log["seq"] for log in errors] == [25, 50, 75, 100]
+    assert read == [21, 41, 71, 91]
+
+    matching = capture.query("job", predicate=lambda record: record[3].endswith("7"), before_seq=30)
+    assert [log["seq"] for log in matching] == [7, 17, 27]
+
+def test_numbering_continues_after_a_restart(tmp_path):
+    capture = _capture(tmp_path)
+    _fill(capture, "job", 15)
+    capture.flush()
+
+    restarted = _capture(tmp_path)
+    restarted.open_jobs(["job"])
+    assert restarted.add_log("job", "INFO", "after restart") == 16
+    assert [log["seq"] for log in restarted.get_logs_since("job", 12)] == [13, 14, 15, 16]
+
+    restarted.clear_logs("job")
+    assert restarted.get_logs("job") == []
+    assert restarted.add_log("job", "INFO", "after clearing") == 1
+
+def test_evicted_jobs_keep_unwritten_records(tmp_path):
+    capture = _capture(tmp_path, tail_entries=1000, max_bytes=20000, idle_seconds=0, block_entries=1000)
+    _fill(capture, "idle", 50)
+    _fill(capture, "busy", 200)
+
+    assert capture.evicted_jobs >= 1
+    assert [log["seq"] for log in capture.get_logs("idle")] == list(range(1, 51))
+    capture.flush()
+    assert capture.stats()["unflushed"] == 0
+    assert capture.files.last_seq("idle") == 50
+
+def test_add_log_leaves_writing_to_the_flush_loop(tmp_path, monkeypatch):
+    capture = _capture(tmp_path, flush_interval=60)
+    writers = set()
+    original = capture.files.append
+    def append(job_id, records):
+        writers.add(threading.current_thread())
+        original(job_id, records)
+    monkeypatch.setattr(capture.files, "append", append)
+
+    async def main():
+        capture.start()
+        await asyncio.to_thread(capture.open_jobs, ["job"])
+        _fill(capture, "job", 35)
+        for _ in range(100):
+            if capture.files.last_seq("job") == 30:
+                break
+            await asyncio.sleep(0.01)
+        # Full blocks are written right away, the partial one waits
+        assert capture.files.last_seq("job") == 30
+        await capture.stop()
+
+    asyncio.run(main())
+    assert writers and threading.current_thread() not in writers
+    assert capture.files.last_seq("job") == 35
+
+def test_log_api_filters_and_pages(client, call):
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    _fill(log_capture, job_id, 300)
+    url = f"/api/audio/logs/{job_id}"
+
+    logs = client.get(url, params={"since": 280}).json()["logs"]
+    assert [log["seq"] for log in logs] == list(range(281, 301))
+
+    errors = client.get(url, params={"level": "error"}).json()
+    assert [log["seq"] for log in errors["logs"]] == list(range(25, 301, 25))
+    assert errors["next_since"] is None
+
+    page = client.get(url, params={"q": "LINE 1", "limit": 5}).json()
+    assert [log["seq"] for log in page["logs"]] == [1, 10, 11, 12, 13]
+    assert page["next_since"] == 13
+    found = client.get(url, params={"q": r"line 29\d$", "regex": True}).json()["logs"]
+    assert [log["seq"] for log in found] == list(range(290, 300))
+    assert client.get(url, params={"q": "(", "regex": True}).status_code == 400
+    # Patterns that can backtrack exponentially are refused
+    assert client.get(url, params={"q": "(a*)*b", "regex": True}).status_code == 400
+    assert client.get(url, params={"q": r"(\d{2})+", "regex": True}).status_code == 200
+
+    assert client.delete(url).status_code == 200
+    assert client.get(url).json()["logs"] == []
+    assert client.get("/api/audio/logs/unknown").status_code == 404
+
+def test_regex_search_is_bounded(client, call, monkeypatch):
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    log_capture.add_log(job_id, "INFO", "x" * 5000 + " end")
+    _fill(log_capture, job_id, 50)
+    url = f"/api/audio/logs/{job_id}"
+
+    # Only the start of a long message is searched
+    assert client.get(url, params={"q": "end$", "regex": True}).json()["logs"] == []
+    assert client.get(url, params={"q": " end"}).json()["logs"] != []
+
+    monkeypatch.setattr(audio, "MAX_REGEX_SCANNED", 20)
+    assert client.get(url, params={"q": "line 5\\d", "regex": True}).status_code == 400
+    assert client.get(url, params={"q": "line 5\\d", "regex": True, "since": 40}).status_code == 200
@@ -0,0 +1,140 @@
+"""
+Crash recovery: orphaned jobs and files left behind by workers that are gone
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.audio import ProcessingStatus
+from app.services.audio_processor import WORKER_ID, audio_processor
+from app.services.db_job_service import db_job_service
+from app.services.recovery import RecoverySweeper, worker_is_gone
+
+HOST = socket.gethostname()
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_worker_is_gone():
+    now = datetime.utcnow()
+    recent = {"created_at": now, "updated_at": now - timedelta(seconds=10)}
+    stale = {"created_at": now, "updated_at": now - timedelta(seconds=settings.recovery_stale_after + 1)}
+
+    assert not worker_is_gone({**stale, "worker_id": WORKER_ID}, now)
+    # An earlier incarnation of this process
+    assert worker_is_gone({**recent, "worker_id": f"{HOST}:{os.getpid()}:0000"}, now)
+    # Workers on this host are checked by PID, however recent the row
+    assert worker_is_gone({**recent, "worker_id": f"{HOST}:{_dead_pid()}:abcd"}, now)
+    assert not worker_is_gone({**stale, "worker_id": f"{HOST}:{os.getppid()}:abcd"}, now)
+    # Elsewhere, only silence tells
+    assert not worker_is_gone({**recent, "worker_id": "elsewhere:1:abcd"}, now)
+    assert worker_is_gone({**stale, "worker_id": "elsewhere:1:abcd"}, now)
+    assert worker_is_gone({"worker_id": None, "created_at": stale["updated_at"]}, now)
+
+def _claimed_job(call, worker_id: str, file_path=None) -> str:
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", str(file_path) if file_path else None, "htdemucs")
+    call(db_job_service.mark_started, job_id, worker_id, "Started")
+    return job_id
+
+def test_orphaned_jobs_are_requeued_or_failed(client, call, wav_bytes, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(audio_processor, "submit", lambda job_id, *args: submitted.append(job_id))
+    dead = f"{HOST}:{_dead_pid()}:abcd"
+
+    upload = settings.temp_dir / f"{uuid.uuid4()}.wav"
+    upload.write_bytes(wav_bytes)
+    requeued = _claimed_job(call, dead, upload)
+    partial = settings.output_dir / requeued
+    partial.mkdir()
+    missing_upload = _claimed_job(call, dead)
+    alive = _claimed_job(call, f"{HOST}:{os.getppid()}:abcd")
+
+    call(RecoverySweeper().recover_orphaned_jobs)
+
+    job = call(db_job_service.get_job, requeued)
+    assert job["status"] == "pending" and job["worker_id"] is None
+    assert submitted == [requeued]
+    assert not partial.exists() and upload.exists()
+    # Nothing left to run it with
+    assert call(db_job_service.get_job, missing_upload)["status"] == "failed"
+    assert call(db_job_service.get_job, alive)["status"] == "processing"
+
+def test_orphaned_job_taken_over_meanwhile_is_left_alone(client, call, wav_bytes, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(audio_processor, "submit", lambda job_id, *args: submitted.append(job_id))
+    upload = settings.temp_dir / f"{uuid.uuid4()}.wav"
+    upload.write_bytes(wav_bytes)
+    job_id = _claimed_job(call, f"{HOST}:{_dead_pid()}:abcd", upload)
+    snapshot = call(db_job_service.get_job, job_id)
+
+    # Another sweeper re-queued it and a live worker claimed it since the listing
+    call(lambda: db_job_service.update_job(job_id, worker_id=WORKER_ID))
+
+    async def stale_listing(status):
+        return [snapshot]
+
+    monkeypatch.setattr(db_job_service, "get_jobs_by_status", stale_listing)
+    assert call(RecoverySweeper().recover_orphaned_jobs) == 0
+    assert submitted == []
+    job = call(db_job_service.get_job, job_id)
+    assert job["status"] == "processing" and job["worker_id"] == WORKER_ID
+
+async def _backdate(job_id: str):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE jobs SET created_at = :moment, updated_at = :moment WHERE job_id = :job_id"),
+            {"moment": "1980-01-01 00:00:00.000000", "job_id": job_id}
+        )
+        await session.commit()
+
+def test_orphaned_entries_are_removed(client, call, tmp_path, monkeypatch):
+    temp_dir, output_dir = tmp_path / "temp", tmp_path / "output"
+    temp_dir.mkdir()
+    output_dir.mkdir()
+    monkeypatch.setattr(settings, "temp_dir", temp_dir)
+    monkeypatch.setattr(settings, "output_dir", output_dir)
+
+    pending, finished, archived = (str(uuid.uuid4()) for _ in range(3))
+    for job_id in (pending, finished, archived):
+        call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    call(lambda: db_job_service.update_job(finished, status=ProcessingStatus.FAILED))
+    call(lambda: db_job_service.update_job(archived, status=ProcessingStatus.COMPLETED))
+    call(_backdate, archived)
+    assert call(db_job_service.archive_jobs, datetime(1981, 1, 1), 10) == 1
+
+    entries = {
+        temp_dir / f"{uuid.uuid4()}.wav": True,  # No job
+        temp_dir / f"{pending}.wav": False,  # Upload waiting to be processed
+        temp_dir / f"{finished}.mp3": True,  # Upload of a finished job
+        temp_dir / "notes.txt": False,  # Not a name this app creates
+        output_dir / str(uuid.uuid4()): True,
+        output_dir / finished: False,  # Outputs stay while the row does
+        output_dir / archived: False,
+        temp_dir / f"batch_{uuid.uuid4()}": True,
+    }
+    old = time.time() - settings.recovery_grace_period - 10
+    for path in entries:
+        if path.suffix or path.name == "notes.txt":
+            path.write_bytes(b"audio")
+        else:
+            path.mkdir()
+        os.utime(path, (old, old))
+    # Too recent to tell from an upload in progress
+    recent = temp_dir / f"{uuid.uuid4()}.wav"
+    recent.write_bytes(b"audio")
+
+    assert call(RecoverySweeper().remove_orphaned_entries) == sum(entries.values())
+    for path, removed in entries.items():
+        assert path.exists() != removed, path
+    assert recent.exists()
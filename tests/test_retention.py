@@ -0,0 +1,60 @@
+"""
+Retention: finished jobs evicted by age, then least recently used first down to the quota
+"""
+from datetime import datetime
+
+from app.core.config import settings
+from app.services import retention
+from app.services.db_job_service import db_job_service
+from app.services.retention import RetentionManager
+
+def test_expired_then_least_recently_used_jobs_are_evicted(client, call, completed_job, monkeypatch):
+    # Completed long before anything else in the database, in this order
+    jobs = {}
+    for year, name in ((1971, "expired"), (1973, "older"), (1974, "newer"), (1972, "downloaded")):
+        job = completed_job({"vocals": b"v" * 100})
+        call(lambda: db_job_service.update_job(job["job_id"], completed_at=datetime(year, 1, 1)))
+        jobs[name] = job
+    # A download counts as use, whenever the job completed
+    call(lambda: db_job_service.update_job(jobs["downloaded"]["job_id"], last_accessed_at=datetime(1975, 1, 1)))
+
+    events = []
+    delete_jobs, remove_job_files = db_job_service.delete_jobs, retention.remove_job_files
+
+    async def deleting_rows(job_ids):
+        events.append(("rows", sorted(job_ids)))
+        return await delete_jobs(job_ids)
+
+    def removing_files(job):
+        events.append(("files", job["job_id"]))
+        remove_job_files(job)
+
+    monkeypatch.setattr(db_job_service, "delete_jobs", deleting_rows)
+    monkeypatch.setattr(retention, "remove_job_files", removing_files)
+
+    # Unused since before mid-1972: only the first job
+    age = datetime.utcnow() - datetime(1972, 6, 1)
+    monkeypatch.setattr(settings, "retention_max_age_hours", int(age.total_seconds() // 3600))
+    monkeypatch.setattr(settings, "retention_max_bytes", None)
+    stats = call(RetentionManager().enforce)
+    assert stats == {"expired_jobs": 1, "evicted_jobs": 0, "freed_bytes": 100}
+    expired = jobs["expired"]["job_id"]
+    assert events == [("rows", [expired]), ("files", expired)]
+    assert call(db_job_service.get_job, expired) is None
+    assert not (settings.output_dir / expired).exists()
+
+    # 150 bytes over the quota: the two least recently used of the rest go
+    events.clear()
+    monkeypatch.setattr(settings, "retention_max_age_hours", None)
+    monkeypatch.setattr(settings, "retention_max_bytes", call(db_job_service.get_output_usage) - 150)
+    monkeypatch.setattr(settings, "retention_target_ratio", 1.0)
+    stats = call(RetentionManager().enforce)
+    assert stats == {"expired_jobs": 0, "evicted_jobs": 2, "freed_bytes": 200}
+    evicted = [jobs["older"]["job_id"], jobs["newer"]["job_id"]]
+    assert events == [("rows", sorted(evicted))] + [("files", job_id) for job_id in evicted]
+    for job_id in evicted:
+        assert call(db_job_service.get_job, job_id) is None
+        assert not (settings.output_dir / job_id).exists()
+    kept = jobs["downloaded"]["job_id"]
+    assert call(db_job_service.get_job, kept) is not None
+    assert (settings.output_dir / kept).exists()
@@ -0,0 +1,72 @@
+"""
+Retries: failure classification, fallback options and the requeue/claim handshake
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+from app.services.failures import FATAL, MEMORY, TRANSIENT, classify_exit, classify_text, fallback_options
+
+def test_classify_exit():
+    # The OOM killer's SIGKILL, directly or through a shell
+    assert classify_exit(-9, "") == MEMORY
+    assert classify_exit(137, "") == MEMORY
+    assert classify_exit(1, "RuntimeError: CUDA out of memory. Tried to allocate 2.00 GiB") == MEMORY
+    assert classify_exit(1, "sqlite3.OperationalError: database is locked") == TRANSIENT
+    assert classify_exit(-11, "") == TRANSIENT  # Crashed
+    assert classify_exit(1, "FileNotFoundError: song.wav") == FATAL
+
+def test_classify_text():
+    assert classify_text("Traceback ...\nMemoryError") == MEMORY
+    assert classify_text("separating\nKilled\n") == MEMORY
+    # Only "Killed" alone on a line is the shell reporting the OOM killer
+    assert classify_text("Killed by user request") is None
+    assert classify_text("OSError: [Errno 28] No space left on device") == TRANSIENT
+    assert classify_text("ValueError: bad model name") is None
+
+def test_fallback_options():
+    assert fallback_options(TRANSIENT, "database is locked", {}) == {}
+    assert fallback_options(MEMORY, "Killed", {}) == {"segment": settings.retry_fallback_segment}
+    # Already small enough segments are kept; a GPU OOM moves the job to the CPU
+    small = settings.retry_fallback_segment - 1
+    assert fallback_options(MEMORY, "CUDA out of memory", {"segment": small, "device": "cuda"}) == {"device": "cpu"}
+    assert fallback_options(MEMORY, "CUDA out of memory", {"segment": small, "device": "cpu"}) == {}
+
+def _processing_job(call, worker_id="worker") -> str:
+    job_id = str(uuid.uuid4())
+    call(db_job_service.create_job, job_id, "song.wav", None, "htdemucs")
+    call(db_job_service.mark_started, job_id, worker_id, "Started")
+    return job_id
+
+def test_requeue_only_applies_to_the_workers_own_job(client, call):
+    job_id = _processing_job(call)
+    assert call(lambda: db_job_service.requeue_job(job_id, "other worker", message="Retrying")) is None
+
+    requeued = call(lambda: db_job_service.requeue_job(job_id, "worker", message="Retrying", segment=4))
+    assert requeued["status"] == "pending"
+    assert requeued["worker_id"] is None
+    assert requeued["segment"] == 4
+
+    # Cancelled while the failure was being handled: it stays cancelled
+    cancelled = _processing_job(call)
+    assert call(db_job_service.cancel_jobs, [cancelled], "Cancelled") == [cancelled]
+    assert call(lambda: db_job_service.requeue_job(cancelled, "worker", message="Retrying")) is None
+    assert call(db_job_service.get_job, cancelled)["status"] == "cancelled"
+
+def test_a_retry_is_claimed_once(client, call):
+    job_id = _processing_job(call)
+    due = datetime.utcnow().replace(microsecond=0) - timedelta(seconds=1)
+    call(lambda: db_job_service.requeue_job(job_id, "worker", next_retry_at=due))
+
+    async def claim_twice():
+        return await asyncio.gather(
+            db_job_service.claim_retry(job_id, due), db_job_service.claim_retry(job_id, due)
+        )
+
+    assert sorted(call(claim_twice)) == [False, True]
+    assert call(db_job_service.get_job, job_id)["next_retry_at"] is None
+    # A claim for another scheduled time than the stored one is stale
+    call(lambda: db_job_service.update_job(job_id, next_retry_at=due))
+    assert call(db_job_service.claim_retry, job_id, due + timedelta(seconds=5)) is False
@@ -0,0 +1,94 @@
+"""
+Upload negotiation: files offered by their hash reuse earlier jobs' results or uploads
+"""
+import hashlib
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+
+@pytest.fixture
+def reuse(monkeypatch):
+    monkeypatch.setattr(settings, "content_reuse", True)
+
+def _offer(client, data: bytes, model="htdemucs", length=None):
+    return client.post("/api/uploads/negotiate", json={
+        "content_hash": hashlib.sha256(data).hexdigest(),
+        "length": len(data) if length is None else length,
+        "filename": "again.wav",
+        "model": model,
+    })
+
+def test_unknown_content_is_uploaded_and_checked(client, call):
+    data = os.urandom(5000)
+    response = _offer(client, data)
+    assert response.status_code == 201
+    body = response.json()
+    assert body["action"] == "upload"
+    assert body["job"] is None
+    url = body["upload_url"]
+
+    assert client.patch(url, content=data, headers={"Upload-Offset": "0"}).status_code == 204
+    response = client.post(f"{url}/finalize")
+    assert response.status_code == 200
+    job = call(db_job_service.get_job, response.json()["job_id"])
+    assert job["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert job["file_size"] == len(data)
+
+def test_upload_not_matching_the_offered_hash_is_refused(client):
+    data = os.urandom(5000)
+    url = _offer(client, data).json()["upload_url"]
+    other = os.urandom(len(data))
+    assert client.patch(url, content=other, headers={"Upload-Offset": "0"}).status_code == 204
+    response = client.post(f"{url}/finalize")
+    assert response.status_code == 400
+    assert "content_hash" in response.json()["detail"]
+
+def test_completed_result_is_reused(client, call, completed_job, reuse):
+    upload = os.urandom(3000)
+    source = completed_job({"vocals": b"vocals" * 100, "drums": b"drums" * 100}, upload=upload)
+
+    response = _offer(client, upload)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["action"] == "reused_result"
+    assert body["job"]["status"] == "completed"
+    job_id = body["job"]["job_id"]
+
+    # The new job's stems outlive the job they came from
+    assert client.delete(f"/api/audio/job/{source['job_id']}").status_code == 200
+    response = client.get(f"/api/audio/download/{job_id}/vocals")
+    assert response.status_code == 200
+    assert response.content == b"vocals" * 100
+
+    # Another model, or a size that differs from the recorded upload, needs its own run
+    assert _offer(client, upload, model="htdemucs_ft").json()["action"] == "upload"
+    assert _offer(client, upload, length=len(upload) + 1).json()["action"] == "upload"
+
+def test_uploaded_file_is_reused(client, call, reuse):
+    data = b"RIFF0000WAVEfmt " + os.urandom(4000)
+    uploaded = client.post("/api/audio/upload", files={"file": ("song.wav", data, "audio/wav")}).json()
+
+    body = _offer(client, data, model="htdemucs_6s").json()
+    assert body["action"] == "reused_source"
+    assert body["job"]["status"] == "pending"
+    job = call(db_job_service.get_job, body["job"]["job_id"])
+    original = call(db_job_service.get_job, uploaded["job_id"])
+    assert job["file_path"] != original["file_path"]
+    with open(job["file_path"], "rb") as linked:
+        assert linked.read() == data
+    assert job["model"] == "htdemucs_6s"
+
+def test_nothing_is_reused_by_default(client, completed_job):
+    upload = os.urandom(3000)
+    completed_job({"vocals": b"vocals" * 100}, upload=upload)
+    # Knowing a hash must not hand out someone else's stems
+    assert _offer(client, upload).json()["action"] == "upload"
+
+def test_invalid_hash(client):
+    response = client.post("/api/uploads/negotiate", json={
+        "content_hash": "not-a-hash", "length": 10, "filename": "song.wav"
+    })
+    assert response.status_code == 400
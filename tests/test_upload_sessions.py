@@ -0,0 +1,82 @@
+"""
+Resumable uploads: sessions filled by ranges in any order, then finalized into a job
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+from app.services.upload_sessions import merge_ranges, upload_sessions
+
+CHUNK = 64 * 1024
+
+def _create(client, data: bytes) -> str:
+    response = client.post("/api/uploads/", json={"filename": "song.wav", "length": len(data)})
+    assert response.status_code == 201
+    assert response.headers["Upload-Offset"] == "0"
+    assert response.headers["Upload-Length"] == str(len(data))
+    return response.headers["Location"]
+
+def _patch(client, url: str, data: bytes, offset: int):
+    return client.patch(url, content=data[offset:offset + CHUNK], headers={"Upload-Offset": str(offset)})
+
+def test_merge_ranges():
+    assert merge_ranges([]) == []
+    assert merge_ranges([(10, 15), (0, 10), (20, 25), (22, 23)]) == [(0, 15), (20, 25)]
+
+def test_ranges_arrive_out_of_order_and_in_parallel(client, call):
+    data = os.urandom(10 * CHUNK + 17)
+    url = _create(client, data)
+    offsets = list(range(0, len(data), CHUNK))
+
+    # Everything but the first chunk, several at a time
+    with ThreadPoolExecutor(4) as pool:
+        statuses = list(pool.map(lambda offset: _patch(client, url, data, offset).status_code, offsets[:0:-1]))
+    assert set(statuses) == {204}
+
+    # The offset to resume from is the end of the contiguous prefix
+    assert client.head(url).headers["Upload-Offset"] == "0"
+    status = client.get(url).json()
+    assert status["received"] == len(data) - CHUNK
+    assert status["ranges"] == [[CHUNK, len(data)]]
+    assert client.post(f"{url}/finalize").status_code == 409
+
+    assert _patch(client, url, data, 0).status_code == 204
+    assert client.head(url).headers["Upload-Offset"] == str(len(data))
+
+    response = client.post(f"{url}/finalize")
+    assert response.status_code == 200
+    job = call(db_job_service.get_job, response.json()["job_id"])
+    assert job["status"] == "pending"
+    assert job["content_hash"] == hashlib.sha256(data).hexdigest()
+    with open(job["file_path"], "rb") as stored:
+        assert stored.read() == data
+    # The session is gone once it became a job
+    assert client.head(url).status_code == 404
+
+def test_invalid_requests(client):
+    assert client.post("/api/uploads/", json={"filename": "notes.txt", "length": 5}).status_code == 400
+    assert client.post(
+        "/api/uploads/", json={"filename": "song.wav", "length": settings.max_file_size + 1}
+    ).status_code == 400
+
+    data = os.urandom(1000)
+    url = _create(client, data)
+    # Past the declared length
+    assert client.patch(url, content=b"x" * 200, headers={"Upload-Offset": "900"}).status_code == 400
+    assert client.patch(url, content=data).status_code == 422  # No Upload-Offset
+    assert client.head("/api/uploads/unknown").status_code == 404
+
+def test_abandoned_sessions_expire_and_can_be_deleted(client, monkeypatch):
+    expired = _create(client, b"x" * 10)
+    deleted = _create(client, b"x" * 10)
+
+    assert client.delete(deleted).status_code == 204
+    assert client.delete(deleted).status_code == 404
+
+    monkeypatch.setattr(settings, "upload_session_ttl", 0)
+    time.sleep(0.01)
+    assert upload_sessions.expire() >= 1
+    assert client.head(expired).status_code == 404
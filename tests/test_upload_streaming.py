@@ -0,0 +1,72 @@
+"""
+Streaming multipart uploads: written to disk in chunks and hashed on the way
+"""
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.db_job_service import db_job_service
+from app.services.uploads import ChunkedFileWriter, UploadError
+
+def _temp_files():
+    return set(os.listdir(settings.temp_dir))
+
+def test_upload_is_stored_and_hashed(client, call):
+    data = os.urandom(3 * settings.upload_chunk_size + 123)
+    response = client.post(
+        "/api/audio/upload",
+        files={"file": ("My Song.wav", data, "audio/wav")},
+        data={"comment": "fields besides the file are ignored"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "pending"
+    assert body["filename"] == "My Song.wav"
+
+    job = call(db_job_service.get_job, body["job_id"])
+    assert job["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert job["file_size"] == len(data)
+    with open(job["file_path"], "rb") as stored:
+        assert stored.read() == data
+
+def test_rejected_uploads_leave_no_file(client, monkeypatch):
+    before = _temp_files()
+    response = client.post("/api/audio/upload", files={"file": ("notes.txt", b"abc", "text/plain")})
+    assert response.status_code == 400
+    assert "not supported" in response.json()["detail"]
+
+    assert client.post("/api/audio/upload", data={"comment": "no file"}).status_code == 400
+    assert client.post(
+        "/api/audio/upload", content=b"{}", headers={"content-type": "application/json"}
+    ).status_code == 400
+
+    monkeypatch.setattr(settings, "max_file_size", 64 * 1024)
+    response = client.post("/api/audio/upload", files={"file": ("big.wav", b"\0" * (65 * 1024), "audio/wav")})
+    assert response.status_code == 400
+    assert "too large" in response.json()["detail"]
+    assert _temp_files() == before
+
+def test_chunked_writer_bounds_memory_and_size(tmp_path):
+    async def write(path, pieces, max_bytes=None):
+        writer = ChunkedFileWriter(path, max_bytes=max_bytes, chunk_size=1000)
+        try:
+            for piece in pieces:
+                await writer.write(piece)
+                assert len(writer._buffer) < 1000
+        except UploadError:
+            writer.discard()
+            raise
+        return await writer.close()
+
+    pieces = [os.urandom(size) for size in (10, 999, 1, 2500, 7)]
+    path = tmp_path / "upload.wav"
+    assert asyncio.run(write(path, pieces)) == hashlib.sha256(b"".join(pieces)).hexdigest()
+    assert path.read_bytes() == b"".join(pieces)
+
+    with pytest.raises(UploadError) as error:
+        asyncio.run(write(path, pieces, max_bytes=3000))
+    assert error.value.status_code == 400
+    assert not path.exists()
@@ -0,0 +1,64 @@
+"""
+Streaming zip downloads: archives sent while they are being written
+"""
+import asyncio
+import io
+import os
+import time
+import uuid
+import zipfile
+
+from app.services.db_job_service import db_job_service
+from app.services.zip_stream import stream_zip
+
+def _collect(entries, chunk_size):
+    async def collect():
+        return [chunk async for chunk in stream_zip(entries, chunk_size)]
+    return asyncio.run(collect())
+
+def test_archive_holds_every_existing_file(tmp_path):
+    audio, text = tmp_path / "vocals.wav", tmp_path / "notes.txt"
+    audio.write_bytes(os.urandom(300 * 1024))
+    text.write_bytes(b"compressible " * 10000)
+    entries = [(audio, "song_vocals.wav"), (tmp_path / "missing.wav", "gone.wav"), (text, "notes.txt")]
+
+    chunks = _collect(entries, 64 * 1024)
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["song_vocals.wav", "notes.txt"]
+        assert archive.read("song_vocals.wav") == audio.read_bytes()
+        # Audio is stored as is, anything else deflated
+        assert archive.getinfo("song_vocals.wav").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+
+def test_closing_early_stops_the_writer(tmp_path):
+    big = tmp_path / "big.wav"
+    big.write_bytes(b"\0" * (32 * 1024 * 1024))
+
+    async def first_chunk():
+        stream = stream_zip([(big, "big.wav")], 64 * 1024)
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk
+
+    started = time.monotonic()
+    # asyncio.run waits for the writer thread, so this only returns once it stopped
+    assert asyncio.run(first_chunk()).startswith(b"PK")
+    assert time.monotonic() - started < 5
+
+def test_download_all_stems(client, call, completed_job):
+    stems = {"vocals": os.urandom(100 * 1024), "drums": os.urandom(50 * 1024)}
+    job = completed_job(stems)
+
+    response = client.get(f"/api/audio/download/{job['job_id']}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert "song_stems.zip" in response.headers["content-disposition"]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["song_drums.wav", "song_vocals.wav"]
+        assert archive.read("song_vocals.wav") == stems["vocals"]
+
+    pending = str(uuid.uuid4())
+    call(db_job_service.create_job, pending, "song.wav", None, "htdemucs")
+    assert client.get(f"/api/audio/download/{pending}").status_code == 400